@@ -1,5 +1,9 @@
 ﻿from django.contrib import admin
-from .models import Category, Location, Post, Comment
+from django.db import models
+from django.utils import timezone
+from . import outbox
+from .forms import ProbedImageField
+from .models import Category, Location, Post, Comment, OutgoingEmail, Task
 
 
 @admin.register(Category)
@@ -20,11 +24,15 @@ class LocationAdmin(admin.ModelAdmin):
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'category', 'is_published',
-                    'pub_date', 'created_at')
+                    'pub_date', 'created_at', 'comment_count')
+    list_select_related = ('author', 'category')
     list_filter = ('is_published', 'category', 'author')
     search_fields = ('title', 'text', 'author__username')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'comment_count')
     filter_horizontal = ()
+    formfield_overrides = {
+        models.ImageField: {'form_class': ProbedImageField},
+    }
     fieldsets = (
         (None, {
             'fields': ('title', 'text', 'author', 'image')
@@ -33,7 +41,7 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('pub_date', 'category', 'location')
         }),
         ('Публикация', {
-            'fields': ('is_published', 'created_at')
+            'fields': ('is_published', 'created_at', 'comment_count')
         }),
     )
 
@@ -41,9 +49,53 @@ class PostAdmin(admin.ModelAdmin):
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('post', 'author', 'created_at', 'text_preview')
+    list_select_related = ('post', 'author')
     list_filter = ('created_at', 'author')
     search_fields = ('text', 'author__username', 'post__title')
 
     def text_preview(self, obj):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Текст'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at',
+                    'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error', 'locked_at', 'created_at')
+    actions = ['requeue']
+
+    @admin.action(description='Поставить в очередь заново')
+    def requeue(self, request, queryset):
+        queryset.update(status=Task.QUEUED, attempts=0, locked_at=None,
+                        run_at=timezone.now())
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'recipient_domain', 'status', 'attempts',
+                    'send_after', 'sent_at')
+    list_filter = ('status', 'recipient_domain')
+    readonly_fields = ('digest', 'last_error', 'locked_at', 'sent_at',
+                       'created_at')
+    actions = ['requeue']
+
+    @admin.action(description='Отправить заново')
+    def requeue(self, request, queryset):
+        # Одинаковое письмо ждёт отправки не больше одного раза
+        # (outbox_digest_active): ставим по одному на отпечаток.
+        active = [OutgoingEmail.PENDING, OutgoingEmail.SENDING]
+        waiting = set(OutgoingEmail.objects.filter(
+            status__in=active
+        ).values_list('digest', flat=True))
+        chosen = {}
+        for pk, key in queryset.exclude(status__in=active).values_list(
+                'pk', 'digest'):
+            if key not in waiting:
+                chosen.setdefault(key, pk)
+        OutgoingEmail.objects.filter(pk__in=chosen.values()).update(
+            status=OutgoingEmail.PENDING, attempts=0, locked_at=None,
+            send_after=timezone.now()
+        )
+        outbox.schedule_send()
@@ -0,0 +1,82 @@
+"""Асинхронные варианты читающих страниц для ASGI (blogicum/asgi.py).
+
+Django 3.2 под ASGI выполняет синхронные view в одном общем потоке,
+поэтому параллельные запросы выстраиваются в очередь. Здесь dispatch
+вместе с отрисовкой шаблона уходит в пул из ASYNC_VIEW_THREADS потоков:
+ORM и шаблоны остаются синхронными, а цикл событий не блокируется.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import views
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEW_THREADS,
+            thread_name_prefix='async-view',
+        )
+    return _executor
+
+
+def _run_with_connection(func, *args, **kwargs):
+    # Соединения потоков пула живут по тем же правилам CONN_MAX_AGE,
+    # что и у обычного обработчика запросов.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    return await sync_to_async(
+        _run_with_connection, thread_sensitive=False,
+        executor=get_executor()
+    )(func, *args, **kwargs)
+
+
+class AsyncViewMixin:
+    """Делает view асинхронным: dispatch и отрисовка идут в пуле потоков."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Django 3.2 узнаёт асинхронные class-based view только по метке.
+        view._is_coroutine = asyncio.coroutines._is_coroutine
+        return view
+
+    def dispatch_and_render(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+
+    async def dispatch(self, request, *args, **kwargs):
+        return await run_in_pool(
+            self.dispatch_and_render, request, *args, **kwargs
+        )
+
+
+class AsyncPostListView(AsyncViewMixin, views.PostListView):
+    pass
+
+
+class AsyncPostDetailView(AsyncViewMixin, views.PostDetailView):
+    pass
+
+
+class AsyncCategoryPostsView(AsyncViewMixin, views.CategoryPostsView):
+    pass
+
+
+class AsyncProfileView(AsyncViewMixin, views.ProfileView):
+    pass
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """Кэш страниц должен быть общим для всех процессов.
+
+    Сбросы приходят и из run_tasks, и из publish_scheduled, и из других
+    worker'ов веб-сервера; кэш в памяти процесса их не увидит.
+    """
+    if not settings.PAGE_CACHE_TIMEOUT:
+        return []
+    alias = settings.PAGE_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in LOCAL_BACKENDS:
+        return []
+    return [Error(
+        f'PAGE_CACHE_ALIAS = {alias!r} указывает на кэш {backend}, '
+        'который виден только своему процессу.',
+        hint='Укажите общий кэш (файлы, база, Redis, Memcached) '
+             'или отключите кэш страниц: PAGE_CACHE_TIMEOUT = 0.',
+        id='blog.E001',
+    )]
@@ -0,0 +1,138 @@
+"""Кэшированные списки категорий и мест для PostForm.
+
+Поставщик (ChoiceProvider) хранит в общем кэше (CHOICES_CACHE_ALIAS) все
+объекты модели под ключом с версией; сигналы из blog.signals меняют
+версию при любом сохранении или удалении, и следующий запрос
+перечитывает список одним SELECT. Версия живёт не дольше
+CHOICES_VERSION_TIMEOUT секунд: queryset.update() сигналов не шлёт.
+Внутри процесса список держится, пока версия в кэше та же, поэтому
+форма не ходит в базу при отрисовке <select>.
+
+Для автодополнения поставщик строит префиксный индекс: отсортированный
+список (слово, номер объекта) по началу каждого слова названия; поиск —
+двоичный, без перебора всех строк.
+"""
+import bisect
+import copy
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Category, Location
+
+VERSION_PREFIX = 'choices:version:'
+OBJECTS_PREFIX = 'choices:objects:'
+WORD_RE = re.compile(r'\w+')
+
+
+def get_cache():
+    return caches[settings.CHOICES_CACHE_ALIAS]
+
+
+class ChoiceProvider:
+
+    def __init__(self, name, model, ordering):
+        self.name = name
+        self.model = model
+        self.ordering = ordering
+        self._lock = threading.Lock()
+        self._local = None
+
+    @property
+    def version_key(self):
+        return VERSION_PREFIX + self.name
+
+    def version(self):
+        cache = get_cache()
+        version = cache.get(self.version_key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(self.version_key, version,
+                             settings.CHOICES_VERSION_TIMEOUT):
+                version = cache.get(self.version_key, version)
+        return version
+
+    def invalidate(self):
+        """Новая версия сразу и ещё раз после коммита (как page_cache)."""
+        def bump():
+            get_cache().set(
+                self.version_key, time.time_ns(),
+                settings.CHOICES_VERSION_TIMEOUT,
+            )
+            self._local = None
+
+        bump()
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def words(label):
+        # Название целиком («санкт-пет…») и каждое слово («петер…»).
+        label = label.lower()
+        return {label, *WORD_RE.findall(label)}
+
+    def _load(self, version):
+        cache = get_cache()
+        key = f'{OBJECTS_PREFIX}{self.name}:{version}'
+        objects = cache.get(key)
+        if objects is None:
+            objects = list(
+                self.model._default_manager.order_by(*self.ordering)
+            )
+            cache.set(key, objects, settings.CHOICES_CACHE_TIMEOUT)
+        by_pk = {str(obj.pk): obj for obj in objects}
+        index = sorted(
+            (word, position)
+            for position, obj in enumerate(objects)
+            for word in self.words(str(obj))
+        )
+        return version, objects, by_pk, index
+
+    def _state(self):
+        version = self.version()
+        local = self._local
+        if local is None or local[0] != version:
+            with self._lock:
+                local = self._local
+                if local is None or local[0] != version:
+                    local = self._local = self._load(version)
+        return local
+
+    def objects(self):
+        return self._state()[1]
+
+    def get(self, pk):
+        """Копия объекта по pk или None."""
+        obj = self._state()[2].get(str(pk))
+        return copy.copy(obj) if obj is not None else None
+
+    def complete(self, prefix, limit):
+        """Объекты, у которых какое-то слово названия начинается с prefix."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        _, objects, _, index = self._state()
+        start = bisect.bisect_left(index, (prefix,))
+        positions = set()
+        for offset in range(start, len(index)):
+            word, position = index[offset]
+            if not word.startswith(prefix):
+                break
+            positions.add(position)
+        return [objects[position] for position in sorted(positions)[:limit]]
+
+
+PROVIDERS = {
+    'category': ChoiceProvider('category', Category, ('title', 'pk')),
+    'location': ChoiceProvider('location', Location, ('name', 'pk')),
+}
+
+
+def provider_for(model):
+    for provider in PROVIDERS.values():
+        if provider.model is model:
+            return provider
+    raise LookupError(f'Нет кэшированного списка для {model.__name__}')
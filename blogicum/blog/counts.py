@@ -0,0 +1,42 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import page_cache
+
+logger = logging.getLogger('blog.counts')
+
+CACHED = 'cache'
+COUNTED = 'query'
+
+COUNT_PREFIX = 'listing-count:'
+
+
+def get_count(queryset, scope=None):
+    """Число записей списка и способ, которым оно получено.
+
+    scope — пара (тег списка, вариант), например ('profile:5', 'all').
+    Тег тот же, что у кэша страниц: сигналы сбрасывают его при каждом
+    изменении состава списка, так что закэшированное число не отстаёт.
+    LISTING_COUNT_TIMEOUT ограничивает устаревание, если сигнал потерян.
+    """
+    if scope is None or not settings.LISTING_COUNT_TIMEOUT:
+        return queryset.order_by().count(), COUNTED
+
+    tag, variant = scope
+    key = f'{COUNT_PREFIX}{tag}:{variant}'
+    cache = page_cache.get_cache()
+    cached = cache.get_many([key, page_cache.tag_key(tag)])
+    if key in cached:
+        counted_at, value = cached[key]
+        if page_cache.is_fresh(cached, [tag], counted_at):
+            logger.debug('%s: %s из кэша', key, value)
+            return value, CACHED
+
+    counted_at = time.time()
+    value = queryset.order_by().count()
+    page_cache.ensure_tags([tag])
+    cache.set(key, (counted_at, value), settings.LISTING_COUNT_TIMEOUT)
+    logger.debug('%s: %s посчитано запросом', key, value)
+    return value, COUNTED
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from blog.db_pool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    """PostgreSQL (psycopg2) с пулом соединений (blog.db_pool)."""
@@ -0,0 +1,12 @@
+from django.db.backends.sqlite3 import base
+
+from blog.db_pool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    """SQLite с пулом соединений (blog.db_pool)."""
+
+    def uses_pool(self):
+        # База в памяти живёт, пока открыто соединение; Django её не
+        # закрывает, пул тут не нужен.
+        return not self.is_in_memory_db()
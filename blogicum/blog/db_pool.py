@@ -0,0 +1,252 @@
+"""Пул соединений с базой для бэкендов blog.db_backends.
+
+Django 3.2 открывает соединение на каждый запрос (CONN_MAX_AGE = 0) и
+закрывает его в request_finished. Пуловые бэкенды вместо этого берут
+«сырое» соединение из пула и возвращают его туда при закрытии. Перед
+повторной выдачей соединение проверяется запросом SELECT 1; слишком
+старые (MAX_LIFETIME) и давно простаивающие (MAX_IDLE) закрываются.
+Не больше MAX_SIZE соединений на пул; остальные ждут до TIMEOUT секунд.
+
+Настройки — ключ POOL в DATABASES[alias]; пул свой у каждой пары
+(алиас, имя базы).
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger('blog.db_pool')
+
+DEFAULTS = {
+    'MAX_SIZE': 10,
+    'MAX_LIFETIME': 1800,
+    'MAX_IDLE': 300,
+    'TIMEOUT': 10,
+}
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+
+    def __init__(self, name, max_size, max_lifetime, max_idle, timeout):
+        self.name = name
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._born = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.opened = 0
+        self.reused = 0
+        self.evicted = 0
+        self.unhealthy = 0
+
+    def _expired(self, raw, now, last_used=None):
+        if now - self._born[id(raw)] > self.max_lifetime:
+            return True
+        return last_used is not None and now - last_used > self.max_idle
+
+    def _drop(self, raw):
+        # Вызывается под self._condition.
+        self._born.pop(id(raw), None)
+        self._size -= 1
+        self._condition.notify()
+        try:
+            raw.close()
+        except Exception:
+            logger.debug('Ошибка при закрытии соединения', exc_info=True)
+
+    @staticmethod
+    def is_healthy(raw):
+        if getattr(raw, 'closed', False):
+            return False
+        try:
+            cursor = raw.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _reserve(self, deadline, waited):
+        """Под блокировкой: простаивающее соединение или место под новое."""
+        while True:
+            now = time.monotonic()
+            while self._idle:
+                raw, last_used = self._idle.pop()
+                if not self._expired(raw, now, last_used):
+                    return raw, waited
+                self.evicted += 1
+                self._drop(raw)
+            if self._size < self.max_size:
+                self._size += 1
+                return None, waited
+            if not waited:
+                waited = True
+                self.waits += 1
+            remaining = deadline - now
+            if remaining <= 0 or not self._condition.wait(remaining):
+                raise PoolTimeout(
+                    f'Пул {self.name}: все {self.max_size} соединений '
+                    f'заняты дольше {self.timeout} с'
+                )
+
+    def checkout(self, connect):
+        """Возвращает (соединение, взято_из_пула)."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._condition:
+            self.checkouts += 1
+        while True:
+            with self._condition:
+                raw, waited = self._reserve(deadline, waited)
+            if raw is None:
+                break
+            # Проверка — запрос к базе, поэтому вне блокировки.
+            if self.is_healthy(raw):
+                with self._condition:
+                    self.reused += 1
+                return raw, True
+            with self._condition:
+                self.unhealthy += 1
+                self._drop(raw)
+        try:
+            raw = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.opened += 1
+            self._born[id(raw)] = time.monotonic()
+        return raw, False
+
+    def release(self, raw):
+        try:
+            # Незавершённая транзакция не должна достаться следующему.
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._condition:
+            now = time.monotonic()
+            if not healthy:
+                self.unhealthy += 1
+                self._drop(raw)
+            elif self._expired(raw, now):
+                self.evicted += 1
+                self._drop(raw)
+            else:
+                self._idle.append((raw, now))
+                self._condition.notify()
+            self._evict_idle(now)
+
+    def discard(self, raw):
+        with self._condition:
+            self._drop(raw)
+
+    def _evict_idle(self, now):
+        keep = []
+        for raw, last_used in self._idle:
+            if self._expired(raw, now, last_used):
+                self.evicted += 1
+                self._drop(raw)
+            else:
+                keep.append((raw, last_used))
+        self._idle = keep
+
+    def close(self):
+        with self._condition:
+            while self._idle:
+                self._drop(self._idle.pop()[0])
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'opened': self.opened,
+                'reused': self.reused,
+                'evicted': self.evicted,
+                'unhealthy': self.unhealthy,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    key = (alias, str(settings_dict['NAME']))
+    with _pools_lock:
+        if key not in _pools:
+            options = {**DEFAULTS, **settings_dict.get('POOL', {})}
+            _pools[key] = ConnectionPool(
+                f'{alias}:{key[1]}',
+                max_size=options['MAX_SIZE'],
+                max_lifetime=options['MAX_LIFETIME'],
+                max_idle=options['MAX_IDLE'],
+                timeout=options['TIMEOUT'],
+            )
+        return _pools[key]
+
+
+def all_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def close_all():
+    """Закрывает простаивающие соединения всех пулов."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseMixin:
+    """Примесь к DatabaseWrapper: соединения берутся из пула.
+
+    pool_reused — соединение уже было настроено (PRAGMA, часовой пояс)
+    при первой выдаче; обработчики connection_created могут это учесть.
+    """
+
+    pool_reused = False
+
+    def uses_pool(self):
+        return True
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        if not self.uses_pool():
+            return super().get_new_connection(conn_params)
+        raw, self.pool_reused = self.get_pool().checkout(
+            lambda: super(PooledDatabaseMixin, self).get_new_connection(
+                conn_params
+            )
+        )
+        return raw
+
+    def _close(self):
+        if self.connection is None or not self.uses_pool():
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django оставит ссылку на соединение до конца блока —
+                # отдавать его другому потоку нельзя.
+                self.get_pool().discard(self.connection)
+            else:
+                self.get_pool().release(self.connection)
@@ -0,0 +1,109 @@
+from django.db.models import F, Max
+from django.utils.text import Truncator
+
+from .models import FeedEntry, Post
+
+EXCERPT_WORDS = 30
+
+# Каждое изменение карточки увеличивает FeedEntry.version — по ней
+# шаблоны ищут готовый фрагмент в кэше (см. blog.fragments).
+NEXT_VERSION = F('version') + 1
+
+
+def make_excerpt(text):
+    # То же, что фильтр truncatewords:30 в шаблонах карточек.
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def entry_fields(post, with_comment_count=True):
+    category = post.category
+    location = post.location
+    fields = {
+        'title': post.title,
+        'excerpt': make_excerpt(post.text),
+        'pub_date': post.pub_date,
+        'image': post.image.name or '',
+        'image_meta': post.image_meta,
+        'author_id': post.author_id,
+        'author_username': post.author.username,
+        'category_id': post.category_id,
+        'category_title': category.title if category else '',
+        'location_id': post.location_id,
+        'location_name': location.name if location else '',
+        'is_listed': post.is_visible,
+    }
+    # Счётчик в карточке меняет только adjust_comment_count(): у
+    # сохраняемого поста значение в памяти может быть устаревшим.
+    if with_comment_count:
+        fields['comment_count'] = post.comment_count
+    return fields
+
+
+def build_entry(post):
+    return FeedEntry(post_id=post.pk, **entry_fields(post))
+
+
+def sync_post(post):
+    fields = entry_fields(post, with_comment_count=False)
+    updated = FeedEntry.objects.filter(post_id=post.pk).update(
+        version=NEXT_VERSION, **fields
+    )
+    if not updated:
+        FeedEntry.objects.create(post_id=post.pk, **entry_fields(post))
+
+
+def adjust_comment_count(post_id, delta):
+    FeedEntry.objects.filter(post_id=post_id).update(
+        comment_count=F('comment_count') + delta, version=NEXT_VERSION
+    )
+
+
+def sync_category(category):
+    FeedEntry.objects.filter(category=category).exclude(
+        category_title=category.title
+    ).update(category_title=category.title, version=NEXT_VERSION)
+
+
+def detach_category(category):
+    FeedEntry.objects.filter(category=category).update(
+        category=None, category_title='', is_listed=False,
+        version=NEXT_VERSION
+    )
+
+
+def sync_location(location):
+    FeedEntry.objects.filter(location=location).update(
+        location_name=location.name, version=NEXT_VERSION
+    )
+
+
+def detach_location(location):
+    FeedEntry.objects.filter(location=location).update(
+        location=None, location_name='', version=NEXT_VERSION
+    )
+
+
+def sync_author(user):
+    FeedEntry.objects.filter(author=user).exclude(
+        author_username=user.username
+    ).update(author_username=user.username, version=NEXT_VERSION)
+
+
+def rebuild(batch_size=500):
+    # Новые версии выше всех старых, чтобы не совпасть с ключами
+    # фрагментов, которые ещё лежат в кэше.
+    version = (FeedEntry.objects.aggregate(v=Max('version'))['v'] or 0) + 1
+    FeedEntry.objects.all().delete()
+    posts = Post.objects.with_related().order_by('pk')
+    batch = []
+    created = 0
+    for post in posts.iterator(chunk_size=batch_size):
+        entry = build_entry(post)
+        entry.version = version
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            FeedEntry.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    FeedEntry.objects.bulk_create(batch)
+    return created + len(batch)
@@ -1,5 +1,145 @@
 from django import forms
-from .models import Post, Comment
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from PIL import Image
+
+from . import choices, images
+from .models import Category, Comment, Post
+
+# Поле поиска перед <select>: варианты подгружаются по мере ввода.
+AUTOCOMPLETE_SCRIPT = """<script>
+(function (select) {
+    var input = document.createElement('input');
+    var timer = null;
+    input.type = 'search';
+    input.placeholder = 'Начните вводить название';
+    select.parentNode.insertBefore(input, select);
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            var url = select.dataset.autocomplete + '?q=' +
+                encodeURIComponent(input.value);
+            fetch(url, {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    var keep = select.value;
+                    Array.from(select.options).forEach(function (option) {
+                        if (option.value && option.value !== keep) {
+                            option.remove();
+                        }
+                    });
+                    data.results.forEach(function (item) {
+                        if (String(item.id) !== keep) {
+                            select.add(new Option(item.text, item.id));
+                        }
+                    });
+                });
+        }, 200);
+    });
+})(document.currentScript.previousElementSibling);
+</script>"""
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.provider.objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return (len(self.field.provider.objects())
+                + (self.field.empty_label is not None))
+
+    def __bool__(self):
+        return (self.field.empty_label is not None
+                or bool(self.field.provider.objects()))
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField со списком из blog.choices вместо запроса к базе."""
+
+    iterator = CachedChoiceIterator
+
+    @property
+    def provider(self):
+        return choices.provider_for(self.queryset.model)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        obj = self.provider.get(value)
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
+
+class ProbedImageField(forms.ImageField):
+    """ImageField без полного декодирования: проверка по заголовку.
+
+    Стандартное поле вызывает Image.verify() на всём файле; здесь
+    формат, размер и число точек читаются blog.images.probe.
+    """
+
+    def to_python(self, data):
+        file = forms.FileField.to_python(self, data)
+        if file is None:
+            return None
+        image_format, _, _ = images.probe(file)
+        if hasattr(file, 'content_type'):
+            file.content_type = Image.MIME.get(image_format)
+        return file
+
+
+class AutocompleteSelect(forms.Select):
+    """<select>, который при длинном списке выводит лишь выбранный вариант.
+
+    Порог — CHOICES_SELECT_LIMIT; остальные варианты подгружаются
+    с blog:autocomplete по мере ввода.
+    """
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def is_large(self):
+        return len(self.choices) > settings.CHOICES_SELECT_LIMIT
+
+    def optgroups(self, name, value, attrs=None):
+        if not self.is_large():
+            return super().optgroups(name, value, attrs)
+        all_choices = self.choices
+        selected = {str(v) for v in value}
+        self.choices = [
+            (option, label) for option, label in all_choices
+            if option == '' or str(option) in selected
+        ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+
+    def render(self, name, value, attrs=None, renderer=None):
+        if not self.is_large():
+            return super().render(name, value, attrs, renderer)
+        attrs = {
+            **(attrs or {}),
+            'data-autocomplete': reverse(
+                'blog:autocomplete', args=[self.kind]
+            ),
+        }
+        html = super().render(name, value, attrs, renderer)
+        return html + mark_safe(AUTOCOMPLETE_SCRIPT)
 
 
 class PostForm(forms.ModelForm):
@@ -7,7 +147,14 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ['title', 'text', 'pub_date', 'category', 'location',
                   'image']
+        field_classes = {
+            'category': CachedModelChoiceField,
+            'location': CachedModelChoiceField,
+            'image': ProbedImageField,
+        }
         widgets = {
+            'category': AutocompleteSelect('category'),
+            'location': AutocompleteSelect('location'),
             'pub_date': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'}
             ),
@@ -24,6 +171,31 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение',
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        category = cleaned_data.get('category')
+        if category is not None:
+            # Копия из кэша могла устареть, а от флага зависит is_visible.
+            published = Category.objects.filter(
+                pk=category.pk
+            ).values_list('is_published', flat=True).first()
+            if published is None:
+                self.add_error('category', ValidationError(
+                    self.fields['category'].error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': category.pk},
+                ))
+            else:
+                category.is_published = published
+        return cleaned_data
+
+    def _get_validation_exclusions(self):
+        # Существование категории и места уже проверено по кэшу
+        # (CachedModelChoiceField); повторный SELECT в full_clean не нужен.
+        return [
+            *super()._get_validation_exclusions(), 'category', 'location'
+        ]
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+
+KEY_PREFIX = 'fragment:'
+STATS_PREFIX = 'fragment-stats:'
+
+# Имена фрагментов из {% cachefragment %}, по которым ведётся статистика.
+FRAGMENTS = ('index-card', 'category-card', 'profile-card', 'comment')
+
+
+def get_cache():
+    # Как и встроенный тег {% cache %}: отдельный кэш, если он настроен.
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def make_key(name, obj, vary_on=()):
+    """Ключ фрагмента: имя, объект и его версия, плюс значения vary_on.
+
+    vary_on нужен для данных связанных объектов, которые не меняют
+    версию самого объекта (например, имя автора комментария).
+    """
+    vary = hashlib.md5(
+        ':'.join(str(value) for value in vary_on).encode()
+    ).hexdigest()
+    return (f'{KEY_PREFIX}{name}:{obj._meta.label_lower}:{obj.pk}:'
+            f'v{obj.version}:{vary}')
+
+
+def _stats_key(name, outcome):
+    return f'{STATS_PREFIX}{name}:{outcome}'
+
+
+# Попадания и промахи копятся в памяти процесса и пишутся в кэш в конце
+# запроса (blog.signals, request_finished): по одному incr на счётчик,
+# а не по два обращения к кэшу на каждую карточку.
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+
+def record(name, hit):
+    with _pending_lock:
+        _pending[_stats_key(name, 'hits' if hit else 'misses')] += 1
+
+
+def flush():
+    """Переносит накопленные счётчики в кэш."""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    cache = get_cache()
+    for key, count in pending.items():
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, timeout=None):
+                try:
+                    cache.incr(key, count)
+                except ValueError:
+                    # Ключ вытеснен между add() и incr() — теряем пачку.
+                    pass
+
+
+def render(name, obj, vary_on, render_fragment):
+    cache = get_cache()
+    key = make_key(name, obj, vary_on)
+    content = cache.get(key)
+    record(name, hit=content is not None)
+    if content is None:
+        content = render_fragment()
+        cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+    return content
+
+
+def stats(names=FRAGMENTS):
+    """{имя: (попадания, промахи, доля попаданий)}."""
+    flush()
+    keys = [_stats_key(name, outcome)
+            for name in names for outcome in ('hits', 'misses')]
+    counters = get_cache().get_many(keys)
+    result = {}
+    for name in names:
+        hits = counters.get(_stats_key(name, 'hits'), 0)
+        misses = counters.get(_stats_key(name, 'misses'), 0)
+        total = hits + misses
+        result[name] = (hits, misses, hits / total if total else 0.0)
+    return result
+
+
+def reset_stats(names=FRAGMENTS):
+    flush()
+    get_cache().delete_many(
+        [_stats_key(name, outcome)
+         for name in names for outcome in ('hits', 'misses')]
+    )
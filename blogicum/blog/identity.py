@@ -0,0 +1,129 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Model
+from django.http import Http404
+
+logger = logging.getLogger('blog.identity')
+
+
+class IdentityMap:
+    """Объекты, уже загруженные в рамках одного HTTP-запроса.
+
+    Ключ — модель, условие WHERE набора и условие поиска (slug=...,
+    username=..., pk=...). Загруженный объект дополнительно
+    регистрируется под своим pk без условия набора: объект из
+    отфильтрованного набора годится для поиска по всей таблице, но не
+    наоборот — поиск через отфильтрованный набор (published_posts() и
+    т. п.) берёт из карты только то, что загружено с тем же фильтром.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self._objects = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model, lookup, scope=()):
+        items = (('pk' if name == 'id' else name, value)
+                 for name, value in lookup.items())
+        return model._meta.label_lower, scope, tuple(sorted(items))
+
+    @staticmethod
+    def _scope(queryset):
+        """Условие WHERE набора; () — набор без фильтров."""
+        query = queryset.query
+        if not query.where:
+            return ()
+        try:
+            sql, params = query.get_compiler(queryset.db).compile(query.where)
+        except EmptyResultSet:
+            # Пустой набор: ключ, который никогда не совпадёт.
+            return (object(),)
+        return sql, tuple(repr(param) for param in params)
+
+    def add(self, obj, scope=(), **lookup):
+        model = obj._meta.model
+        self._objects[self._key(model, {'pk': obj.pk})] = obj
+        if lookup:
+            self._objects[self._key(model, lookup, scope)] = obj
+        return obj
+
+    def _from_request_user(self, model, lookup):
+        user = getattr(self.request, 'user', None)
+        if (model is not get_user_model() or user is None
+                or not user.is_authenticated):
+            return None
+        if all(getattr(user, name) == value for name, value in lookup.items()):
+            return user
+        return None
+
+    def get_or_404(self, model_or_queryset, **lookup):
+        if isinstance(model_or_queryset, type) and issubclass(
+                model_or_queryset, Model):
+            queryset = model_or_queryset._default_manager.all()
+        else:
+            queryset = model_or_queryset
+        model = queryset.model
+        scope = self._scope(queryset)
+        key = self._key(model, lookup, scope)
+
+        if key in self._objects:
+            self.hits += 1
+            return self._objects[key]
+
+        obj = self._from_request_user(model, lookup) if not scope else None
+        if obj is not None:
+            self.hits += 1
+            return self.add(obj, **lookup)
+
+        self.misses += 1
+        try:
+            obj = queryset.get(**lookup)
+        except model.DoesNotExist:
+            raise Http404(
+                f'{model._meta.object_name} не найден: {lookup}'
+            )
+        return self.add(obj, scope, **lookup)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def identity_map(request):
+    if not hasattr(request, '_identity_map'):
+        request._identity_map = IdentityMap(request)
+    return request._identity_map
+
+
+class IdentityMapMiddleware:
+    """При DEBUG сообщает статистику карты: заголовок X-Identity-Map и лог."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.report(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.report(request, await self.get_response(request))
+
+    def report(self, request, response):
+        if settings.DEBUG and hasattr(request, '_identity_map'):
+            stats = request._identity_map.stats()
+            response['X-Identity-Map'] = (
+                'hits={hits}; misses={misses}'.format(**stats)
+            )
+            logger.debug('%s %s: %s', request.method, request.path, stats)
+        return response
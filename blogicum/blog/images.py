@@ -0,0 +1,301 @@
+"""Уменьшенные копии картинок постов.
+
+При сохранении поста с новой картинкой (blog.signals) строятся копии
+фиксированных размеров из IMAGE_DERIVATIVES — обычная и двойной
+плотности для retina, в JPEG и WebP. Ориентация из EXIF применяется к
+пикселям, сами метаданные (в том числе GPS) в копии не попадают;
+оригинал с EXIF перезаписывается без них.
+
+Итог — словарь Post.image_meta: размеры оригинала, имя файла-источника
+и список копий по видам. Шаблонный тег {% post_image %} строит по нему
+<picture> со srcset. Для уже загруженных картинок — команда
+build_image_derivatives.
+
+Оригиналы лежат в хранилище по хэшу (blog.storage), поэтому один файл
+может принадлежать нескольким постам: копии для него строятся один раз,
+а удаляются вместе с файлом, когда на него не ссылается ни один пост
+(release). Загрузку заранее проверяет probe — только по заголовку.
+"""
+import logging
+import os
+import posixpath
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import page_cache
+from .models import FeedEntry
+
+logger = logging.getLogger('blog.images')
+
+# Вид → (ширина, высота, обрезать под пропорции). Высота 0 — по ширине.
+DERIVATIVE_SIZES = {
+    'card': (400, 225, True),
+    'detail': (800, 0, False),
+}
+SCALES = (1, 2)
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True,
+                             'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+DERIVATIVES_DIR = 'derivatives'
+EXIF_ORIENTATION = 0x0112
+UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def probe(file):
+    """(формат, ширина, высота) по заголовку файла, без декодирования.
+
+    Отклоняет не картинки, файлы больше IMAGE_MAX_BYTES и картинки,
+    которые распакуются больше чем в IMAGE_MAX_PIXELS точек.
+    """
+    if file.size > settings.IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ.',
+            code='file_too_large',
+            params={'limit': settings.IMAGE_MAX_BYTES // (1024 * 1024)},
+        )
+    file.seek(0)
+    try:
+        # Image.open читает только заголовок; пиксели не декодируются.
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        width = height = None
+    except (OSError, UnidentifiedImageError, SyntaxError):
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+    finally:
+        file.seek(0)
+    if width is None or width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое изображение: не больше %(limit)s точек.',
+            code='image_too_large',
+            params={'limit': settings.IMAGE_MAX_PIXELS},
+        )
+    if image_format not in UPLOAD_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только JPEG, PNG, GIF и WebP.',
+            code='invalid_image_format',
+        )
+    return image_format, width, height
+
+
+def derivative_name(source, kind, scale, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    suffix = '' if scale == 1 else f'-{scale}x'
+    return posixpath.join(
+        directory, DERIVATIVES_DIR, f'{stem}-{kind}{suffix}.{extension}'
+    )
+
+
+def normalize(image):
+    """Поворот по EXIF и RGB без прозрачности (для JPEG)."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def target_size(source_size, width, height, scale):
+    """Размер копии или None, если для неё не хватает пикселей."""
+    source_width, source_height = source_size
+    width, height = width * scale, height * scale
+    if not height:
+        height = round(source_height * width / source_width)
+    if width > source_width or height > source_height:
+        if scale > 1:
+            return None
+        # Обычную копию маленького оригинала не растягиваем.
+        ratio = min(source_width / width, source_height / height)
+        width, height = int(width * ratio), int(height * ratio)
+    return max(width, 1), max(height, 1)
+
+
+def resize(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    return image.resize(size, Image.LANCZOS)
+
+
+def encode(image, image_format):
+    pil_format, _, options = FORMATS[image_format]
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def strip_original(storage, name, image):
+    """Перезаписывает оригинал без EXIF и с применённой ориентацией."""
+    pil_format = image.format
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    if not image.info.get('exif') and orientation == 1:
+        return name
+    clean = ImageOps.exif_transpose(image)
+    options = {'quality': 95} if pil_format == 'JPEG' else {}
+    buffer = BytesIO()
+    clean.save(buffer, pil_format, **options)
+    # Файл с EXIF удалит release, если на него никто не ссылается.
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build(storage, name):
+    """Строит копии для файла name; возвращает image_meta.
+
+    Копии пишутся в default_storage под именами от источника, а не
+    по хэшу, чтобы их можно было удалить вместе с ним.
+    """
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    new_name = strip_original(storage, name, image)
+    image = normalize(image)
+    meta = {
+        'source': new_name,
+        'width': image.width,
+        'height': image.height,
+        'variants': {},
+    }
+    if new_name != name:
+        meta['upload'] = name
+    for kind, (width, height, crop) in DERIVATIVE_SIZES.items():
+        variants = meta['variants'][kind] = []
+        for scale in SCALES:
+            size = target_size(image.size, width, height, scale)
+            if size is None:
+                continue
+            resized = resize(image, size, crop)
+            variant = {'scale': scale, 'width': size[0], 'height': size[1]}
+            for image_format, (_, extension, _) in FORMATS.items():
+                file_name = derivative_name(new_name, kind, scale, extension)
+                if default_storage.exists(file_name):
+                    default_storage.delete(file_name)
+                variant[image_format] = default_storage.save(
+                    file_name, ContentFile(encode(resized, image_format))
+                )
+            variants.append(variant)
+    return meta
+
+
+def variant_files(meta):
+    for variants in meta.get('variants', {}).values():
+        for variant in variants:
+            for image_format in FORMATS:
+                if variant.get(image_format):
+                    yield variant[image_format]
+
+
+def delete_derivatives(meta):
+    for name in variant_files(meta):
+        default_storage.delete(name)
+
+
+def shared_meta(model, pk, name):
+    """image_meta другого поста с тем же файлом или None."""
+    others = model.objects.exclude(pk=pk)
+    for lookup in ({'image': name}, {'image_meta__upload': name}):
+        meta = others.filter(**lookup).values_list(
+            'image_meta', flat=True
+        ).first()
+        if meta:
+            return meta
+    return None
+
+
+def release(models, storage, name, meta):
+    """Удаляет файл и его копии, если на файл не ссылается ни одна запись.
+
+    models — модели с копией имени файла в поле image: посты и карточки
+    ленты (FeedEntry), которые синхронизируются с постом отдельно.
+
+    Проверка и удаление идут под блокировкой хранилища, а повторная
+    загрузка того же содержимого под ней же обновляет mtime файла. Пост
+    с такой загрузкой виден в базе только после коммита, поэтому файл,
+    тронутый меньше IMAGE_RELEASE_GRACE секунд назад, не удаляется:
+    возвращается время, когда проверить снова. Иначе — None.
+    """
+    if not name:
+        return None
+    with storage_lock(storage, name):
+        if any(model.objects.filter(image=name).exists()
+               for model in models):
+            return None
+        try:
+            age = time.time() - os.stat(storage.path(name)).st_mtime
+        except FileNotFoundError:
+            age = settings.IMAGE_RELEASE_GRACE
+        if age < settings.IMAGE_RELEASE_GRACE:
+            return timezone.now() + timedelta(
+                seconds=settings.IMAGE_RELEASE_GRACE - age
+            )
+        delete_derivatives(meta)
+        storage.delete(name)
+    return None
+
+
+def storage_lock(storage, name):
+    lock = getattr(storage, 'lock', None)
+    return lock(name) if lock is not None else nullcontext()
+
+
+def process(post, force=False):
+    """Обновляет копии, если картинка поста сменилась; True — сменилась.
+
+    Файлы, оставшиеся без ссылок, удаляются после коммита: при откате
+    пост по-прежнему ссылается на старую картинку.
+    """
+    name = post.image.name or ''
+    old_meta = post.image_meta or {}
+    if name == old_meta.get('source', '') and not force:
+        return False
+    model = type(post)
+    storage = post.image.storage
+    meta = {}
+    if name:
+        meta = not force and shared_meta(model, post.pk, name)
+        if not meta:
+            try:
+                meta = build(storage, name)
+            except (OSError, UnidentifiedImageError,
+                    Image.DecompressionBombError):
+                logger.warning('Не удалось обработать картинку %s', name,
+                               exc_info=settings.DEBUG)
+                meta = {'source': name}
+    source = meta.get('source', '')
+    # Карточка поста изменилась: новая версия сбрасывает её фрагменты.
+    model.objects.filter(pk=post.pk).update(
+        image=source, image_meta=meta, version=F('version') + 1
+    )
+    post.image.name = source
+    post.image_meta = meta
+    post.refresh_from_db(fields=['version'])
+    page_cache.invalidate(
+        f'post:{post.pk}',
+        *page_cache.listing_tags(post.category_id, post.author_id)
+    )
+    # Прежняя картинка и загруженный файл с EXIF могли остаться без ссылок.
+    for stale_name, stale_meta in ((old_meta.get('source', ''), old_meta),
+                                   (name, {})):
+        if stale_name and stale_name != source:
+            transaction.on_commit(
+                partial(release, (model, FeedEntry), storage, stale_name,
+                        stale_meta)
+            )
+    return True
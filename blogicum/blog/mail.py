@@ -0,0 +1,40 @@
+"""Отправка писем через очередь.
+
+EMAIL_BACKEND = 'blog.mail.QueuedEmailBackend' только записывает письмо
+в OutgoingEmail (blog.outbox), и запрос не ждёт SMTP или запись файла;
+задача blog.tasks.send_outbox отправляет письма пачками через
+QUEUED_EMAIL_BACKEND.
+"""
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+
+FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+          'extra_headers', 'alternatives')
+
+
+def to_dict(message):
+    """Письмо в JSON-совместимом виде; вложения не поддерживаются."""
+    if message.attachments:
+        raise ValueError('Письма с вложениями через очередь не отправляются')
+    data = {field: getattr(message, field, None) for field in FIELDS}
+    data['alternatives'] = [list(item) for item in data['alternatives'] or ()]
+    return data
+
+
+def from_dict(data):
+    data = dict(data)
+    alternatives = [tuple(item) for item in data.pop('alternatives') or ()]
+    headers = data.pop('extra_headers')
+    return EmailMultiAlternatives(
+        headers=headers, alternatives=alternatives, **data
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        from . import outbox
+
+        for message in email_messages:
+            outbox.enqueue(message)
+        return len(email_messages)
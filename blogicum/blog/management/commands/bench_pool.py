@@ -0,0 +1,150 @@
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog import db_pool
+from blog.management.commands.bench_servers import wsgi_environ
+from blog.management.commands.bench_sqlite import Command as BenchSqlite
+
+ENGINES = (
+    ('без пула', 'django.db.backends.sqlite3'),
+    ('пул', 'blog.db_backends.sqlite3'),
+)
+
+
+def reconnect():
+    # Обёртка соединения создаётся заново по текущим DATABASES.
+    connections['default'].close()
+    del connections['default']
+
+
+class Command(BaseCommand):
+    help = ('Накладные расходы на соединение с базой: запросы к ленте '
+            '(blog:index) через WSGI со стандартным бэкендом SQLite, '
+            'который открывает соединение на каждый запрос, и с пулом '
+            '(blog.db_backends.sqlite3). Работает на временной копии схемы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--posts', type=int, default=50,
+            help='Сколько постов создать перед замером.',
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Заголовок Host; должен входить в ALLOWED_HOSTS.',
+        )
+        parser.add_argument(
+            '--connect-latency', type=float, default=0.0,
+            help=('Задержка на открытие соединения в мс: имитирует '
+                  'рукопожатие и аутентификацию сетевой СУБД.'),
+        )
+
+    def add_connect_latency(self, seconds):
+        def delay(sender, connection, **kwargs):
+            if not getattr(connection, 'pool_reused', False):
+                time.sleep(seconds)
+
+        connection_created.connect(delay, weak=False)
+        return delay
+
+    def run(self, path, total, concurrency):
+        handler = WSGIHandler()
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            if not getattr(connection, 'pool_reused', False):
+                opened.append(1)
+
+        def one(_):
+            statuses = []
+            started = time.perf_counter()
+            body = handler(
+                wsgi_environ(path, self.host),
+                lambda status, headers, exc_info=None: statuses.append(
+                    status
+                ),
+            )
+            b''.join(body)
+            body.close()
+            return int(statuses[0].split()[0]), time.perf_counter() - started
+
+        connection_created.connect(count, weak=False)
+        try:
+            # Свой пул потоков на каждый режим: соединения Django живут
+            # в потоке и создаются по текущему ENGINE.
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                started = time.perf_counter()
+                results = list(executor.map(one, range(total)))
+                elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count)
+        return results, elapsed, len(opened)
+
+    def report(self, label, results, elapsed, opened):
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(status != 200 for status, _ in results)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:<9} {len(results) / elapsed:8.1f} зап/с  '
+            f'p50 {statistics.median(latencies) * 1000:6.2f} мс  '
+            f'p95 {p95 * 1000:6.2f} мс  соединений открыто {opened:>5}  '
+            f'ошибок {errors}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан только на SQLite.')
+        self.host = options['host']
+        delay = None
+        if options['connect_latency']:
+            delay = self.add_connect_latency(options['connect_latency'] / 1000)
+
+        database = connections.databases['default']
+        original = dict(database)
+        workdir = Path(tempfile.mkdtemp(prefix='bench-pool-'))
+        try:
+            database['NAME'] = workdir / 'bench.sqlite3'
+            database['ENGINE'] = 'django.db.backends.sqlite3'
+            reconnect()
+            call_command('migrate', verbosity=0)
+            BenchSqlite().seed(options['posts'])
+            connection.close()
+            path = reverse('blog:index')
+            self.stdout.write(
+                f'GET {path}: {options["requests"]} запросов, '
+                f'{options["concurrency"]} клиентов'
+            )
+            for label, engine in ENGINES:
+                database['ENGINE'] = engine
+                reconnect()
+                with override_settings(PAGE_CACHE_TIMEOUT=0):
+                    results, elapsed, opened = self.run(
+                        path, options['requests'], options['concurrency']
+                    )
+                self.report(label, results, elapsed, opened)
+            pool_name = f'default:{database["NAME"]}'
+            self.stdout.write(
+                f'{label:<9} {db_pool.all_stats()[pool_name]}'
+            )
+        finally:
+            if delay is not None:
+                connection_created.disconnect(delay)
+            reconnect()
+            db_pool.close_all()
+            database.clear()
+            database.update(original)
+            reconnect()
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,173 @@
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+DEFAULT_PATHS = ('/', '/pages/about/')
+
+
+def wsgi_environ(path, host):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'HTTP_HOST': host,
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, host):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', host.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (host, 80),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность WSGI (пул потоков, как у '
+            'многопоточного сервера), ASGI с синхронными view и ASGI '
+            'с асинхронными view на одних и тех же страницах, без сети.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=DEFAULT_PATHS,
+            help='Пути страниц; по умолчанию лента и «О проекте».',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый путь.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Заголовок Host; должен входить в ALLOWED_HOSTS.',
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=0.0,
+            help=('Задержка на каждый SQL-запрос в мс: имитирует сетевую '
+                  'СУБД, где потоки ждут ввода-вывода.'),
+        )
+        parser.add_argument(
+            '--page-cache', action='store_true',
+            help='Не отключать кэш страниц для анонимов.',
+        )
+
+    def run_wsgi(self, path, total, concurrency):
+        handler = WSGIHandler()
+
+        def one():
+            statuses = []
+            started = time.perf_counter()
+            body = handler(
+                wsgi_environ(path, self.host),
+                lambda status, headers, exc_info=None: statuses.append(
+                    status
+                ),
+            )
+            b''.join(body)
+            body.close()
+            return int(statuses[0].split()[0]), time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda _: one(), range(total)))
+
+    async def run_asgi(self, path, total, concurrency):
+        handler = ASGIHandler()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with limit:
+                status = []
+                started = time.perf_counter()
+
+                async def receive():
+                    return {'type': 'http.request', 'body': b''}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        status.append(message['status'])
+
+                await handler(asgi_scope(path, self.host), receive, send)
+                return status[0], time.perf_counter() - started
+
+        return await asyncio.gather(*(one() for _ in range(total)))
+
+    def report(self, label, path, results, elapsed):
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(status != 200 for status, _ in results)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:<9} {path:<20} {len(results) / elapsed:8.1f} зап/с  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} мс  '
+            f'p95 {p95 * 1000:7.1f} мс  ошибок {errors}'
+        )
+
+    def add_db_latency(self, seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        connection_created.connect(install, weak=False)
+
+    def handle(self, *args, **options):
+        if options['db_latency']:
+            self.add_db_latency(options['db_latency'] / 1000)
+        self.host = options['host']
+        total = options['requests']
+        concurrency = options['concurrency']
+        overrides = {} if options['page_cache'] else {'PAGE_CACHE_TIMEOUT': 0}
+        self.stdout.write(
+            f'{total} запросов на путь, {concurrency} клиентов'
+        )
+        runs = (
+            ('WSGI', 'blogicum.urls', False),
+            ('ASGI/sync', 'blogicum.urls', True),
+            ('ASGI', 'blogicum.urls_async', True),
+        )
+        for path in options['paths']:
+            for label, urlconf, is_asgi in runs:
+                with override_settings(ROOT_URLCONF=urlconf, **overrides):
+                    started = time.perf_counter()
+                    if is_asgi:
+                        results = asyncio.run(
+                            self.run_asgi(path, total, concurrency)
+                        )
+                    else:
+                        results = self.run_wsgi(path, total, concurrency)
+                    self.report(
+                        label, path, results, time.perf_counter() - started
+                    )
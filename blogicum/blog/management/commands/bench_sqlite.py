@@ -0,0 +1,162 @@
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from blog import db_pool, feed
+from blog.write_queue import WriteQueue
+from blog.models import Category, Comment, FeedEntry, Post
+
+User = get_user_model()
+
+# «До»: режимы SQLite по умолчанию и busy_timeout, как у sqlite3.connect().
+STOCK_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+}
+
+
+class Command(BaseCommand):
+    help = ('Смешанная нагрузка на SQLite: потоки-писатели добавляют '
+            'комментарии, потоки-читатели листают ленту. Сравнивает режимы '
+            'SQLite по умолчанию и settings.SQLITE_PRAGMAS на временной '
+            'копии схемы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument(
+            '--posts', type=int, default=200,
+            help='Сколько постов создать перед замером.',
+        )
+        parser.add_argument(
+            '--write-queue', action='store_true',
+            help=('Добавить прогон, где запись идёт через очередь '
+                  'с одним писателем (blog.write_queue).'),
+        )
+
+    def seed(self, posts):
+        author = User.objects.create(username='bench')
+        category = Category.objects.create(title='Bench', slug='bench')
+        now = timezone.now()
+        Post.objects.bulk_create(
+            Post(
+                title=f'Пост {i}', text='Текст ' * 50, author=author,
+                category=category, pub_date=now, is_visible=True,
+            )
+            for i in range(posts)
+        )
+        feed.rebuild()
+        return author, list(Post.objects.values_list('pk', flat=True)[:20])
+
+    def worker(self, stop, action, stats):
+        latencies, errors = [], 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                action()
+            except OperationalError:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        connection.close()
+        stats.append((latencies, errors))
+
+    def run(self, seconds, readers, writers, author, post_ids,
+            write_queue=None):
+        def read():
+            list(FeedEntry.objects.listed().order_by('-pub_date')[:10])
+
+        def add_comment():
+            Comment.objects.create(
+                post_id=post_ids[time.monotonic_ns() % len(post_ids)],
+                author=author, text='Комментарий',
+            )
+
+        def write():
+            if write_queue is None:
+                add_comment()
+            else:
+                write_queue.submit(add_comment).result()
+
+        reads, writes = [], []
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self.worker, args=(stop, read, reads))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=self.worker, args=(stop, write, writes))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return reads, writes
+
+    def report(self, label, kind, stats, seconds):
+        latencies = sorted(x for chunk, _ in stats for x in chunk)
+        errors = sum(errors for _, errors in stats)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        median = statistics.median(latencies) if latencies else 0
+        self.stdout.write(
+            f'{label:<8} {kind:<7} {len(latencies) / seconds:9.1f} оп/с  '
+            f'p50 {median * 1000:7.2f} мс  p95 {p95 * 1000:7.2f} мс  '
+            f'locked {errors}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан только на SQLite.')
+
+        database = connections.databases['default']
+        original_name = database['NAME']
+        workdir = Path(tempfile.mkdtemp(prefix='bench-sqlite-'))
+        configs = [
+            ('до', STOCK_PRAGMAS, None),
+            ('после', settings.SQLITE_PRAGMAS, None),
+        ]
+        if options['write_queue']:
+            configs.append((
+                'очередь', settings.SQLITE_PRAGMAS,
+                WriteQueue(
+                    settings.WRITE_QUEUE_BATCH_SIZE,
+                    settings.WRITE_QUEUE_BATCH_MS
+                ),
+            ))
+        try:
+            for label, pragmas, write_queue in configs:
+                connection.close()
+                # Новый файл на каждый режим: journal_mode хранится в базе.
+                database['NAME'] = workdir / f'{label}.sqlite3'
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    call_command('migrate', verbosity=0)
+                    author, post_ids = self.seed(options['posts'])
+                    reads, writes = self.run(
+                        options['seconds'], options['readers'],
+                        options['writers'], author, post_ids, write_queue,
+                    )
+                    connection.close()
+                self.report(label, 'чтение', reads, options['seconds'])
+                self.report(label, 'запись', writes, options['seconds'])
+                if write_queue is not None:
+                    self.stdout.write(f'{label:<8} {write_queue.stats()}')
+        finally:
+            connection.close()
+            db_pool.close_all()
+            database['NAME'] = original_name
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from blog import tasks
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Строит уменьшенные копии картинок постов (blog.images) для '
+            'постов, у которых их ещё нет или картинка сменилась.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересобрать копии всех картинок.',
+        )
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').values_list('pk', flat=True)
+        processed = 0
+        for post_id in post_ids.iterator():
+            if tasks.process_post_image(post_id, force=options['force']):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}'
+        ))
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from blog.models import Category, Post
+from blog.paginators import NEXT, PREVIOUS
+from blog.views import CategoryPostsView, PostListView, ProfileView
+
+User = get_user_model()
+
+BAD_PLAN_MARKERS = ('USE TEMP B-TREE',)
+
+
+def is_bad_step(detail):
+    if any(marker in detail for marker in BAD_PLAN_MARKERS):
+        return True
+    # «SCAN t» — полный проход таблицы. «SCAN t USING INDEX» — обход
+    # частичного индекса в порядке ORDER BY, который LIMIT обрывает
+    # на первой странице; SCAN CONSTANT ROW безвреден.
+    if not detail.startswith('SCAN ') or 'CONSTANT ROW' in detail:
+        return False
+    return ' USING ' not in detail
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN QUERY PLAN для запросов лент и падает, '
+            'если план содержит полный проход таблицы или сортировку '
+            'во временном B-дереве.')
+
+    def view_querysets(self, view_class, user=None, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user or AnonymousUser()
+        view = view_class()
+        view.setup(request, **kwargs)
+        paginator = view.get_keyset_paginator(
+            view.get_queryset(), view.paginate_by
+        )
+        cursor_values = [timezone.now(), 0]
+        yield 'первая страница', paginator.page_queryset()
+        yield 'курсор вперёд', paginator.page_queryset(NEXT, cursor_values)
+        yield 'курсор назад', paginator.page_queryset(
+            PREVIOUS, cursor_values
+        )
+
+    def cases(self):
+        yield 'blog:index', self.view_querysets(PostListView)
+
+        category = Category.objects.filter(is_published=True).first()
+        if category is None:
+            self.stdout.write('blog:category пропущен: нет категорий.')
+        else:
+            yield 'blog:category', self.view_querysets(
+                CategoryPostsView, category_slug=category.slug
+            )
+
+        author = User.objects.first()
+        if author is None:
+            self.stdout.write('blog:profile пропущен: нет пользователей.')
+        else:
+            yield 'blog:profile', self.view_querysets(
+                ProfileView, username=author.username
+            )
+            yield 'blog:profile (автор)', self.view_querysets(
+                ProfileView, user=author, username=author.username
+            )
+
+        yield 'blog:detail', [
+            ('комментарии', Post(pk=0).comments.select_related('author')),
+        ]
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов поддерживает только SQLite.')
+
+        failures = []
+        for name, querysets in self.cases():
+            for label, queryset in querysets:
+                plan = queryset.explain()
+                self.stdout.write(f'{name} — {label}:\n{plan}\n')
+                for line in plan.splitlines():
+                    detail = line.split(' ', 3)[-1]
+                    if is_bad_step(detail):
+                        failures.append(f'{name} — {label}: {detail}')
+
+        if failures:
+            raise CommandError(
+                'Неудачные планы запросов:\n' + '\n'.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from blog import fragments
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш фрагментов шаблонов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        total_hits = total_misses = 0
+        for name, (hits, misses, ratio) in fragments.stats().items():
+            self.stdout.write(
+                f'{name:<15} попаданий {hits:>8}  промахов {misses:>8}  '
+                f'{ratio:6.1%}'
+            )
+            total_hits += hits
+            total_misses += misses
+        total = total_hits + total_misses
+        ratio = total_hits / total if total else 0.0
+        self.stdout.write(f'Итого: {ratio:.1%} из {total} обращений')
+
+        if options['reset']:
+            fragments.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счётчики обнулены.'))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog import publishing
+
+
+class Command(BaseCommand):
+    help = ('Открывает отложенные посты, когда наступает их время '
+            'публикации. Без --loop выполняет один проход.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, просыпаясь к ближайшей публикации.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Максимальная пауза между проходами, в секундах.',
+        )
+
+    def run_once(self):
+        post_ids = publishing.publish_due_posts()
+        if post_ids:
+            self.stdout.write(f'Опубликовано постов: {len(post_ids)}')
+        return post_ids
+
+    def handle(self, *args, **options):
+        self.run_once()
+        while options['loop']:
+            time.sleep(self.seconds_to_wait(options['interval']))
+            self.run_once()
+
+    def seconds_to_wait(self, interval):
+        due = publishing.next_due_date()
+        if due is None:
+            return interval
+        delay = (due - timezone.now()).total_seconds()
+        return min(interval, max(delay, 0.0))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog import feed
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает таблицу карточек ленты (FeedEntry) из постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько карточек вставлять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = feed.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Карточек ленты создано: {created}'
+        ))
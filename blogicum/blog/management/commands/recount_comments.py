@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Post.comment_count с реальным числом комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(Post.objects.order_by().annotate(
+            actual=Count('comments')
+        ).exclude(comment_count=F('actual')).values_list(
+            'pk', 'comment_count', 'actual'
+        ))
+        fixed = 0
+        with transaction.atomic():
+            for pk, stored, actual in drifted:
+                self.stdout.write(f'Пост {pk}: {stored} -> {actual}')
+                if not options['dry_run']:
+                    Post.objects.filter(pk=pk).update(
+                        comment_count=actual, version=F('version') + 1
+                    )
+                fixed += 1
+
+        if options['dry_run']:
+            self.stdout.write(f'Расхождений найдено: {fixed}')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Счётчиков исправлено: {fixed}'
+            ))
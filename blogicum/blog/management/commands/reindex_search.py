@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает полнотекстовый индекс постов (FTS5) из blog_post '
+            'и восстанавливает его триггеры.')
+
+    def handle(self, *args, **options):
+        if not search.is_available(connection):
+            raise CommandError(
+                'Полнотекстовый поиск работает только на SQLite.'
+            )
+        with transaction.atomic():
+            search.install(connection)
+            search.rebuild(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.TABLE}')
+            indexed = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов в поисковом индексе: {indexed}'
+        ))
@@ -0,0 +1,50 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.task_queue import DONE, RETRY, Worker
+from blog.models import Task
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди в базе '
+            '(blog.task_queue) в пуле потоков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.TASKS_WORKER_THREADS,
+            help='Число потоков-исполнителей.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=None,
+            help='Сколько задач брать за раз (по умолчанию 4 на поток).',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.TASKS_POLL_SECONDS,
+            help='Пауза между проверками пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['threads'], options['batch'])
+        if not options['once']:
+            # Ctrl+C и SIGTERM дают закончить начатую пачку.
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: worker.stop())
+        worker.run(options['poll'], once=options['once'])
+        results = worker.results
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено: {results[DONE]}, отложено для повтора: '
+            f'{results[RETRY]}, не выполнено: {results[Task.FAILED]}'
+        ))
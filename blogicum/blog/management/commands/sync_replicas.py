@@ -0,0 +1,38 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def replica_path(alias):
+    # NAME реплики — URI вида file:<путь>?mode=ro (см. settings).
+    name = str(connections.databases[alias]['NAME'])
+    if name.startswith('file:'):
+        name = name[len('file:'):]
+    return name.split('?', 1)[0]
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик '
+            '(settings.DATABASE_REPLICAS) через backup API.')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Копирование реплик рассчитано на SQLite.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте BLOGICUM_SQLITE_REPLICAS.'
+            )
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            path = replica_path(alias)
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {path}')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены.'))
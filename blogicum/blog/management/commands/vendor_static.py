@@ -0,0 +1,55 @@
+import base64
+import hashlib
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.staticfiles import VENDOR
+
+
+def integrity(data):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+class Command(BaseCommand):
+    help = ('Скачивает сторонние CSS и JS в static/vendor и сверяет их '
+            'SRI-хэши. Необязательно: без файлов страницы подключают их '
+            'с CDN с integrity.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить файлы, ничего не скачивая.',
+        )
+
+    def handle(self, *args, **options):
+        root = Path(settings.STATICFILES_DIRS[0])
+        problems = []
+        for name, (url, expected) in VENDOR.items():
+            path = root / name
+            if path.is_file():
+                if integrity(path.read_bytes()) == expected:
+                    self.stdout.write(f'{name}: в порядке')
+                    continue
+                if options['check']:
+                    problems.append(name)
+                    continue
+            elif options['check']:
+                self.stdout.write(f'{name}: нет, подключается с CDN')
+                continue
+            with urlopen(url, timeout=30) as response:
+                data = response.read()
+            if integrity(data) != expected:
+                raise CommandError(f'{url}: хэш не совпадает с {expected}')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            self.stdout.write(f'{name}: скачан')
+        if problems:
+            raise CommandError(
+                'Изменены файлы: ' + ', '.join(problems)
+                + '. Запустите manage.py vendor_static.'
+            )
+        self.stdout.write(self.style.SUCCESS('Сторонняя статика проверена.'))
@@ -0,0 +1,193 @@
+"""Отдача файлов MEDIA_ROOT без django.conf.urls.static.
+
+serve() работает и при DEBUG = False:
+
+* сильный ETag и Last-Modified; If-None-Match и If-Modified-Since
+  дают 304 без открытия файла;
+* Range: bytes=… — один отрезок, ответ 206 (несколько отрезков или
+  устаревший If-Range — файл целиком);
+* имена по хэшу содержимого (blog.storage) не меняются, поэтому
+  кэшируются на год с immutable, остальные — MEDIA_MAX_AGE секунд;
+* FileResponse с настоящим файлом: wsgi.file_wrapper сервера (gunicorn,
+  uWSGI) передаёт его через os.sendfile, без копирования в Python.
+
+При MEDIA_SENDFILE = 'x-accel-redirect' или 'x-sendfile' Django только
+проверяет путь и условные заголовки, а сам файл отдаёт веб-сервер
+(nginx — через internal-location MEDIA_ACCEL_REDIRECT_PREFIX, Apache
+и lighttpd — по X-Sendfile).
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+HASHED_NAME_RE = re.compile(r'^([0-9a-f]{64})\.[0-9a-z]+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+BLOCK_SIZE = 64 * 1024
+OFFLOAD_MODES = ('x-accel-redirect', 'x-sendfile')
+
+
+class FileRange:
+    """Отрезок открытого файла для FileResponse.
+
+    fileno() и позиция — от самого файла, так что file_wrapper сервера
+    отправит отрезок через sendfile; read() не выходит за его конец.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(начало, длина) отрезка; None — отдать файл целиком.
+
+    ValueError, если отрезок за концом файла (ответ 416).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = size - 1 if not last else min(int(last), size - 1)
+        if last and int(last) < start:
+            return None
+    else:
+        suffix = int(last)
+        if not suffix:
+            raise ValueError(header)
+        start, end = max(size - suffix, 0), size - 1
+    if start >= size:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def make_etag(path, stats):
+    match = HASHED_NAME_RE.match(posixpath.basename(path))
+    if match:
+        return f'"{match.group(1)}"'
+    return f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+
+
+def if_range_matches(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if value is None:
+        return True
+    if value.startswith('"'):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def set_common_headers(response, path, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if HASHED_NAME_RE.match(posixpath.basename(path)):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_MAX_AGE
+        )
+    return response
+
+
+def resolve(path, root=None):
+    """Абсолютный путь и stat обычного файла в root (MEDIA_ROOT) или 404."""
+    # Скрытые и временные файлы (.upload-…, .tmp-…) не отдаются.
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404('Файл не найден')
+    try:
+        full_path = safe_join(root or settings.MEDIA_ROOT, path)
+        stats = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404('Файл не найден')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('Файл не найден')
+    return full_path, stats
+
+
+@require_safe
+def serve(request, path):
+    full_path, stats = resolve(path)
+    etag = make_etag(path, stats)
+    last_modified = int(stats.st_mtime)
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return set_common_headers(not_modified, path, etag, last_modified)
+
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    mode = settings.MEDIA_SENDFILE
+    if mode in OFFLOAD_MODES:
+        # Отрезки Range веб-сервер вырежет сам.
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+            )
+        else:
+            response['X-Sendfile'] = full_path
+        return set_common_headers(response, path, etag, last_modified)
+
+    size = stats.st_size
+    byte_range = None
+    if ('HTTP_RANGE' in request.META
+            and if_range_matches(request, etag, last_modified)):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return set_common_headers(response, path, etag, last_modified)
+    start, length = byte_range or (0, size)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        file = open(full_path, 'rb')
+        if byte_range:
+            file = FileRange(file, start, length)
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = BLOCK_SIZE
+    response['Content-Length'] = length
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    return set_common_headers(response, path, etag, last_modified)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('blog.query_budget')
+
+
+class QueryBudgetMiddleware:
+    """Пишет в лог запросы, превысившие бюджет SQL своей страницы.
+
+    Бюджеты задаются в settings.QUERY_BUDGETS по имени URL. Включается
+    переменной окружения BLOGICUM_QUERY_BUDGET=1 (QUERY_BUDGET_ENABLED):
+    обёртка курсора в каждом запросе нужна только при отладке.
+
+    Считаются запросы ко всем базам (и к репликам), но только в потоке
+    запроса: соединения Django свои у каждого потока, и запросы из пула
+    потоков (sync_to_async в асинхронных view) в бюджет не попадают.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @contextmanager
+    def capture(self):
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for alias_connection in connections.all():
+                stack.enter_context(alias_connection.execute_wrapper(record))
+            yield queries
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with self.capture() as queries:
+            response = self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    async def __acall__(self, request):
+        with self.capture() as queries:
+            response = await self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    def check(self, request, queries):
+        match = request.resolver_match
+        budget = self.budgets.get(match.view_name) if match else None
+        if budget is not None and len(queries) > budget:
+            logger.warning(
+                '%s %s (%s): %d SQL-запросов при бюджете %d\n%s',
+                request.method, request.path, match.view_name,
+                len(queries), budget, '\n'.join(queries)
+            )
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0004_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='blog.post', verbose_name='Публикация')),
+                ('title', models.CharField(max_length=256, verbose_name='Заголовок')),
+                ('excerpt', models.TextField(blank=True, verbose_name='Анонс')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата и время публикации')),
+                ('image', models.ImageField(blank=True, upload_to='posts/', verbose_name='Картинка')),
+                ('author_username', models.CharField(max_length=150, verbose_name='Имя автора')),
+                ('category_title', models.CharField(blank=True, max_length=256, verbose_name='Название категории')),
+                ('location_name', models.CharField(blank=True, max_length=256, verbose_name='Название места')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('is_listed', models.BooleanField(default=False, help_text='Пост и его категория опубликованы.', verbose_name='Показывать в ленте')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор публикации')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.category', verbose_name='Категория')),
+                ('location', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.location', verbose_name='Местоположение')),
+            ],
+            options={
+                'verbose_name': 'карточка ленты',
+                'verbose_name_plural': 'Карточки ленты',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['pub_date', 'post'], name='feedentry_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['category', 'pub_date', 'post'], name='feedentry_category_feed_idx'),
+        ),
+    ]
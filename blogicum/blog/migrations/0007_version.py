@@ -0,0 +1,28 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1, editable=False, help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.', verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1, editable=False, help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.', verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1, editable=False, help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.', verbose_name='Версия'),
+        ),
+    ]
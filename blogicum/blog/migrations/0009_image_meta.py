@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, help_text='Копия Post.image_meta.', verbose_name='Сведения о картинке'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Ширина и высота оригинала и уменьшенные копии; заполняется при сохранении (blog.images).', verbose_name='Сведения о картинке'),
+        ),
+    ]
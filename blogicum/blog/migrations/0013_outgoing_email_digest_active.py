@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='outgoingemail',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'sending'])), fields=('digest',), name='outbox_digest_active'),
+        ),
+    ]
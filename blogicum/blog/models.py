@@ -1,7 +1,11 @@
 ﻿from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+
+from .storage import get_post_image_storage
 
 User = get_user_model()
 
@@ -50,6 +54,23 @@ class Location(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author', 'category', 'location')
+
+    def published(self):
+        return self.filter(is_visible=True)
+
+    def due(self, now=None):
+        """Отложенные посты, время публикации которых уже наступило."""
+        return self.filter(
+            is_visible=False,
+            is_published=True,
+            category__is_published=True,
+            pub_date__lte=now or timezone.now()
+        )
+
+
 class Post(models.Model):
     title = models.CharField('Заголовок', max_length=256)
     text = models.TextField('Текст')
@@ -85,14 +106,74 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=get_post_image_storage,
         blank=True,
         help_text='Загрузите изображение для поста'
     )
+    image_meta = models.JSONField(
+        'Сведения о картинке',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=('Ширина и высота оригинала и уменьшенные копии; '
+                   'заполняется при сохранении (blog.images).')
+    )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    is_visible = models.BooleanField(
+        'Виден читателям',
+        default=False,
+        editable=False,
+        help_text=('Пост и категория опубликованы, а время публикации '
+                   'наступило. Обновляется при сохранении и командой '
+                   'publish_scheduled.')
+    )
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+        help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ['-pub_date']
+        # Частичные индексы: SQLite не использует булев столбец как
+        # равенство в составном индексе, а условие WHERE is_visible
+        # совпадает с тем, что генерирует фильтр ленты.
+        indexes = [
+            models.Index(
+                fields=['pub_date'],
+                name='post_feed_idx',
+                condition=models.Q(is_visible=True)
+            ),
+            models.Index(
+                fields=['category', 'pub_date'],
+                name='post_category_feed_idx',
+                condition=models.Q(is_visible=True)
+            ),
+            models.Index(
+                fields=['pub_date'],
+                name='post_scheduled_idx',
+                condition=models.Q(is_visible=False, is_published=True)
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_feed_idx'
+            ),
+            # Ссылки на файл картинки (blog.images.release).
+            models.Index(
+                fields=['image'],
+                name='post_image_idx',
+                condition=~models.Q(image='')
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -100,8 +181,48 @@ class Post(models.Model):
     def get_absolute_url(self):
         return reverse('blog:detail', kwargs={'pk': self.pk})
 
-    def comment_count(self):
-        return self.comments.count()
+    @property
+    def image_width(self):
+        return self.image_meta.get('width')
+
+    @property
+    def image_height(self):
+        return self.image_meta.get('height')
+
+    def compute_visibility(self, now=None):
+        category = self.category
+        return bool(
+            self.is_published
+            and category is not None
+            and category.is_published
+            and self.pub_date <= (now or timezone.now())
+        )
+
+    def save(self, *args, **kwargs):
+        self.is_visible = self.compute_visibility()
+        if self._state.adding or self.pk is None:
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Счётчик меняют только adjust_comment_count() атомарным F():
+            # значение в памяти может быть устаревшим.
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        kwargs['update_fields'] = {*update_fields, 'is_visible', 'version'}
+        self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        # В базе теперь другие значения.
+        self.refresh_from_db(fields=['version', 'comment_count'])
+
+    @classmethod
+    def adjust_comment_count(cls, post_id, delta):
+        cls.objects.filter(pk=post_id).update(
+            comment_count=F('comment_count') + delta,
+            version=F('version') + 1
+        )
 
 
 class Comment(models.Model):
@@ -118,11 +239,241 @@ class Comment(models.Model):
         verbose_name='Автор комментария'
     )
     created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+        help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.'
+    )
 
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['post', 'created_at'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Комментарий {self.author.username} к {self.post.title}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+        self._loaded_post_id = self.post_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Пост, к которому комментарий был привязан при загрузке: при
+        # переносе счётчики обоих постов поправит сигнал post_save.
+        instance._loaded_post_id = instance.__dict__.get('post_id')
+        return instance
+
+
+class FeedEntryQuerySet(models.QuerySet):
+    def listed(self):
+        return self.filter(is_listed=True)
+
+
+class FeedEntry(models.Model):
+    """Готовая карточка поста для главной и страниц категорий.
+
+    Поддерживается сигналами из blog.signals, пересобирается командой
+    rebuild_feed. post_id не является rowid, поэтому входит в индексы
+    явно — иначе ORDER BY pub_date, post_id требует сортировки.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_entry',
+        verbose_name='Публикация'
+    )
+    title = models.CharField('Заголовок', max_length=256)
+    excerpt = models.TextField('Анонс', blank=True)
+    pub_date = models.DateTimeField('Дата и время публикации')
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    image_meta = models.JSONField(
+        'Сведения о картинке',
+        default=dict,
+        blank=True,
+        help_text='Копия Post.image_meta.'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор публикации'
+    )
+    author_username = models.CharField('Имя автора', max_length=150)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Категория'
+    )
+    category_title = models.CharField(
+        'Название категории', max_length=256, blank=True
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Местоположение'
+    )
+    location_name = models.CharField(
+        'Название места', max_length=256, blank=True
+    )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0
+    )
+    is_listed = models.BooleanField(
+        'Показывать в ленте',
+        default=False,
+        help_text='Копия Post.is_visible.'
+    )
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+        help_text='Растёт при каждом изменении; входит в ключ кэша фрагментов.'
+    )
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'карточка ленты'
+        verbose_name_plural = 'Карточки ленты'
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'post'],
+                name='feedentry_feed_idx',
+                condition=models.Q(is_listed=True)
+            ),
+            models.Index(
+                fields=['category', 'pub_date', 'post'],
+                name='feedentry_category_feed_idx',
+                condition=models.Q(is_listed=True)
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди (blog.task_queue)."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    ]
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField('Именованные аргументы', default=dict,
+                              blank=True)
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    run_at = models.DateTimeField(
+        'Выполнить не раньше', default=timezone.now
+    )
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Поставлена', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['run_at', 'pk']
+        indexes = [
+            models.Index(
+                fields=['run_at'],
+                name='task_queued_idx',
+                condition=models.Q(status='queued')
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (blog.outbox)."""
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ждёт отправки'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    ]
+
+    message = models.JSONField('Письмо')
+    recipient_domain = models.CharField('Домен получателя', max_length=255)
+    digest = models.CharField(
+        'Отпечаток', max_length=64,
+        help_text='SHA-256 письма; одинаковые письма не дублируются.'
+    )
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    send_after = models.DateTimeField(
+        'Отправить не раньше', default=timezone.now
+    )
+    locked_at = models.DateTimeField('Взято в работу', null=True, blank=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Поставлено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ['created_at', 'pk']
+        indexes = [
+            models.Index(
+                fields=['send_after'],
+                name='outbox_pending_idx',
+                condition=models.Q(status='pending')
+            ),
+            models.Index(
+                fields=['recipient_domain', 'sent_at'],
+                name='outbox_domain_sent_idx',
+                condition=models.Q(status='sent')
+            ),
+            models.Index(fields=['digest'], name='outbox_digest_idx'),
+        ]
+        constraints = [
+            # Одинаковое письмо ждёт отправки не больше одного раза.
+            models.UniqueConstraint(
+                fields=['digest'],
+                name='outbox_digest_active',
+                condition=models.Q(status__in=['pending', 'sending'])
+            ),
+        ]
+
+    def __str__(self):
+        return self.message.get('subject', '')
@@ -0,0 +1,233 @@
+"""Исходящие письма: очередь в базе и отправка пачками.
+
+QueuedEmailBackend (blog.mail) ничего не отправляет: письмо ложится
+в OutgoingEmail, а отправку выполняет фоновая задача send_outbox.
+
+* Письмо получателям из разных доменов делится на копии по доменам:
+  в каждой — только адреса своего домена, и лимит домена считается
+  честно.
+* Одинаковое письмо (тот же отпечаток), которое ещё ждёт отправки или
+  ушло меньше EMAIL_DEDUPE_WINDOW секунд назад, второй раз не ставится.
+  Для ждущих это гарантирует условный UNIQUE и при гонке запросов.
+* send_batch берёт до EMAIL_BATCH_SIZE писем и отправляет их через одно
+  соединение QUEUED_EMAIL_BACKEND: один сеанс SMTP или один файл.
+* На домен получателя уходит не больше EMAIL_DOMAIN_RATE_LIMIT писем за
+  EMAIL_DOMAIN_RATE_WINDOW секунд; остальные ждут, пока окно сдвинется.
+* Письмо, которое не удалось отправить, повторяется с той же задержкой,
+  что и фоновые задачи, до EMAIL_MAX_ATTEMPTS раз.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from email.utils import parseaddr
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import mail, task_queue
+from .models import OutgoingEmail
+
+logger = logging.getLogger('blog.outbox')
+
+
+def digest(data):
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def address_domain(address):
+    return parseaddr(address)[1].rpartition('@')[2].lower()
+
+
+def split_by_domain(data):
+    """{домен: копия письма только с получателями этого домена}."""
+    parts = {}
+    for field in ('to', 'cc', 'bcc'):
+        for address in data[field] or ():
+            part = parts.setdefault(address_domain(address), {
+                **data, 'to': [], 'cc': [], 'bcc': [],
+            })
+            part[field].append(address)
+    return parts or {'': data}
+
+
+def enqueue(message):
+    """Ставит письмо в очередь; False — такое уже стоит или ушло."""
+    since = timezone.now() - timedelta(seconds=settings.EMAIL_DEDUPE_WINDOW)
+    queued = False
+    for domain, data in split_by_domain(mail.to_dict(message)).items():
+        key = digest(data)
+        if OutgoingEmail.objects.filter(
+            digest=key, status=OutgoingEmail.SENT, sent_at__gte=since
+        ).exists():
+            continue
+        try:
+            with transaction.atomic():
+                OutgoingEmail.objects.create(
+                    message=data, digest=key, recipient_domain=domain
+                )
+        except IntegrityError:
+            # Такое же письмо уже ждёт отправки (outbox_digest_active).
+            continue
+        queued = True
+    if queued:
+        schedule_send()
+    return queued
+
+
+def schedule_send(run_at=None):
+    """Ставит send_outbox, если такая задача ещё не ждёт в очереди.
+
+    Всегда через очередь, и при TASKS_EAGER: запрос, поставивший письмо,
+    не ждёт SMTP — письма отправляет worker.
+    """
+    from .tasks import send_outbox
+
+    run_at = run_at or timezone.now()
+    if not send_outbox.is_queued(run_at):
+        send_outbox.schedule(run_at)
+
+
+def claim(limit):
+    """Берёт в работу до limit писем (условным UPDATE, как задачи)."""
+    now = timezone.now()
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING,
+        locked_at__lt=now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT),
+    ).update(status=OutgoingEmail.PENDING, locked_at=None)
+    candidates = list(
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, send_after__lte=now
+        ).order_by('created_at', 'pk').values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if OutgoingEmail.objects.filter(
+            pk=pk, status=OutgoingEmail.PENDING
+        ).update(
+            status=OutgoingEmail.SENDING, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(
+        OutgoingEmail.objects.filter(pk__in=claimed)
+        .order_by('created_at', 'pk')
+    )
+
+
+def split_by_rate(rows, now):
+    """Делит пачку по лимиту доменов.
+
+    Возвращает письма к отправке и {время: письма} для тех, что ждут,
+    пока окно их домена сдвинется.
+    """
+    window = timedelta(seconds=settings.EMAIL_DOMAIN_RATE_WINDOW)
+    limit = settings.EMAIL_DOMAIN_RATE_LIMIT
+    used = {
+        stats['recipient_domain']: stats
+        for stats in OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT,
+            sent_at__gte=now - window,
+            recipient_domain__in={row.recipient_domain for row in rows},
+        ).values('recipient_domain').annotate(
+            sent=Count('pk'), oldest=Min('sent_at')
+        ).order_by()
+    }
+    counts = {domain: stats['sent'] for domain, stats in used.items()}
+    batch, deferred = [], {}
+    for row in rows:
+        domain = row.recipient_domain
+        if counts.get(domain, 0) < limit:
+            counts[domain] = counts.get(domain, 0) + 1
+            batch.append(row)
+            continue
+        # Лимит занят письмами этой же пачки — окно начнётся сейчас.
+        oldest = used[domain]['oldest'] if domain in used else now
+        deferred.setdefault(max(oldest + window, now), []).append(row)
+    return batch, deferred
+
+
+def give_back(rows, error):
+    """Возвращает письма в очередь с отсрочкой или помечает неудачными."""
+    now = timezone.now()
+    for row in rows:
+        queryset = OutgoingEmail.objects.filter(pk=row.pk)
+        if row.attempts < settings.EMAIL_MAX_ATTEMPTS:
+            queryset.update(
+                status=OutgoingEmail.PENDING, locked_at=None,
+                last_error=error,
+                send_after=now + task_queue.retry_delay(row.attempts),
+            )
+        else:
+            queryset.update(
+                status=OutgoingEmail.FAILED, locked_at=None, last_error=error
+            )
+
+
+def send_batch(limit=None):
+    """Отправляет пачку писем через одно соединение; число отправленных."""
+    rows = claim(limit or settings.EMAIL_BATCH_SIZE)
+    if not rows:
+        schedule_next()
+        return 0
+    now = timezone.now()
+    batch, deferred = split_by_rate(rows, now)
+    for send_after, waiting in deferred.items():
+        # Ожидание лимита — не попытка отправки.
+        OutgoingEmail.objects.filter(
+            pk__in=[row.pk for row in waiting]
+        ).update(
+            status=OutgoingEmail.PENDING, locked_at=None,
+            attempts=F('attempts') - 1, send_after=send_after,
+        )
+    if not batch:
+        schedule_next()
+        return 0
+
+    sent = []
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        logger.exception('Не удалось открыть соединение для писем')
+        give_back(batch, repr(error))
+        schedule_next()
+        return 0
+    try:
+        for row in batch:
+            try:
+                connection.send_messages([mail.from_dict(row.message)])
+            except Exception as error:
+                logger.exception('Письмо %s не отправлено', row.pk)
+                give_back([row], repr(error))
+            else:
+                sent.append(row.pk)
+    finally:
+        connection.close()
+    OutgoingEmail.objects.filter(pk__in=sent).update(
+        status=OutgoingEmail.SENT, sent_at=timezone.now(), locked_at=None
+    )
+    keep = max(settings.EMAIL_DEDUPE_WINDOW,
+               settings.EMAIL_DOMAIN_RATE_WINDOW)
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENT, sent_at__lt=now - timedelta(seconds=keep)
+    ).delete()
+    schedule_next()
+    return len(sent)
+
+
+def schedule_next():
+    """Планирует отправку к ближайшему ждущему письму, если оно есть.
+
+    Отложенные лимитом и повторяемые письма иначе ждали бы, пока
+    в очередь не встанет следующее письмо.
+    """
+    send_after = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING
+    ).aggregate(first=Min('send_after'))['first']
+    if send_after is not None:
+        schedule_send(send_after)
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import cc_delim_re
+
+PAGE_PREFIX = 'page-cache:page:'
+TAG_PREFIX = 'page-cache:tag:'
+CACHE_HEADER = 'X-Page-Cache'
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def tag_key(tag):
+    return TAG_PREFIX + tag
+
+
+def _page_key(request):
+    url = request.get_host() + request.get_full_path()
+    return PAGE_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+
+def card_tags(obj):
+    """Теги карточки поста: Post или FeedEntry."""
+    tags = [f'post:{obj.pk}', f'user:{obj.author_id}']
+    if obj.category_id:
+        tags.append(f'category:{obj.category_id}')
+    if obj.location_id:
+        tags.append(f'location:{obj.location_id}')
+    return tags
+
+
+def listing_tags(category_id, author_id):
+    """Теги списков, в которые попадает пост: лента, категория, профиль."""
+    tags = ['feed', f'profile:{author_id}']
+    if category_id:
+        tags.append(f'feed:category:{category_id}')
+    return tags
+
+
+def tag(request, *tags):
+    """Разрешает закэшировать ответ и привязывает его к тегам."""
+    if not hasattr(request, '_page_cache_tags'):
+        request._page_cache_tags = set()
+    request._page_cache_tags.update(tags)
+
+
+def _bump(tags):
+    now = time.time()
+    get_cache().set_many({tag_key(t): now for t in tags}, timeout=None)
+
+
+def invalidate(*tags):
+    """Помечает устаревшими все страницы с любым из тегов.
+
+    Сбрасываем сразу и ещё раз после коммита: страница, отрисованная
+    конкурентным запросом до коммита, иначе осталась бы в кэше.
+    """
+    tags = set(tags)
+    if not tags:
+        return
+    _bump(tags)
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def is_cacheable_request(request):
+    # Без сессионной cookie пользователь заведомо анонимный, и сессию
+    # читать не нужно — иначе SessionMiddleware добавит Vary: Cookie.
+    return (
+        settings.PAGE_CACHE_TIMEOUT
+        and request.method == 'GET'
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def is_cacheable_response(request, response):
+    if (not hasattr(request, '_page_cache_tags')
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies):
+        return False
+    vary = cc_delim_re.split(response.get('Vary', ''))
+    return not any(header.lower() == 'cookie' for header in vary)
+
+
+def is_fresh(versions, tags, since):
+    """Ни один из тегов не сбрасывался с момента since."""
+    keys = [tag_key(t) for t in tags]
+    return all(key in versions for key in keys) and all(
+        versions[key] < since for key in keys
+    )
+
+
+def ensure_tags(tags):
+    # Тег без версии считается сброшенным, поэтому заводим ему версию 0.
+    cache = get_cache()
+    known = cache.get_many([tag_key(t) for t in tags])
+    missing = {tag_key(t): 0 for t in tags if tag_key(t) not in known}
+    if missing:
+        cache.set_many(missing, timeout=None)
+
+
+def get_page(request):
+    cache = get_cache()
+    entry = cache.get(_page_key(request))
+    if entry is None:
+        return None
+    rendered_at, tags, status, content, headers = entry
+    versions = cache.get_many([tag_key(t) for t in tags])
+    if not is_fresh(versions, tags, rendered_at):
+        return None
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def set_page(request, response, rendered_at):
+    cache = get_cache()
+    tags = sorted(request._page_cache_tags)
+    ensure_tags(tags)
+    cache.set(
+        _page_key(request),
+        (rendered_at, tags, response.status_code, response.content,
+         list(response.items())),
+        settings.PAGE_CACHE_TIMEOUT,
+    )
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш целых страниц для анонимных GET-запросов.
+
+    Кэшируются только ответы view, вызвавших tag(); страница устаревает,
+    когда invalidate() сбрасывает любой из её тегов (см. blog.signals).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not is_cacheable_request(request):
+            return self.get_response(request)
+
+        request.user = AnonymousUser()
+        response = get_page(request)
+        if response is not None:
+            response[CACHE_HEADER] = 'hit'
+            return response
+
+        rendered_at = time.time()
+        response = self.get_response(request)
+        if is_cacheable_response(request, response):
+            set_page(request, response, rendered_at)
+            response[CACHE_HEADER] = 'miss'
+        return response
+
+    async def __acall__(self, request):
+        if not is_cacheable_request(request):
+            return await self.get_response(request)
+
+        request.user = AnonymousUser()
+        # Бэкенд кэша может ходить в сеть — не держим цикл событий.
+        response = await sync_to_async(get_page, thread_sensitive=False)(
+            request
+        )
+        if response is not None:
+            response[CACHE_HEADER] = 'hit'
+            return response
+
+        rendered_at = time.time()
+        response = await self.get_response(request)
+        if is_cacheable_response(request, response):
+            await sync_to_async(set_page, thread_sensitive=False)(
+                request, response, rendered_at
+            )
+            response[CACHE_HEADER] = 'miss'
+        return response
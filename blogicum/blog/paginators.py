@@ -0,0 +1,180 @@
+import base64
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counts
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, берущий count из blog.counts вместо COUNT(*).
+
+    count_strategy после обращения к count — 'cache' или 'query'.
+    """
+
+    def __init__(self, *args, count_scope=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_scope = count_scope
+        self.count_strategy = None
+
+    @cached_property
+    def count(self):
+        value, self.count_strategy = counts.get_count(
+            self.object_list, self.count_scope
+        )
+        return value
+
+
+class KeysetPaginator:
+    """Пагинация по ключу (pub_date, id) без OFFSET.
+
+    Курсор — непрозрачная строка с направлением и значениями ключа
+    граничной записи, поэтому стоимость любой страницы одинакова.
+    По умолчанию страницы идут от новых записей к старым; descending=False
+    разворачивает порядок (например, для комментариев).
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 descending=True, count_scope=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+        self.descending = descending
+        self.count_scope = count_scope
+        self.count_strategy = None
+
+    @cached_property
+    def count(self):
+        value, self.count_strategy = counts.get_count(
+            self.object_list, self.count_scope
+        )
+        return value
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            # isoformat() без усечения микросекунд, иначе курсор «плывёт».
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        raw = json.dumps([direction, values])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def key_to_python(self, key, value):
+        return self.object_list.model._meta.get_field(key).to_python(value)
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()).decode()
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.keys):
+                raise ValueError(values)
+            values = [
+                self.key_to_python(key, value)
+                for key, value in zip(self.keys, values)
+            ]
+        except (TypeError, ValueError, UnicodeDecodeError, LookupError):
+            raise InvalidCursor('Некорректный курсор страницы')
+        return direction, values
+
+    def _seek(self, values, lookup):
+        """Условие строкового сравнения (k1, k2, ...) < / > (v1, v2, ...).
+
+        Отдельная граница k1 <= v1 позволяет SQLite искать по диапазону
+        индекса, а не разбирать OR целиком.
+        """
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookup}': values[index]})
+            for prev_key, prev_value in zip(self.keys, values[:index]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return Q(**{f'{self.keys[0]}__{lookup}e': values[0]}) & condition
+
+    def page_queryset(self, direction=NEXT, values=None):
+        if (direction == NEXT) == self.descending:
+            ordering = [f'-{key}' for key in self.keys]
+            lookup = 'lt'
+        else:
+            ordering = list(self.keys)
+            lookup = 'gt'
+
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, lookup))
+        return queryset[:self.per_page + 1]
+
+    def page(self, cursor=None):
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+
+        rows = list(self.page_queryset(direction, values))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == NEXT:
+            has_next, has_previous = has_more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        return KeysetPage(rows, self, has_next, has_previous)
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode_cursor(NEXT, self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode_cursor(
+                PREVIOUS, self.object_list[0]
+            )
+        return None
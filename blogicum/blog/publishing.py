@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import FeedEntry, Post
+
+# Рассылается после массовой смены Post.is_visible (отложенная публикация,
+# скрытие категории). Аргумент post_ids — список затронутых постов.
+visibility_changed = Signal()
+
+
+def _set_visibility(queryset, is_visible):
+    """Меняет is_visible постов queryset; список действительно изменённых.
+
+    Условие queryset входит и в сам UPDATE: пост, который скрыли или
+    перенесли в скрытую категорию между чтением и записью, не тронется.
+    Версии растут, чтобы кэш фрагментов не отдавал старые карточки.
+    """
+    with transaction.atomic():
+        candidates = list(queryset.values_list('pk', flat=True))
+        if not candidates:
+            return []
+        queryset.filter(pk__in=candidates).update(
+            is_visible=is_visible, version=F('version') + 1
+        )
+        post_ids = list(Post.objects.filter(
+            pk__in=candidates, is_visible=is_visible
+        ).values_list('pk', flat=True))
+        FeedEntry.objects.filter(post_id__in=post_ids).update(
+            is_listed=is_visible, version=F('version') + 1
+        )
+    transaction.on_commit(lambda: visibility_changed.send(
+        sender=Post, post_ids=post_ids
+    ))
+    return post_ids
+
+
+def publish_due_posts(now=None):
+    """Открывает отложенные посты, время которых наступило."""
+    return _set_visibility(Post.objects.due(now), True)
+
+
+def next_due_date():
+    return Post.objects.filter(
+        is_visible=False,
+        is_published=True,
+        category__is_published=True,
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
+
+
+def refresh_category(category):
+    posts = Post.objects.filter(category=category)
+    if category.is_published:
+        return _set_visibility(posts.filter(
+            is_visible=False,
+            is_published=True,
+            category__is_published=True,
+            pub_date__lte=timezone.now()
+        ), True)
+    return _set_visibility(posts.filter(is_visible=True), False)
+
+
+def detach_category(category):
+    return _set_visibility(
+        Post.objects.filter(category=category, is_visible=True), False
+    )
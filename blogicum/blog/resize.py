@@ -0,0 +1,254 @@
+"""Картинки постов произвольного размера по подписанной ссылке.
+
+Ссылку строит resized_url() (в шаблонах — {% resized_url %}): ширина,
+высота и формат подписываются SECRET_KEY, так что чужие размеры
+запросить нельзя, а свои ограничены RESIZE_MAX_DIMENSION. Нулевая
+ширина или высота вычисляется по пропорциям; если заданы обе, картинка
+обрезается под них. Больше оригинала копия не растягивается.
+
+Готовые копии лежат в дисковом кэше RESIZE_CACHE_DIR не больше
+RESIZE_CACHE_MAX_BYTES; при переполнении удаляются давно не читанные.
+Файл пишется во временный и переименовывается, поэтому читатель не
+увидит его недописанным. Первые одновременные запросы одной копии
+в процессе ждут друг друга: оригинал декодируется один раз.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signing import Signer
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden,
+)
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+from PIL import Image, UnidentifiedImageError
+
+from . import images
+
+SOURCE_DIR = 'posts/'
+CONTENT_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+CACHE_HEADER = 'X-Resize-Cache'
+# После переполнения кэш чистится до этой доли от предела, а не
+# до самого предела, чтобы не сканировать каталог на каждой записи.
+LOW_WATERMARK = 0.9
+TEMP_PREFIX = '.tmp-'
+
+signer = Signer(salt='blog.resize')
+
+
+def signed_value(name, width, height, image_format):
+    return f'{name}:{width}x{height}:{image_format}'
+
+
+def check_params(name, width, height, image_format):
+    limit = settings.RESIZE_MAX_DIMENSION
+    return (
+        name.startswith(SOURCE_DIR)
+        and image_format in CONTENT_TYPES
+        and (width or height)
+        and 0 <= width <= limit
+        and 0 <= height <= limit
+    )
+
+
+def resized_url(name, width=0, height=0, image_format='jpeg'):
+    if not check_params(name, width, height, image_format):
+        raise ValueError(
+            f'Недопустимые параметры копии: {name} {width}x{height} '
+            f'{image_format}'
+        )
+    signature = signer.signature(
+        signed_value(name, width, height, image_format)
+    )
+    url = reverse('resized_image', kwargs={
+        'width': width, 'height': height,
+        'image_format': image_format, 'name': name,
+    })
+    return f'{url}?s={signature}'
+
+
+class DiskCache:
+    """Файлы по ключу с вытеснением давно не читанных (по mtime)."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def open(self, key):
+        """Открытый файл или None; чтение освежает запись."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+            return open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self._grow(len(data))
+
+    def entries(self):
+        if not self.directory.is_dir():
+            return
+        for directory in os.scandir(self.directory):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.startswith(TEMP_PREFIX):
+                    continue
+                try:
+                    yield entry.path, entry.stat()
+                except FileNotFoundError:
+                    pass
+
+    def size(self):
+        return sum(stat.st_size for _, stat in self.entries())
+
+    def _grow(self, size):
+        with self._lock:
+            if self._size is None:
+                # Каталог мог заполнить другой процесс — считаем с диска.
+                self._size = self.size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._size = self.evict(self.max_bytes * LOW_WATERMARK)
+
+    def evict(self, target):
+        """Удаляет самые старые файлы, пока кэш больше target."""
+        entries = sorted(self.entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+        return total
+
+
+class KeyLocks:
+    """Замок на ключ; живёт, пока его кто-то держит или ждёт."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+locks = KeyLocks()
+
+
+def get_cache():
+    global _cache
+    directory = Path(settings.RESIZE_CACHE_DIR)
+    max_bytes = settings.RESIZE_CACHE_MAX_BYTES
+    with _cache_lock:
+        if (_cache is None or _cache.directory != directory
+                or _cache.max_bytes != max_bytes):
+            _cache = DiskCache(directory, max_bytes)
+        return _cache
+
+
+def render(storage, name, width, height, image_format):
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # JPEG сразу декодируется в уменьшенном в 2–8 раз виде.
+        box = max(width, height)
+        image.draft('RGB', (box, box))
+        image.load()
+    image = images.normalize(image)
+    crop = bool(width and height)
+    if not width:
+        width = max(round(image.width * height / image.height), 1)
+    size = images.target_size(image.size, width, height, 1)
+    return images.encode(images.resize(image, size, crop), image_format)
+
+
+def get_or_render(name, width, height, image_format):
+    """(открытый файл или байты, попадание в кэш)."""
+    storage = default_storage
+    try:
+        modified = storage.get_modified_time(name).timestamp()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Картинка не найдена')
+    # Время изменения в ключе: перезаписанный оригинал даст новые копии.
+    key = f'{name}:{modified}:{width}x{height}:{image_format}'
+    cache = get_cache()
+    file = cache.open(key)
+    if file is not None:
+        return file, True
+    with locks.hold(key):
+        file = cache.open(key)
+        if file is not None:
+            return file, True
+        try:
+            data = render(storage, name, width, height, image_format)
+        except (OSError, UnidentifiedImageError,
+                Image.DecompressionBombError):
+            raise Http404('Картинку не удалось обработать')
+        cache.put(key, data)
+    return data, False
+
+
+@require_safe
+def resized_image(request, width, height, image_format, name):
+    signature = request.GET.get('s', '')
+    expected = signer.signature(
+        signed_value(name, width, height, image_format)
+    )
+    if not constant_time_compare(signature, expected):
+        return HttpResponseForbidden('Неверная подпись')
+    if not check_params(name, width, height, image_format):
+        raise Http404('Недопустимый размер')
+    body, hit = get_or_render(name, width, height, image_format)
+    content_type = CONTENT_TYPES[image_format]
+    if hit:
+        response = FileResponse(body, content_type=content_type)
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    response[CACHE_HEADER] = 'hit' if hit else 'miss'
+    patch_cache_control(
+        response, public=True, max_age=settings.RESIZE_BROWSER_MAX_AGE
+    )
+    return response
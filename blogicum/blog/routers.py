@@ -0,0 +1,118 @@
+"""Чтение с реплик и «читай свои записи».
+
+Читающие view блога (ReplicaReadMixin) выполняют запросы к моделям blog
+на одной из settings.DATABASE_REPLICAS. После успешного изменяющего
+запроса ReadYourWritesMiddleware ставит cookie, и в течение
+REPLICA_PIN_SECONDS этот браузер читает только с основной базы —
+реплика могла ещё не получить его запись.
+"""
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'primary_until'
+REPLICA_APPS = ('blog',)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_read_from_replica = contextvars.ContextVar(
+    'read_from_replica', default=False
+)
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (_read_from_replica.get() and settings.DATABASE_REPLICAS
+                and model._meta.app_label in REPLICA_APPS):
+            return choose_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе Django пишет в базу, из которой объект загружен.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def is_pinned(request):
+    if request.method not in SAFE_METHODS:
+        return True
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+@contextmanager
+def read_from_replicas(request):
+    token = _read_from_replica.set(not is_pinned(request))
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def replica_reads(view):
+    """Декоратор функции-view: читать с реплик, если браузер не закреплён."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with read_from_replicas(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Class-based view читает с реплик; шаблон отрисовывается там же."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replicas(request):
+            response = super().dispatch(request, *args, **kwargs)
+            # Шаблон тоже обращается к базе, поэтому рисуем внутри блока.
+            if callable(getattr(response, 'render', None)):
+                response.render()
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """После успешного изменяющего запроса закрепляет браузер за основной."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and settings.DATABASE_REPLICAS):
+            window = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + window)),
+                max_age=window, httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,166 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+blog_post_search — FTS5-таблица с внешним содержимым: сами title и text
+лежат в blog_post, в индексе только словарь. Триггеры обновляют индекс
+при любом INSERT, UPDATE и DELETE, в том числе из QuerySet.update() и
+bulk_create, которые не шлют сигналов. Django пересоздаёт таблицу при
+некоторых миграциях SQLite и теряет её триггеры, поэтому install()
+повторяется после каждой миграции (blog.signals). Полная перестройка —
+команда reindex_search.
+
+Ранжирование — bm25 с весом заголовка SEARCH_TITLE_WEIGHT; чем меньше
+значение, тем выше пост. На других СУБД поиск недоступен.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import prefetch_related_objects
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import NEXT, InvalidCursor, KeysetPaginator
+
+TABLE = 'blog_post_search'
+SEARCH_TITLE_WEIGHT = 10.0
+MAX_TERMS = 8
+SNIPPET_TOKENS = 24
+# Непечатаемые маркеры совпадений: разметка добавляется после escape().
+MARK_START, MARK_END = '\x02', '\x03'
+
+INSTALL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        title, text, content='blog_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_insert
+    AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_delete
+    AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END""",
+)
+
+UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TABLE}_update',
+    f'DROP TABLE IF EXISTS {TABLE}',
+)
+
+SEARCH_SQL = f"""
+    SELECT * FROM (
+        SELECT blog_post.*,
+               bm25({TABLE}, %s, 1.0) AS score,
+               highlight({TABLE}, 0, char(2), char(3)) AS title_marked,
+               snippet({TABLE}, 1, char(2), char(3), '…', %s) AS snippet
+        FROM {TABLE}
+        JOIN blog_post ON blog_post.id = {TABLE}.rowid
+        WHERE {TABLE} MATCH %s AND blog_post.is_visible
+    )
+    {{seek}}
+    ORDER BY score {{order}}, id {{order}}
+    LIMIT %s
+"""
+
+
+def is_available(connection=default_connection):
+    return connection.vendor == 'sqlite'
+
+
+def _execute(connection, statements):
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install(connection=default_connection):
+    """Создаёт индекс и триггеры, если их нет; заполняет новый индекс."""
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [TABLE],
+        )
+        created = cursor.fetchone() is None
+    _execute(connection, INSTALL)
+    if created:
+        rebuild(connection)
+
+
+def uninstall(connection=default_connection):
+    _execute(connection, UNINSTALL)
+
+
+def rebuild(connection=default_connection):
+    """Перечитывает индекс из blog_post и сжимает его сегменты."""
+    _execute(connection, (
+        f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')",
+        f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')",
+    ))
+
+
+def match_expression(query):
+    """Запрос пользователя → выражение MATCH.
+
+    Синтаксис FTS5 пользователю не доступен: берутся только слова, каждое
+    в кавычках и как префикс («пост» найдёт «постов»), все обязательны.
+    """
+    terms = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def highlight(marked):
+    return mark_safe(
+        escape(marked)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPaginator(KeysetPaginator):
+    """Курсорная пагинация по (score, id) результатов поиска."""
+
+    def __init__(self, match, per_page):
+        super().__init__(
+            Post.objects.none(), per_page, keys=('score', 'id'),
+            descending=False
+        )
+        self.match = match
+
+    def key_to_python(self, key, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidCursor('Некорректный курсор страницы')
+        return float(value) if key == 'score' else int(value)
+
+    def page_queryset(self, direction=NEXT, values=None):
+        ascending = (direction == NEXT) != self.descending
+        params = [SEARCH_TITLE_WEIGHT, SNIPPET_TOKENS, self.match]
+        seek = ''
+        if values is not None:
+            seek = f'WHERE (score, id) {">" if ascending else "<"} (%s, %s)'
+            params.extend(values)
+        params.append(self.per_page + 1)
+        sql = SEARCH_SQL.format(
+            seek=seek, order='ASC' if ascending else 'DESC'
+        )
+        posts = list(Post.objects.raw(sql, params))
+        prefetch_related_objects(posts, 'author', 'category', 'location')
+        for post in posts:
+            post.title_highlighted = highlight(post.title_marked)
+            post.snippet_highlighted = highlight(post.snippet)
+        return posts
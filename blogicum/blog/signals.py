@@ -0,0 +1,218 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    choices, feed, fragments, page_cache, publishing, search, sqlite, tasks
+)
+from .models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+connection_created.connect(
+    sqlite.configure_connection, dispatch_uid='sqlite_pragmas'
+)
+
+
+@receiver(request_finished, dispatch_uid='fragment_stats_flush')
+def fragment_stats_flush(sender, **kwargs):
+    fragments.flush()
+
+
+@receiver(post_migrate, dispatch_uid='search_install')
+def search_install(sender, app_config=None, using='default', **kwargs):
+    # Пересоздание blog_post в миграции SQLite удаляет триггеры индекса.
+    if app_config is not None and app_config.label == 'blog':
+        search.install(connections[using])
+
+
+@receiver(post_save, sender=Post, dispatch_uid='feed_post_saved')
+def post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed.sync_post(instance)
+
+
+# После карточки ленты: задача сама обновит её готовым image_meta.
+@receiver(post_save, sender=Post, dispatch_uid='images_post_saved')
+def post_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image.name != (
+            instance.image_meta or {}).get('source', ''):
+        tasks.process_post_image.delay(instance.pk)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='images_post_deleted')
+def post_image_deleted(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(
+            tasks.release_post_image.delay,
+            instance.image.name, instance.image_meta
+        ))
+
+
+def adjust_comment_count(post_id, delta):
+    Post.adjust_comment_count(post_id, delta)
+    feed.adjust_comment_count(post_id, delta)
+
+
+# Счётчики правятся в сигналах, а не в Comment.save()/delete(): так их
+# не минуют каскадное удаление (пользователя, поста) и QuerySet.delete().
+@receiver(post_save, sender=Comment, dispatch_uid='feed_comment_saved')
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_comment_count(instance.post_id, 1)
+        return
+    before = instance.__dict__.get('_loaded_post_id')
+    if before is not None and before != instance.post_id:
+        adjust_comment_count(before, -1)
+        adjust_comment_count(instance.post_id, 1)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='mail_comment_saved')
+def comment_notify(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.notify_comment.delay(instance.pk)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid='feed_comment_deleted')
+def comment_deleted(sender, instance, **kwargs):
+    adjust_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Category, dispatch_uid='feed_category_saved')
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        publishing.refresh_category(instance)
+        feed.sync_category(instance)
+
+
+@receiver(pre_delete, sender=Category, dispatch_uid='feed_category_deleted')
+def category_deleted(sender, instance, **kwargs):
+    publishing.detach_category(instance)
+    feed.detach_category(instance)
+
+
+@receiver(post_save, sender=Location, dispatch_uid='feed_location_saved')
+def location_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        feed.sync_location(instance)
+
+
+@receiver(pre_delete, sender=Location, dispatch_uid='feed_location_deleted')
+def location_deleted(sender, instance, **kwargs):
+    feed.detach_location(instance)
+
+
+@receiver(post_save, sender=User, dispatch_uid='feed_user_saved')
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    # Вход пользователя сохраняет только last_login — карточки не трогаем.
+    if update_fields and 'username' not in update_fields:
+        return
+    if not created and not raw:
+        feed.sync_author(instance)
+
+
+# Кэш страниц: сбрасываем только теги объектов, которые изменились.
+LISTING_FIELDS = ('is_visible', 'pub_date', 'category_id', 'author_id')
+
+
+def post_listing_tags(post):
+    return page_cache.listing_tags(post['category_id'], post['author_id'])
+
+
+@receiver(pre_save, sender=Post, dispatch_uid='page_cache_post_changing')
+def post_changing(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._listing_before = Post.objects.filter(
+            pk=instance.pk
+        ).values(*LISTING_FIELDS).first()
+
+
+@receiver(post_save, sender=Post, dispatch_uid='page_cache_post_saved')
+def post_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    tags = [f'post:{instance.pk}']
+    before = instance.__dict__.pop('_listing_before', None)
+    after = {field: getattr(instance, field) for field in LISTING_FIELDS}
+    if before != after:
+        tags += post_listing_tags(after)
+        if before:
+            tags += post_listing_tags(before)
+    page_cache.invalidate(*tags)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='page_cache_post_deleted')
+def post_removed(sender, instance, **kwargs):
+    page_cache.invalidate(
+        f'post:{instance.pk}',
+        *page_cache.listing_tags(instance.category_id, instance.author_id)
+    )
+
+
+@receiver(publishing.visibility_changed,
+          dispatch_uid='page_cache_visibility_changed')
+def visibility_changed(sender, post_ids, **kwargs):
+    tags = []
+    for post in Post.objects.filter(pk__in=post_ids).values(
+            'pk', *LISTING_FIELDS):
+        tags.append(f'post:{post["pk"]}')
+        tags += post_listing_tags(post)
+    page_cache.invalidate(*tags)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='page_cache_comment_saved')
+@receiver(post_delete, sender=Comment,
+          dispatch_uid='page_cache_comment_deleted')
+def comment_changed(sender, instance, raw=False, **kwargs):
+    # В профиле автора комментария выводится число его комментариев.
+    if not raw:
+        page_cache.invalidate(
+            f'post:{instance.post_id}', f'profile:{instance.author_id}'
+        )
+
+
+@receiver(post_save, sender=Category,
+          dispatch_uid='page_cache_category_saved')
+@receiver(pre_delete, sender=Category,
+          dispatch_uid='page_cache_category_deleted')
+def category_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(
+            f'category:{instance.pk}', f'feed:category:{instance.pk}'
+        )
+
+
+@receiver(post_save, sender=Location,
+          dispatch_uid='page_cache_location_saved')
+@receiver(pre_delete, sender=Location,
+          dispatch_uid='page_cache_location_deleted')
+def location_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(f'location:{instance.pk}')
+
+
+@receiver(post_save, sender=User, dispatch_uid='page_cache_user_saved')
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    page_cache.invalidate(f'user:{instance.pk}')
+
+
+@receiver(post_save, sender=Category, dispatch_uid='choices_category_saved')
+@receiver(post_delete, sender=Category,
+          dispatch_uid='choices_category_deleted')
+@receiver(post_save, sender=Location, dispatch_uid='choices_location_saved')
+@receiver(post_delete, sender=Location,
+          dispatch_uid='choices_location_deleted')
+def choices_changed(sender, **kwargs):
+    choices.provider_for(sender).invalidate()
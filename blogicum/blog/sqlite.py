@@ -0,0 +1,39 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# PRAGMA не принимает параметры запроса, поэтому значения проверяем сами.
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+# Реплики открыты только на чтение (mode=ro), а смена режима журнала —
+# запись в файл базы; режим они получают вместе с копией основной.
+READ_ONLY_SKIP = ('journal_mode',)
+
+
+def pragma_statements(pragmas):
+    for name, value in pragmas.items():
+        if not name.isidentifier() or not PRAGMA_VALUE_RE.match(str(value)):
+            raise ImproperlyConfigured(
+                f'Недопустимая настройка SQLITE_PRAGMAS: {name}={value!r}'
+            )
+        yield f'PRAGMA {name} = {value}'
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Применяет settings.SQLITE_PRAGMAS к новому соединению SQLite.
+
+    Выполняется напрямую через sqlite3, мимо execute_wrapper: иначе PRAGMA
+    попали бы в счётчики запросов (QueryBudgetMiddleware, тесты).
+    """
+    if connection.vendor != 'sqlite' or getattr(
+            connection, 'pool_reused', False):
+        # Соединение из пула уже настроено при первой выдаче.
+        return
+    pragmas = settings.SQLITE_PRAGMAS
+    if connection.alias in settings.DATABASE_REPLICAS:
+        pragmas = {
+            name: value for name, value in pragmas.items()
+            if name not in READ_ONLY_SKIP
+        }
+    for statement in pragma_statements(pragmas):
+        connection.connection.execute(statement)
@@ -0,0 +1,270 @@
+"""Статика с хэшами в именах, заранее сжатая, без CDN.
+
+CompressedManifestStaticFilesStorage (STATICFILES_STORAGE) при
+collectstatic пишет копии с хэшем содержимого в имени
+(bootstrap.min.1a2b3c4d5e6f.css) и рядом с текстовыми файлами — .gz
+и, если установлен пакет brotli, .br. Сжатие делается один раз при
+сборке, а не на каждый запрос.
+
+StaticFilesMiddleware отдаёт файлы STATIC_ROOT до сессий и прочих
+middleware: выбирает .br или .gz по Accept-Encoding (с Vary), имена
+с хэшем кэшируются на год с immutable, остальные — STATIC_MAX_AGE
+секунд. Чего нет в STATIC_ROOT, проходит дальше (при runserver —
+к django.contrib.staticfiles).
+
+Сторонние CSS и JS (VENDOR) лежат в static/vendor и сверяются с SRI-хэшами
+(manage.py vendor_static --check). Если файла в static/ нет, шаблонный
+тег vendor_asset подключает его с CDN с атрибутом integrity.
+"""
+import asyncio
+import contextlib
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.http import http_date
+
+from . import media
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# name.<12 знаков md5>.ext — так называет файлы ManifestStaticFilesStorage.
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}(\.[^.]*)?$')
+COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.xml',
+                '.html', '.ico', '.ttf', '.eot'}
+# Файлы меньше не сжимаются: выигрыш меньше заголовков.
+MIN_COMPRESS_SIZE = 256
+# Сжатая копия, которая не меньше 95 % исходника, не нужна.
+MAX_COMPRESS_RATIO = 0.95
+# Путь в static/: адрес на CDN и SRI-хэш из документации Bootstrap.
+VENDOR = {
+    'vendor/bootstrap-5.1.3/css/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/'
+        'bootstrap.min.css',
+        'sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94Wr'
+        'HftjDbrCEXSU1oBoqyl2QvZ6jIW3',
+    ),
+    'vendor/bootstrap-5.1.3/js/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/'
+        'bootstrap.bundle.min.js',
+        'sha384-ka7Sk0Gln4gmtz2MlQnikT1wXgYsOg+OMhuP'
+        '+IlRH9sENBO0LRn5q+8nbTov4+1p',
+    ),
+}
+
+
+def compressors():
+    """(суффикс, Content-Encoding, функция) в порядке предпочтения."""
+    if brotli is not None:
+        yield '.br', 'br', lambda data: brotli.compress(data, quality=11)
+    yield '.gz', 'gzip', lambda data: gzip.compress(data, 9, mtime=0)
+
+
+def is_compressible(name):
+    return posixpath.splitext(name)[1].lower() in COMPRESSIBLE
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        # collectstatic не запускался (тесты, runserver) — имена как есть.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Сжимаем после всех проходов: CSS переписывается не один раз.
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            for suffix in self.compress(name):
+                yield name, name + suffix, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла; список суффиксов записанных."""
+        if not is_compressible(name):
+            return []
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        written = []
+        for suffix, _, encode in compressors():
+            if len(data) >= MIN_COMPRESS_SIZE:
+                compressed = encode(data)
+            else:
+                compressed = data
+            if len(compressed) >= len(data) * MAX_COMPRESS_RATIO:
+                # Копия от прошлой сборки больше не соответствует файлу.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path + suffix)
+                continue
+            with open(path + suffix, 'wb') as file:
+                file.write(compressed)
+            written.append(suffix)
+        return written
+
+
+@lru_cache(maxsize=None)
+def vendored(name):
+    """Есть ли сторонний файл в статике (собранной или в static/)."""
+    if settings.STATIC_ROOT and staticfiles_storage.exists(name):
+        return True
+    return finders.find(name) is not None
+
+
+@receiver(setting_changed)
+def clear_vendored(setting, **kwargs):
+    if setting in ('STATIC_ROOT', 'STATICFILES_DIRS', 'STATICFILES_FINDERS'):
+        vendored.cache_clear()
+
+
+def vendor_source(name):
+    """Адрес стороннего файла и SRI-хэш (None для своей статики)."""
+    if vendored(name):
+        return staticfiles_storage.url(name), None
+    return VENDOR[name]
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме отклонённых (q=0)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and not float(params[2:] or 0):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def negotiate(request, full_path, stats):
+    """Путь, stat и Content-Encoding лучшей сжатой копии или исходника."""
+    try:
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+    except ValueError:
+        return full_path, stats, None
+    for suffix, coding, _ in compressors():
+        if coding not in accepted:
+            continue
+        try:
+            variant = os.stat(full_path + suffix)
+        except OSError:
+            continue
+        if stat.S_ISREG(variant.st_mode):
+            return full_path + suffix, variant, coding
+    return full_path, stats, None
+
+
+def set_common_headers(response, path, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if HASHED_NAME_RE.search(posixpath.basename(path)):
+        patch_cache_control(
+            response, public=True, max_age=media.IMMUTABLE_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.STATIC_MAX_AGE
+        )
+    if is_compressible(path):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def serve(request, path):
+    """Файл STATIC_ROOT с учётом Accept-Encoding или Http404."""
+    full_path, stats = media.resolve(path, settings.STATIC_ROOT)
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    encoding = None
+    if is_compressible(path):
+        full_path, stats, encoding = negotiate(request, full_path, stats)
+    # У сжатой копии свой размер, а значит и свой ETag.
+    etag = media.make_etag(path, stats)
+    last_modified = int(stats.st_mtime)
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return set_common_headers(not_modified, path, etag, last_modified)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+        response.block_size = media.BLOCK_SIZE
+    response['Content-Length'] = stats.st_size
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return set_common_headers(response, path, etag, last_modified)
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику до остальных middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_URL.startswith('/'):
+            # Статика на другом домене (CDN) — не наша забота.
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def is_static(self, request):
+        return (settings.STATIC_ROOT and request.method in ('GET', 'HEAD')
+                and request.path.startswith(self.prefix))
+
+    def serve(self, request):
+        try:
+            return serve(request, request.path[len(self.prefix):])
+        except Http404:
+            return None
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if self.is_static(request):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.is_static(request):
+            # stat() и open() блокируют — не в цикле событий.
+            response = await sync_to_async(
+                self.serve, thread_sensitive=False
+            )(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
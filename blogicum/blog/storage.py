@@ -0,0 +1,106 @@
+"""Хранилище картинок постов по хэшу содержимого.
+
+Загруженный файл копируется кусками во временный, по пути считается
+SHA-256; итоговое имя — «<каталог upload_to>/<хэш><расширение>». Если
+такой файл уже есть, копия удаляется и возвращается имя существующего:
+одинаковые фотографии на диске хранятся один раз.
+
+Ссылки на файл считает база: файл и его уменьшенные копии удаляются
+(blog.images.release), когда после правки или удаления поста на имя
+не ссылается ни один Post. Повторная загрузка и удаление одного файла
+разводятся блокировкой каталога (lock), а повторная загрузка обновляет
+mtime файла — release не удалит его, пока новый пост не закоммичен.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировка первого байта файла через msvcrt.
+    fcntl = None
+    import msvcrt
+
+TEMP_PREFIX = '.upload-'
+LOCK_NAME = '.lock'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменит хэш, а одинаковое содержимое — не конфликт.
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp = tempfile.mkstemp(dir=full_directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            hashed = posixpath.join(directory, digest.hexdigest() + extension)
+            target = self.path(hashed)
+            with self.lock(hashed):
+                if os.path.exists(target):
+                    os.utime(target)
+                    os.unlink(temp)
+                else:
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp, self.file_permissions_mode)
+                    os.replace(temp, target)
+        except BaseException:
+            if os.path.exists(temp):
+                os.unlink(temp)
+            raise
+        return hashed
+
+    @contextmanager
+    def lock(self, name):
+        """Блокировка каталога файла name — между процессами."""
+        directory = self.path(posixpath.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_NAME), 'a+b') as file:
+            lock_file(file)
+            try:
+                yield
+            finally:
+                unlock_file(file)
+
+
+def lock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        return
+    file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK сдаётся через 10 секунд — ждём дальше.
+            continue
+
+
+def unlock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_UN)
+        return
+    file.seek(0)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+post_image_storage = ContentAddressedStorage()
+
+
+def get_post_image_storage():
+    return post_image_storage
@@ -0,0 +1,196 @@
+"""Фоновые задачи с очередью в базе.
+
+@task регистрирует функцию, f.delay(*args, **kwargs) ставит её в очередь:
+строка Task пишется в той же транзакции, что и изменение, вызвавшее
+задачу, поэтому при откате исчезает вместе с ним, а после перезапуска
+никуда не девается. Аргументы хранятся как JSON.
+
+Worker (manage.py run_tasks) забирает готовые задачи пачками и выполняет
+каждую в своей транзакции в пуле потоков. Упавшая задача повторяется
+через TASKS_RETRY_DELAY·2ⁿ секунд (не больше TASKS_RETRY_MAX_DELAY),
+после max_attempts попыток остаётся в таблице со статусом failed.
+Выполненные задачи удаляются. Задача, которую worker не закончил за
+TASKS_LOCK_TIMEOUT секунд (процесс упал), снова попадает в очередь,
+поэтому задачи должны быть идемпотентными.
+
+При TASKS_EAGER задача выполняется сразу при delay() в этом же процессе —
+для тестов и отладки без отдельного worker'а; по умолчанию выключено.
+"""
+import functools
+import json
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger('blog.tasks')
+
+registry = {}
+
+DONE = 'done'
+RETRY = 'retry'
+
+
+class TaskFunction:
+    """Зарегистрированная задача; вызов напрямую выполняет её сразу."""
+
+    def __init__(self, func, name, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        # Круг через JSON и в синхронном режиме: аргументы, которые
+        # нельзя сохранить в очередь, должны падать и в тестах.
+        args, kwargs = json.loads(json.dumps([args, kwargs]))
+        if settings.TASKS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        return self._enqueue(args, kwargs)
+
+    def schedule(self, run_at, *args, **kwargs):
+        """Ставит задачу в очередь на run_at.
+
+        Даже при TASKS_EAGER: отсрочка — часть смысла задачи, и выполнит
+        её worker, а не процесс, вызвавший schedule().
+        """
+        args, kwargs = json.loads(json.dumps([args, kwargs]))
+        return self._enqueue(args, kwargs, run_at=run_at)
+
+    def is_queued(self, by):
+        """Ждёт ли в очереди такая же задача, готовая не позже by."""
+        return Task.objects.filter(
+            name=self.name, status=Task.QUEUED, run_at__lte=by
+        ).exists()
+
+    def _enqueue(self, args, kwargs, **fields):
+        return Task.objects.create(
+            name=self.name, args=args, kwargs=kwargs,
+            max_attempts=self.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            **fields,
+        )
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Регистрирует задачу; применяется с параметрами и без."""
+    def decorate(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        wrapper = TaskFunction(func, task_name, max_attempts)
+        registry[task_name] = wrapper
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def retry_delay(attempts):
+    delay = min(
+        settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASKS_RETRY_MAX_DELAY,
+    )
+    # Разброс, чтобы задачи, упавшие разом, не повторялись разом.
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(limit):
+    """Берёт в работу до limit готовых задач.
+
+    Каждая задача захватывается условным UPDATE … WHERE status='queued':
+    из двух worker'ов её выполнит только один.
+    """
+    now = timezone.now()
+    Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT),
+    ).update(status=Task.QUEUED, locked_at=None)
+    candidates = list(
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by('run_at', 'pk').values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def execute(task_row):
+    """Выполняет взятую задачу; DONE, RETRY или Task.FAILED."""
+    try:
+        func = registry.get(task_row.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task_row.name}')
+        with transaction.atomic():
+            func.func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        logger.exception('Задача %s упала (попытка %s из %s)', task_row,
+                         task_row.attempts, task_row.max_attempts)
+        error = traceback.format_exc()
+        queued = Task.objects.filter(pk=task_row.pk)
+        if task_row.attempts < task_row.max_attempts:
+            queued.update(
+                status=Task.QUEUED, locked_at=None, last_error=error,
+                run_at=timezone.now() + retry_delay(task_row.attempts),
+            )
+            return RETRY
+        queued.update(status=Task.FAILED, locked_at=None, last_error=error)
+        return Task.FAILED
+    finally:
+        close_old_connections()
+    Task.objects.filter(pk=task_row.pk).delete()
+    return DONE
+
+
+class Worker:
+    """Цикл выборки задач; threads > 1 — выполнение в пуле потоков."""
+
+    def __init__(self, threads=1, batch_size=None):
+        self.threads = threads
+        self.batch_size = batch_size or max(threads, 1) * 4
+        self.pool = (
+            ThreadPoolExecutor(threads, thread_name_prefix='task')
+            if threads > 1 else None
+        )
+        self.stopping = threading.Event()
+        self.results = {DONE: 0, RETRY: 0, Task.FAILED: 0}
+
+    def run_once(self):
+        """Выполняет одну пачку; число взятых задач."""
+        tasks = claim(self.batch_size)
+        if self.pool is not None:
+            results = list(self.pool.map(execute, tasks))
+        else:
+            results = [execute(task_row) for task_row in tasks]
+        for result in results:
+            self.results[result] += 1
+        return len(tasks)
+
+    def run(self, poll, once=False):
+        try:
+            while not self.stopping.is_set():
+                if self.run_once():
+                    continue
+                if once:
+                    break
+                self.stopping.wait(poll)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+    def stop(self):
+        self.stopping.set()
@@ -0,0 +1,69 @@
+"""Фоновые задачи блога (см. blog.task_queue)."""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from . import feed, images, outbox
+from .models import Comment, FeedEntry, Post
+from .storage import post_image_storage
+from .task_queue import task
+
+
+@task
+def process_post_image(post_id, force=False):
+    """Копии картинки поста; карточка ленты и кэш страниц — следом.
+
+    В одной транзакции: старый файл освобождается после коммита, когда
+    на него уже не ссылается и карточка ленты.
+    """
+    with transaction.atomic():
+        post = Post.objects.select_related(
+            'author', 'category', 'location'
+        ).filter(pk=post_id).first()
+        if post is None or not images.process(post, force=force):
+            return False
+        feed.sync_post(post)
+    return True
+
+
+@task
+def release_post_image(name, meta):
+    retry_at = images.release(
+        (Post, FeedEntry), post_image_storage, name, meta
+    )
+    if retry_at is not None:
+        release_post_image.schedule(retry_at, name, meta)
+
+
+@task
+def send_outbox():
+    """Отправляет пачку писем из OutgoingEmail."""
+    return outbox.send_batch()
+
+
+@task
+def notify_comment(comment_id):
+    """Письмо автору поста о новом комментарии."""
+    comment = Comment.objects.select_related(
+        'author', 'post__author'
+    ).filter(pk=comment_id).first()
+    if comment is None:
+        return False
+    recipient = comment.post.author
+    if recipient.pk == comment.author_id or not recipient.email:
+        return False
+    context = {
+        'comment': comment,
+        'post': comment.post,
+        'url': settings.SITE_URL + comment.post.get_absolute_url(),
+    }
+    subject = render_to_string(
+        'emails/comment_notification_subject.txt', context
+    )
+    send_mail(
+        ' '.join(subject.split()),
+        render_to_string('emails/comment_notification.txt', context),
+        None, [recipient.email],
+    )
+    return True
@@ -0,0 +1,48 @@
+from django import template
+
+from blog import fragments
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, obj, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.vary_on = vary_on
+
+    def render(self, context):
+        return fragments.render(
+            self.name.resolve(context),
+            self.obj.resolve(context),
+            [value.resolve(context) for value in self.vary_on],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag('cachefragment')
+def do_cachefragment(parser, token):
+    """Кэширует блок по версии объекта.
+
+    Использование::
+
+        {% cachefragment 'comment' comment comment.author.username %}
+            ...
+        {% endcachefragment %}
+
+    Содержимое, зависящее от текущего пользователя, держите снаружи.
+    """
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' ожидает имя фрагмента и объект с полем version."
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
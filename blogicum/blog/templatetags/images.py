@@ -0,0 +1,49 @@
+from django import template
+from django.utils.html import format_html
+
+from blog import resize
+
+register = template.Library()
+
+
+def srcset(storage, variants, image_format):
+    return ', '.join(
+        f'{storage.url(variant[image_format])} {variant["scale"]}x'
+        for variant in variants
+    )
+
+
+@register.simple_tag
+def post_image(obj, kind, alt='', css_class='', style='', loading='lazy'):
+    """<picture> с копиями картинки вида kind (см. blog.images).
+
+    obj — Post или FeedEntry. Пока копий нет, выводит оригинал.
+    """
+    if not obj.image:
+        return ''
+    variants = (obj.image_meta or {}).get('variants', {}).get(kind)
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}" '
+            'decoding="async">',
+            obj.image.url, alt, css_class, style, loading,
+        )
+    storage = obj.image.storage
+    first = variants[0]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" width="{}" height="{}" alt="{}" '
+        'class="{}" style="{}" loading="{}" decoding="async"></picture>',
+        srcset(storage, variants, 'webp'),
+        storage.url(first['jpeg']),
+        srcset(storage, variants, 'jpeg'),
+        first['width'], first['height'], alt, css_class, style, loading,
+    )
+
+
+@register.simple_tag
+def resized_url(image, width=0, height=0, image_format='jpeg'):
+    """Подписанная ссылка на копию картинки нужного размера (blog.resize)."""
+    if not image:
+        return ''
+    return resize.resized_url(image.name, width, height, image_format)
@@ -0,0 +1,26 @@
+from django import template
+from django.utils.html import format_html
+
+from blog import staticfiles
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """<link> или <script> стороннего файла из blog.staticfiles.VENDOR.
+
+    Файл из static/vendor подключается как обычная статика, без него —
+    с CDN с проверкой integrity.
+    """
+    url, integrity = staticfiles.vendor_source(name)
+    if name.endswith('.css'):
+        tag, close = '<link href="{}" rel="stylesheet"', ''
+    else:
+        tag, close = '<script src="{}"', '</script>'
+    if integrity is None:
+        return format_html(tag + '>' + close, url)
+    return format_html(
+        tag + ' integrity="{}" crossorigin="anonymous">' + close,
+        url, integrity,
+    )
@@ -5,6 +5,7 @@ app_name = 'blog'
 
 urlpatterns = [
     path('', views.PostListView.as_view(), name='index'),
+    path('search/', views.PostSearchView.as_view(), name='search'),
     path('posts/<int:pk>/', views.PostDetailView.as_view(), name='detail'),
     path('posts/create/', views.PostCreateView.as_view(), name='create'),
     path('posts/<int:pk>/edit/', views.PostUpdateView.as_view(), name='edit'),
@@ -20,6 +21,12 @@ urlpatterns = [
     path('profile/<str:username>/edit/',
          views.ProfileEditView.as_view(),
          name='edit_profile'),
+    path('autocomplete/<slug:kind>/',
+         views.autocomplete,
+         name='autocomplete'),
+    path('posts/<int:pk>/comments/',
+         views.comment_list,
+         name='comments'),
     path('posts/<int:post_id>/comment/',
          views.comment_create,
          name='add_comment'),
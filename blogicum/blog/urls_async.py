@@ -0,0 +1,22 @@
+from django.urls import URLPattern
+
+from . import async_views
+from .urls import app_name, urlpatterns as sync_urlpatterns  # noqa: F401
+
+ASYNC_VIEWS = {
+    'index': async_views.AsyncPostListView,
+    'detail': async_views.AsyncPostDetailView,
+    'category': async_views.AsyncCategoryPostsView,
+    'profile': async_views.AsyncProfileView,
+}
+
+# Те же маршруты, что в blog.urls; читающие страницы — асинхронные.
+urlpatterns = [
+    URLPattern(
+        pattern.pattern,
+        ASYNC_VIEWS[pattern.name].as_view(),
+        pattern.default_args,
+        pattern.name,
+    ) if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
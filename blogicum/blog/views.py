@@ -1,70 +1,187 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
-from django.views.generic import DeleteView
+from django.views.generic import DeleteView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
 from django.urls import reverse_lazy
-from django.db.models import Count
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserChangeForm
-from django.http import Http404
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.utils.http import urlencode
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
-from .models import Post, Category, Comment
+from django.conf import settings
+from .models import Post, Category, Comment, FeedEntry
 from .forms import PostForm, CommentForm
+from . import choices, page_cache, search, write_queue
+from .identity import identity_map
+from .routers import ReplicaReadMixin, replica_reads
+from .paginators import CachedCountPaginator, InvalidCursor, KeysetPaginator
 
 User = get_user_model()
 
 
-class PostListView(ListView):
-    model = Post
+class KeysetPaginationMixin:
+    """Курсорная пагинация для лент; ?page=N остаётся запасным режимом.
+
+    Число записей оба пагинатора берут из blog.counts по get_count_scope();
+    заголовок X-Count-Strategy сообщает, из кэша оно или из COUNT(*).
+    """
+
+    cursor_kwarg = 'cursor'
+    keyset_paginator_class = KeysetPaginator
+    paginator_class = CachedCountPaginator
+    keyset_keys = ('pub_date', 'id')
+
+    def get_count_scope(self):
+        return None
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return self.keyset_paginator_class(
+            queryset, page_size, keys=self.keyset_keys,
+            count_scope=self.get_count_scope()
+        )
+
+    def get_paginator(self, *args, **kwargs):
+        kwargs.setdefault('count_scope', self.get_count_scope())
+        return super().get_paginator(*args, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        paginator = context.get('paginator')
+        if paginator is not None:
+            # Шаблон обращается к count при отрисовке, поэтому после неё.
+            def report_count_strategy(response):
+                if paginator.count_strategy:
+                    response['X-Count-Strategy'] = paginator.count_strategy
+            response.add_post_render_callback(report_count_strategy)
+        return response
+
+
+class PageCacheMixin:
+    """Разрешает кэшировать страницу для анонимов под тегами из контекста."""
+
+    def get_page_cache_tags(self, context):
+        return []
+
+    def render_to_response(self, context, **response_kwargs):
+        page_cache.tag(self.request, *self.get_page_cache_tags(context))
+        return super().render_to_response(context, **response_kwargs)
+
+
+def cards_tags(cards):
+    return [tag for card in cards for tag in page_cache.card_tags(card)]
+
+
+class IdentityMapObjectMixin:
+    """get_object() через карту запроса: test_func и сам view делят объект."""
+
+    def get_object(self, queryset=None):
+        if queryset is None:
+            queryset = self.get_queryset()
+        return identity_map(self.request).get_or_404(
+            queryset, pk=self.kwargs[self.pk_url_kwarg]
+        )
+
+
+class PostListView(ReplicaReadMixin, PageCacheMixin,
+                   KeysetPaginationMixin, ListView):
+    model = FeedEntry
     template_name = 'blog/index.html'
     paginate_by = 10
     context_object_name = 'posts'
+    keyset_keys = ('pub_date', 'post_id')
 
     def get_queryset(self):
-        queryset = Post.objects.select_related(
-            'author', 'category', 'location'
-        ).filter(
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=timezone.now()
-        ).annotate(
-            comment_count=Count('comments')
-        ).order_by('-pub_date')
+        return FeedEntry.objects.listed().order_by('-pub_date')
+
+    def get_count_scope(self):
+        return ('feed', 'listed')
+
+    def get_page_cache_tags(self, context):
+        return ['feed', *cards_tags(context['posts'])]
+
+
+class PostSearchView(ReplicaReadMixin, TemplateView):
+    """Полнотекстовый поиск по опубликованным постам (blog.search)."""
+
+    template_name = 'blog/search.html'
+    paginate_by = 10
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context.update(query=query, posts=[])
+        match = search.match_expression(query)
+        if not match:
+            return context
+        paginator = search.SearchPaginator(match, self.paginate_by)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        context.update(
+            posts=page.object_list,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+            cursor_query=urlencode({'q': query}) + '&',
+        )
+        return context
+
+
+COMMENTS_PER_PAGE = 20
 
-        return queryset
 
+def get_comments_page(request, post):
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        keys=('created_at', 'id'),
+        descending=False
+    )
+    try:
+        return paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        raise Http404(str(e))
 
-class PostDetailView(DetailView):
+
+class PostDetailView(ReplicaReadMixin, PageCacheMixin, DetailView):
     model = Post
     template_name = 'blog/detail.html'
     context_object_name = 'post'
 
     def get_queryset(self):
-        queryset = Post.objects.select_related(
-            'author', 'category', 'location'
-        )
-
-        post = get_object_or_404(queryset, pk=self.kwargs['pk'])
-
-        if self.request.user.is_authenticated and self.request.user == post.author:
-            return queryset
+        return Post.objects.with_related()
 
-        if (not post.is_published or not post.category.is_published 
-        or post.pub_date > timezone.now()):
+    def get_object(self, queryset=None):
+        post = super().get_object(queryset)
+        if not post.is_visible and self.request.user != post.author:
             raise Http404("Пост не найден")
-
-        return queryset
+        return post
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = CommentForm()
-        context['comments'] = self.object.comments.select_related('author')
+        context['comments'] = get_comments_page(self.request, self.object)
         return context
 
+    def get_page_cache_tags(self, context):
+        return [
+            *page_cache.card_tags(self.object),
+            *(f'user:{comment.author_id}' for comment in context['comments']),
+        ]
+
 
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
@@ -73,15 +190,17 @@ class PostCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
+        self.object = write_queue.run(form.save)
         messages.success(self.request, 'Пост успешно создан!')
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         return reverse_lazy('blog:profile',
                             kwargs={'username': self.request.user.username})
 
 
-class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin,
+                     IdentityMapObjectMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -98,7 +217,8 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return reverse_lazy('blog:detail', kwargs={'pk': self.object.pk})
 
 
-class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin,
+                     IdentityMapObjectMixin, DeleteView):
     model = Post
     template_name = 'blog/delete.html'
 
@@ -112,76 +232,95 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
                             kwargs={'username': self.request.user.username})
 
 
-class CategoryPostsView(ListView):
-    model = Post
+class CategoryPostsView(ReplicaReadMixin, PageCacheMixin,
+                        KeysetPaginationMixin, ListView):
+    model = FeedEntry
     template_name = 'blog/category.html'
     paginate_by = 10
     context_object_name = 'posts'
+    keyset_keys = ('pub_date', 'post_id')
+
+    def get_category(self):
+        return identity_map(self.request).get_or_404(
+            Category, slug=self.kwargs['category_slug']
+        )
 
     def get_queryset(self):
-        category_slug = self.kwargs['category_slug']
-        category = get_object_or_404(Category, slug=category_slug)
+        category = self.get_category()
 
         if not category.is_published:
             raise Http404("Категория не найдена")
 
-        queryset = Post.objects.select_related(
-            'author', 'category', 'location'
-        ).filter(
-            category=category,
-            is_published=True,
-            pub_date__lte=timezone.now()
-        ).annotate(
-            comment_count=Count('comments')
+        return FeedEntry.objects.listed().filter(
+            category=category
         ).order_by('-pub_date')
 
-        return queryset
+    def get_count_scope(self):
+        return (f'feed:category:{self.get_category().pk}', 'listed')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        category_slug = self.kwargs['category_slug']
-        context['category'] = get_object_or_404(Category, slug=category_slug)
+        context['category'] = self.get_category()
         return context
 
+    def get_page_cache_tags(self, context):
+        category = context['category']
+        return [
+            f'category:{category.pk}',
+            f'feed:category:{category.pk}',
+            *cards_tags(context['posts']),
+        ]
 
-class ProfileView(ListView):
+
+class ProfileView(ReplicaReadMixin, PageCacheMixin,
+                  KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/profile.html'
     paginate_by = 10
     context_object_name = 'posts'
 
+    def get_profile_user(self):
+        return identity_map(self.request).get_or_404(
+            User, username=self.kwargs['username']
+        )
+
     def get_queryset(self):
-        username = self.kwargs['username']
-        user = get_object_or_404(User, username=username)
+        user = self.get_profile_user()
 
         if self.request.user == user:
             queryset = Post.objects.filter(
                 author=user
             ).select_related(
                 'category', 'location'
-            ).annotate(
-                comment_count=Count('comments')
             ).order_by('-pub_date')
         else:
-            queryset = Post.objects.filter(
-                author=user,
-                is_published=True,
-                category__is_published=True,
-                pub_date__lte=timezone.now()
+            queryset = Post.objects.published().filter(
+                author=user
             ).select_related(
                 'category', 'location'
-            ).annotate(
-                comment_count=Count('comments')
             ).order_by('-pub_date')
 
         return queryset
 
+    def get_count_scope(self):
+        # Автор видит и скрытые посты — это отдельное число.
+        user = self.get_profile_user()
+        variant = 'all' if self.request.user == user else 'published'
+        return (f'profile:{user.pk}', variant)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        username = self.kwargs['username']
-        context['profile_user'] = get_object_or_404(User, username=username)
+        context['profile_user'] = self.get_profile_user()
         return context
 
+    def get_page_cache_tags(self, context):
+        user = context['profile_user']
+        return [
+            f'user:{user.pk}',
+            f'profile:{user.pk}',
+            *cards_tags(context['posts']),
+        ]
+
 
 class ProfileEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = User
@@ -201,6 +340,18 @@ class ProfileEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
                             kwargs={'username': self.request.user.username})
 
 
+@replica_reads
+def comment_list(request, pk):
+    """Очередная порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post, pk=pk)
+    if not post.is_visible and request.user != post.author:
+        raise Http404("Пост не найден")
+    return render(request, 'blog/includes/comments.html', {
+        'post': post,
+        'comments': get_comments_page(request, post),
+    })
+
+
 @login_required
 def comment_create(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -211,7 +362,7 @@ def comment_create(request, post_id):
             comment = form.save(commit=False)
             comment.post = post
             comment.author = request.user
-            comment.save()
+            write_queue.run(comment.save)
             messages.success(request, 'Комментарий добавлен!')
 
     return redirect('blog:detail', pk=post_id)
@@ -219,7 +370,11 @@ def comment_create(request, post_id):
 
 @login_required
 def comment_edit(request, post_id, comment_id):
-    comment = get_object_or_404(Comment, pk=comment_id, post_id=post_id)
+    comment = get_object_or_404(
+        Comment.objects.select_related('post'),
+        pk=comment_id,
+        post_id=post_id
+    )
 
     if comment.author != request.user:
         raise PermissionDenied
@@ -227,7 +382,7 @@ def comment_edit(request, post_id, comment_id):
     if request.method == 'POST':
         form = CommentForm(request.POST, instance=comment)
         if form.is_valid():
-            form.save()
+            write_queue.run(form.save)
             messages.success(request, 'Комментарий обновлен!')
             return redirect('blog:detail', pk=post_id)
     else:
@@ -242,7 +397,11 @@ def comment_edit(request, post_id, comment_id):
 
 @login_required
 def comment_delete(request, post_id, comment_id):
-    comment = get_object_or_404(Comment, pk=comment_id, post_id=post_id)
+    comment = get_object_or_404(
+        Comment.objects.select_related('post'),
+        pk=comment_id,
+        post_id=post_id
+    )
 
     if comment.author != request.user:
         raise PermissionDenied
@@ -256,3 +415,17 @@ def comment_delete(request, post_id, comment_id):
         'comment': comment,
         'post': comment.post
     })
+
+
+@login_required
+def autocomplete(request, kind):
+    """Варианты категории или места по началу слова, для PostForm."""
+    provider = choices.PROVIDERS.get(kind)
+    if provider is None:
+        raise Http404('Неизвестный список')
+    found = provider.complete(
+        request.GET.get('q', ''), settings.AUTOCOMPLETE_LIMIT
+    )
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': str(obj)} for obj in found]
+    })
@@ -0,0 +1,139 @@
+"""Очередь записей в SQLite с одним потоком-писателем.
+
+SQLite допускает одного писателя; при конкурентных сохранениях запросы
+спорят за блокировку и получают «database is locked». Здесь запись
+из view передаётся в очередь, единственный поток выполняет её вместе
+с соседними в одной транзакции (до WRITE_QUEUE_BATCH_SIZE операций
+или WRITE_QUEUE_BATCH_MS миллисекунд ожидания) и возвращает результат
+ждущему запросу. Каждая операция идёт в своей точке сохранения, поэтому
+ошибка одной не откатывает остальные.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger('blog.write_queue')
+
+
+class WriteQueue:
+
+    def __init__(self, batch_size, batch_ms):
+        self.batch_size = batch_size
+        self.batch_wait = batch_ms / 1000
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.max_depth = 0
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self.max_batch = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='write-queue', daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.queue.put((func, args, kwargs, future))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        self.start()
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self.commit(batch)
+            finally:
+                close_old_connections()
+
+    def commit(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for func, args, kwargs, future in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs)))
+                    except Exception as error:
+                        outcomes.append((future, error))
+        except Exception as error:
+            # Не удался сам COMMIT — ни одна операция не сохранена.
+            outcomes = [(future, error) for *_, future in batch]
+
+        for future, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                self.failed += 1
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+        self.batches += 1
+        self.operations += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        logger.debug(
+            'Пакет из %d операций, в очереди осталось %d',
+            len(batch), self.queue.qsize()
+        )
+
+    def stats(self):
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'batches': self.batches,
+            'operations': self.operations,
+            'failed': self.failed,
+            'max_batch': self.max_batch,
+            'avg_batch': (
+                self.operations / self.batches if self.batches else 0.0
+            ),
+        }
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(
+                settings.WRITE_QUEUE_BATCH_SIZE, settings.WRITE_QUEUE_BATCH_MS
+            )
+    return _write_queue
+
+
+def run(func, *args, **kwargs):
+    """Выполняет запись через очередь, если она включена, и ждёт результат.
+
+    Внутри уже открытой транзакции запись идёт сразу: иначе писатель
+    ждал бы блокировку, которую держит сам запрос.
+    """
+    if not settings.WRITE_QUEUE_ENABLED or connection.in_atomic_block:
+        return func(*args, **kwargs)
+    future = get_write_queue().submit(func, *args, **kwargs)
+    return future.result(timeout=settings.WRITE_QUEUE_TIMEOUT)
@@ -0,0 +1,18 @@
+"""
+ASGI config for blogicum project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read-only pages are served by the async views from blog.async_views.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+os.environ.setdefault('BLOGICUM_URLCONF', 'blogicum.urls_async')
+
+application = get_asgi_application()
@@ -2,6 +2,7 @@
 Django settings for blogicum project.
 """
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,15 +27,25 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.identity.IdentityMapMiddleware',
+    'blog.page_cache.AnonymousPageCacheMiddleware',
+    'blog.routers.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'blogicum.urls'
+# Проверка бюджета SQL каждого запроса (см. QUERY_BUDGETS) — для отладки.
+QUERY_BUDGET_ENABLED = os.environ.get('BLOGICUM_QUERY_BUDGET') == '1'
+if QUERY_BUDGET_ENABLED:
+    MIDDLEWARE.insert(0, 'blog.middleware.QueryBudgetMiddleware')
+
+# blogicum/asgi.py подставляет blogicum.urls_async с асинхронными view.
+ROOT_URLCONF = os.environ.get('BLOGICUM_URLCONF', 'blogicum.urls')
 
 TEMPLATES = [
     {
@@ -54,13 +65,59 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
+# Пул соединений (blog.db_pool): соединение не закрывается после запроса,
+# а возвращается в пул. MAX_LIFETIME и MAX_IDLE — в секундах, TIMEOUT —
+# сколько ждать свободного соединения. Для PostgreSQL — ENGINE
+# blog.db_backends.postgresql с тем же ключом POOL.
+DATABASE_POOL = {
+    'MAX_SIZE': 20,
+    'MAX_LIFETIME': 1800,
+    'MAX_IDLE': 300,
+    'TIMEOUT': 10,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'blog.db_backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'POOL': DATABASE_POOL,
     }
 }
 
+# Реплики только для чтения (blog.routers): пути к копиям SQLite через
+# os.pathsep в BLOGICUM_SQLITE_REPLICAS. Первая копия получает алиас
+# replica, следующие — replica_2, replica_3 и т. д. Обновить копии:
+# manage.py sync_replicas. В тестах реплики смотрят в основную базу.
+DATABASE_REPLICAS = []
+_replica_paths = os.environ.get('BLOGICUM_SQLITE_REPLICAS', '')
+for _number, _path in enumerate(
+        filter(None, _replica_paths.split(os.pathsep)), start=1):
+    _alias = 'replica' if _number == 1 else f'replica_{_number}'
+    DATABASES[_alias] = {
+        'ENGINE': 'blog.db_backends.sqlite3',
+        'NAME': f'file:{_path}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'POOL': DATABASE_POOL,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Сколько секунд после своей записи браузер читает только с основной базы.
+REPLICA_PIN_SECONDS = 10
+
+# PRAGMA для каждого нового соединения SQLite (blog.sqlite). В режиме WAL
+# читатели не ждут писателя; busy_timeout (мс) — сколько ждать блокировку
+# записи, прежде чем получить «database is locked». cache_size < 0 — в КиБ.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -84,10 +141,98 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic добавляет хэш содержимого в имена и пишет .gz/.br рядом
+# с текстовыми файлами; blog.staticfiles.StaticFilesMiddleware отдаёт их
+# по Accept-Encoding. Имена с хэшем кэшируются навсегда, остальные —
+# STATIC_MAX_AGE секунд.
+STATICFILES_STORAGE = 'blog.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60 * 60
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Файлы MEDIA_ROOT отдаёт blog.media.serve и без DEBUG. Имена по хэшу
+# кэшируются навсегда, остальные — MEDIA_MAX_AGE секунд. MEDIA_SENDFILE
+# 'x-accel-redirect' (nginx, internal-location
+# MEDIA_ACCEL_REDIRECT_PREFIX) или 'x-sendfile' (Apache, lighttpd)
+# передаёт отдачу файла веб-серверу.
+MEDIA_MAX_AGE = 60 * 60
+MEDIA_SENDFILE = os.environ.get('BLOGICUM_MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Общий для всех процессов (веб, run_tasks, publish_scheduled) кэш:
+    # в нём версии тегов страниц и списков выбора. В продакшене лучше
+    # Redis или Memcached; LocMemCache здесь не годится (см. blog.checks).
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'BLOGICUM_SHARED_CACHE_DIR', str(BASE_DIR / 'cache')
+        ),
+    },
+}
+
+# Кэш целых страниц для анонимных пользователей (blog.page_cache);
+# 0 отключает кэш.
+PAGE_CACHE_ALIAS = 'shared'
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Фрагменты шаблонов ({% cachefragment %}) ключуются версией объекта,
+# поэтому живут долго. Счётчики попаданий (manage.py fragment_cache_stats)
+# видны между процессами только в общем кэше вроде Redis или Memcached.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Списки категорий и мест для PostForm (blog.choices) ключуются версией,
+# которую меняют сигналы; версия лежит в общем кэше и живёт не дольше
+# CHOICES_VERSION_TIMEOUT секунд — столько виден список после
+# queryset.update() в обход сигналов. Длиннее CHOICES_SELECT_LIMIT
+# вариантов <select> не выводится целиком: варианты подгружаются
+# с blog:autocomplete, не больше AUTOCOMPLETE_LIMIT за раз.
+CHOICES_CACHE_ALIAS = 'shared'
+CHOICES_CACHE_TIMEOUT = 60 * 60 * 24
+CHOICES_VERSION_TIMEOUT = 60
+CHOICES_SELECT_LIMIT = 200
+AUTOCOMPLETE_LIMIT = 20
+
+# Ограничения загружаемых картинок (blog.images.probe): размер файла
+# и число точек после распаковки проверяются по заголовку, до
+# декодирования.
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+# Файл картинки без ссылок удаляется, только если его не загружали
+# повторно последние IMAGE_RELEASE_GRACE секунд (см. blog.images.release).
+IMAGE_RELEASE_GRACE = 10 * 60
+
+# Копии картинок произвольного размера по подписанной ссылке
+# (blog.resize): сторона не больше RESIZE_MAX_DIMENSION, дисковый кэш
+# не больше RESIZE_CACHE_MAX_BYTES, браузер хранит копию
+# RESIZE_BROWSER_MAX_AGE секунд.
+RESIZE_MAX_DIMENSION = 2400
+RESIZE_CACHE_DIR = BASE_DIR / 'resize_cache'
+RESIZE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESIZE_BROWSER_MAX_AGE = 60 * 60 * 24
+
+# Кэш числа записей лент для пагинаторов (blog.counts). Сбрасывается
+# сигналами, таймаут лишь ограничивает устаревание; 0 — всегда COUNT(*).
+LISTING_COUNT_TIMEOUT = 60 * 5
+
+# Размер пула потоков, в котором асинхронные view (blog.async_views)
+# выполняют ORM и отрисовку шаблонов.
+ASYNC_VIEW_THREADS = 8
+
+# Очередь записей с одним потоком-писателем (blog.write_queue) для
+# comment_create, comment_edit и PostCreateView. Пакет фиксируется, когда
+# набралось BATCH_SIZE операций или прошло BATCH_MS миллисекунд;
+# TIMEOUT — сколько секунд запрос ждёт свою запись.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_BATCH_SIZE = 50
+WRITE_QUEUE_BATCH_MS = 5
+WRITE_QUEUE_TIMEOUT = 30
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
@@ -95,5 +240,60 @@ LOGIN_REDIRECT_URL = 'blog:index'
 LOGOUT_REDIRECT_URL = 'blog:index'
 
 # إعدادات البريد الإلكتروني (للتطوير)
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач (blog.mail), а из неё — через
+# QUEUED_EMAIL_BACKEND.
+EMAIL_BACKEND = 'blog.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+# Очередь писем (blog.outbox): пачка до EMAIL_BATCH_SIZE писем уходит
+# через одно соединение; на домен получателя — не больше
+# EMAIL_DOMAIN_RATE_LIMIT писем за EMAIL_DOMAIN_RATE_WINDOW секунд;
+# одинаковое письмо в течение EMAIL_DEDUPE_WINDOW секунд не повторяется.
+EMAIL_BATCH_SIZE = 100
+EMAIL_DOMAIN_RATE_LIMIT = 30
+EMAIL_DOMAIN_RATE_WINDOW = 60
+EMAIL_DEDUPE_WINDOW = 60 * 60
+EMAIL_MAX_ATTEMPTS = 5
+# Адрес сайта для ссылок в письмах.
+SITE_URL = os.environ.get('BLOGICUM_SITE_URL', 'http://127.0.0.1:8000')
+
+# Фоновые задачи (blog.task_queue) выполняет manage.py run_tasks.
+# TASKS_EAGER (BLOGICUM_TASKS_EAGER=1) выполняет их сразу в процессе,
+# вызвавшем delay(), — только для тестов и отладки без worker'а: тогда
+# картинки и письма снова обрабатываются внутри запроса. Повтор
+# упавшей задачи — через TASKS_RETRY_DELAY·2ⁿ секунд, не больше
+# TASKS_RETRY_MAX_DELAY; TASKS_LOCK_TIMEOUT — через сколько секунд
+# задача упавшего worker'а возвращается в очередь.
+TASKS_EAGER = os.environ.get('BLOGICUM_TASKS_EAGER') == '1'
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 60 * 60
+TASKS_LOCK_TIMEOUT = 60 * 10
+TASKS_WORKER_THREADS = 4
+TASKS_POLL_SECONDS = 1
+
+# Бюджет SQL-запросов на один запрос к странице (по имени URL).
+# Проверяется тестами tests/test_query_budgets.py на 10/100/1000 строк,
+# а при BLOGICUM_QUERY_BUDGET=1 — QueryBudgetMiddleware, которая пишет
+# превышения в лог.
+QUERY_BUDGETS = {
+    'blog:index': 1,
+    'blog:detail': 2,
+    'blog:search': 4,
+    'blog:autocomplete': 3,
+    'blog:comments': 2,
+    'blog:create': 4,
+    'blog:edit': 6,
+    'blog:delete': 4,
+    'blog:category': 2,
+    'blog:profile': 4,
+    'blog:edit_profile': 5,
+    'blog:add_comment': 9,  # +1: письмо автору поста (blog.tasks)
+    'blog:edit_comment': 4,
+    'blog:delete_comment': 4,
+    'pages:about': 0,
+    'pages:rules': 0,
+    'users:registration': 0,
+    'users:register': 0,
+}
@@ -1,14 +1,21 @@
-﻿from django.contrib import admin
-from django.urls import path, include
+﻿import re
+
+from django.contrib import admin
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from blog import media, resize
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls')),
     path('auth/', include('users.urls')),  # ⭐ أضف هذا السطر
     path('', include('blog.urls')),
     path('pages/', include('pages.urls')),
+    path('resize/<int:width>x<int:height>/<slug:image_format>/<path:name>',
+         resize.resized_image,
+         name='resized_image'),
 ]
 
 # Custom error handlers
@@ -16,6 +23,13 @@ handler403 = 'pages.views.csrf_failure'
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.server_error'
 
+# MEDIA_URL на другом домене (CDN) Django не обслуживает.
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(re_path(
+        r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve,
+        name='media',
+    ))
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
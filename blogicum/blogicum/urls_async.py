@@ -0,0 +1,17 @@
+"""URLconf для ASGI: читающие страницы blog и pages — асинхронные.
+
+Подключается из blogicum/asgi.py через BLOGICUM_URLCONF.
+"""
+from django.urls import include, path
+
+from .urls import handler403, handler404, handler500  # noqa: F401
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_NAMESPACES = ('blog', 'pages')
+
+urlpatterns = [
+    path('', include('blog.urls_async')),
+    path('pages/', include('pages.urls_async')),
+    *(pattern for pattern in sync_urlpatterns
+      if getattr(pattern, 'namespace', None) not in ASYNC_NAMESPACES),
+]
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'pages'
+
+urlpatterns = [
+    path('about/', views.AsyncAboutView.as_view(), name='about'),
+    path('rules/', views.AsyncRulesView.as_view(), name='rules'),
+]
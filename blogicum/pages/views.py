@@ -2,6 +2,8 @@
 from django.views.generic import TemplateView
 from django.views.decorators.csrf import requires_csrf_token
 
+from blog.async_views import AsyncViewMixin
+
 
 class AboutView(TemplateView):
     template_name = 'pages/about.html'
@@ -11,6 +13,14 @@ class RulesView(TemplateView):
     template_name = 'pages/rules.html'
 
 
+class AsyncAboutView(AsyncViewMixin, AboutView):
+    pass
+
+
+class AsyncRulesView(AsyncViewMixin, RulesView):
+    pass
+
+
 @requires_csrf_token
 def csrf_failure(request, reason=""):
     return render(request, 'pages/403csrf.html', status=403)
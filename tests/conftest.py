@@ -41,6 +41,28 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def eager_tasks(settings):
+    # Фоновые задачи (blog.task_queue) выполняются сразу при delay().
+    settings.TASKS_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path_factory):
+    # Откат транзакции теста не рассылает сигналы, сбрасывающие кэш.
+    from django.core.cache import cache
+    cache.clear()
+    # Общий файловый кэш — свой пустой каталог на каждый тест.
+    settings.CACHES = {
+        **settings.CACHES,
+        "shared": {
+            **settings.CACHES["shared"],
+            "LOCATION": str(tmp_path_factory.mktemp("cache")),
+        },
+    }
+    yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -363,6 +385,7 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.urls import resolve
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+@pytest.fixture
+def async_urls(settings):
+    settings.ROOT_URLCONF = "blogicum.urls_async"
+
+
+@pytest.mark.parametrize(
+    "path", ["/", "/pages/about/", "/pages/rules/"]
+)
+def test_read_views_are_async(async_urls, path):
+    assert asyncio.iscoroutinefunction(resolve(path).func), (
+        f"Убедитесь, что страница {path} под ASGI обслуживается "
+        "асинхронным view."
+    )
+
+
+def test_async_views_render_pages(
+        async_urls, async_client, post_with_published_location):
+    post = post_with_published_location
+    for url in (
+        "/",
+        f"/posts/{post.pk}/",
+        f"/category/{post.category.slug}/",
+        f"/profile/{post.author.username}/",
+        "/pages/about/",
+    ):
+        response = async_to_sync(async_client.get)(url)
+        assert response.status_code == 200, url
+    response = async_to_sync(async_client.get)(f"/posts/{post.pk}/")
+    assert post.title in response.content.decode()
+
+
+def test_async_detail_hides_unpublished_post(
+        async_urls, async_client, mixer, user, published_category):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False,
+    )
+    response = async_to_sync(async_client.get)(f"/posts/{post.pk}/")
+    assert response.status_code == 404
+
+
+def test_bench_servers_command(settings, capsys):
+    settings.ALLOWED_HOSTS = ["localhost"]
+    call_command(
+        "bench_servers", "/pages/about/",
+        "--requests", "4", "--concurrency", "2",
+    )
+    out = capsys.readouterr().out
+    for label in ("WSGI", "ASGI/sync", "ASGI "):
+        assert label in out
+    assert "ошибок 0" in out
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from blog import choices
+from blog.forms import PostForm
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def locations(mixer):
+    return [
+        mixer.blend("blog.Location", name=name)
+        for name in ("Санкт-Петербург", "Петрозаводск", "Москва")
+    ]
+
+
+def test_form_choices_come_from_cache(
+        django_assert_num_queries, published_category, locations):
+    PostForm().as_p()
+    with django_assert_num_queries(0):
+        html = PostForm().as_p()
+    form = PostForm(data={
+        "title": "Заголовок", "text": "Текст",
+        "pub_date": "2024-01-01T10:00",
+        "category": published_category.pk,
+        "location": locations[0].pk,
+    })
+    # Флаг публикации категории перечитывается из базы.
+    with django_assert_num_queries(1):
+        assert form.is_valid(), form.errors
+    assert "Петрозаводск" in html
+    assert form.cleaned_data["category"].pk == published_category.pk
+
+
+def test_new_choice_invalidates_cache(mixer, published_category):
+    PostForm().as_p()
+    location = mixer.blend("blog.Location", name="Казань")
+    assert "Казань" in PostForm().as_p(), (
+        "Убедитесь, что список мест обновляется после добавления места."
+    )
+    location.delete()
+    assert "Казань" not in PostForm().as_p()
+
+
+def test_unknown_choice_is_rejected(published_category):
+    form = PostForm(data={
+        "title": "Заголовок", "text": "Текст",
+        "pub_date": "2024-01-01T10:00",
+        "category": published_category.pk + 1000,
+    })
+    assert not form.is_valid()
+    assert "category" in form.errors
+
+
+def test_large_list_renders_selected_only(settings, locations):
+    settings.CHOICES_SELECT_LIMIT = 2
+    html = str(PostForm(initial={"location": locations[1].pk})["location"])
+    assert "Петрозаводск" in html
+    assert "Москва" not in html
+    assert 'data-autocomplete="/autocomplete/location/"' in html
+
+
+def test_autocomplete(user_client, client, locations):
+    response = user_client.get("/autocomplete/location/", {"q": "Пет"})
+    assert response.status_code == 200
+    texts = [item["text"] for item in response.json()["results"]]
+    assert texts == ["Петрозаводск", "Санкт-Петербург"], (
+        "Убедитесь, что автодополнение ищет по началу любого слова."
+    )
+    assert user_client.get("/autocomplete/nothing/").status_code == 404
+    assert client.get("/autocomplete/location/").status_code == 302
+
+
+def test_stale_cached_category_is_rechecked(published_category):
+    PostForm().as_p()
+    type(published_category).objects.filter(
+        pk=published_category.pk
+    ).update(is_published=False)
+    form = PostForm(data={
+        "title": "Заголовок", "text": "Текст",
+        "pub_date": "2024-01-01T10:00",
+        "category": published_category.pk,
+    })
+    assert form.is_valid(), form.errors
+    assert not form.cleaned_data["category"].is_published, (
+        "Убедитесь, что флаг публикации категории берётся из базы, "
+        "а не из кэша."
+    )
+
+
+def test_version_expires(settings, published_category):
+    settings.CHOICES_VERSION_TIMEOUT = 0.001
+    choices.get_cache().clear()
+    PostForm().as_p()
+    type(published_category).objects.filter(
+        pk=published_category.pk
+    ).update(title="Переименованная")
+    time.sleep(0.01)
+    assert "Переименованная" in PostForm().as_p(), (
+        "Убедитесь, что версия списка устаревает без сигналов."
+    )
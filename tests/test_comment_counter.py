@@ -0,0 +1,97 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+
+from blog.models import Comment, FeedEntry, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_counter_follows_comments(mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        "Убедитесь, что `Post.comment_count` растёт при добавлении"
+        " комментария."
+    )
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+    comments[1].text = "edited"
+    comments[1].save()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+
+def test_admin_bulk_delete_updates_counter(
+        mixer, rf, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(4).blend("blog.Comment", post=post)
+    model_admin = site._registry[Comment]
+    to_delete = Comment.objects.filter(
+        pk__in=Comment.objects.filter(post=post).values("pk")[:3]
+    )
+    model_admin.delete_queryset(rf.post("/"), to_delete)
+    post.refresh_from_db()
+    assert post.comment_count == 1
+
+
+def test_cascade_delete_updates_counters(
+        mixer, another_user, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    mixer.blend("blog.Comment", post=post)
+    another_user.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что каскадное удаление комментариев уменьшает"
+        " `Post.comment_count`."
+    )
+    assert FeedEntry.objects.get(post=post).comment_count == 1
+
+
+def test_moving_comment_moves_count(
+        mixer, post_with_published_location, post_of_another_author):
+    comment = mixer.blend("blog.Comment", post=post_with_published_location)
+    comment = Comment.objects.get(pk=comment.pk)
+    comment.post = post_of_another_author
+    comment.save()
+    counts = dict(Post.objects.values_list("pk", "comment_count"))
+    assert counts[post_with_published_location.pk] == 0
+    assert counts[post_of_another_author.pk] == 1
+    assert FeedEntry.objects.get(
+        post=post_of_another_author
+    ).comment_count == 1
+
+
+def test_saving_stale_post_keeps_counter(
+        mixer, post_with_published_location):
+    stale = Post.objects.get(pk=post_with_published_location.pk)
+    version = stale.version
+    mixer.cycle(2).blend("blog.Comment", post=stale)
+    stale.title = "Новый заголовок"
+    stale.save()
+    fresh = Post.objects.get(pk=stale.pk)
+    assert fresh.comment_count == 2, (
+        "Убедитесь, что сохранение поста не затирает счётчик комментариев."
+    )
+    assert fresh.version == version + 3
+    assert stale.version == fresh.version
+    assert FeedEntry.objects.get(post=stale).comment_count == 2
+
+
+def test_recount_command_repairs_drift(mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("recount_comments", "--dry-run")
+    post.refresh_from_db()
+    assert post.comment_count == 42
+
+    call_command("recount_comments")
+    post.refresh_from_db()
+    assert post.comment_count == 2
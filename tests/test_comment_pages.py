@@ -0,0 +1,41 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(25).blend(
+        "blog.Comment", post=post_with_published_location
+    )
+
+
+def test_detail_shows_first_batch_without_count(
+        user_client, post_with_published_location, many_comments):
+    url = f"/posts/{post_with_published_location.id}/"
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.get(url)
+    assert response.status_code == 200
+    comments = response.context["comments"]
+    assert [c.id for c in comments] == [c.id for c in many_comments[:20]]
+    assert comments.has_next()
+    assert "(25)" in response.content.decode("utf-8")
+    assert not any("COUNT(" in q["sql"] for q in ctx.captured_queries), (
+        "Убедитесь, что число комментариев берётся из сохранённого счётчика."
+    )
+
+
+def test_fragment_returns_next_batch(
+        user_client, post_with_published_location, many_comments):
+    post_id = post_with_published_location.id
+    first = user_client.get(f"/posts/{post_id}/").context["comments"]
+    response = user_client.get(
+        f"/posts/{post_id}/comments/?cursor={first.next_cursor}"
+    )
+    assert response.status_code == 200
+    batch = response.context["comments"]
+    assert [c.id for c in batch] == [c.id for c in many_comments[20:]]
+    assert not batch.has_next()
+    assert "<html" not in response.content.decode("utf-8")
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+
+import pytest
+from django.db import connection
+from django.db.utils import load_backend
+
+from blog.db_pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def connect(tmp_path):
+    path = tmp_path / "pool.sqlite3"
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+def make_pool(**options):
+    defaults = dict(max_size=2, max_lifetime=60, max_idle=60, timeout=1)
+    return ConnectionPool("test", **{**defaults, **options})
+
+
+def test_released_connection_is_reused(connect):
+    pool = make_pool()
+    raw, reused = pool.checkout(connect)
+    assert reused is False
+    pool.release(raw)
+    again, reused = pool.checkout(connect)
+    assert again is raw and reused is True
+    stats = pool.stats()
+    assert (stats["checkouts"], stats["opened"], stats["reused"]) == (2, 1, 1)
+
+
+def test_broken_connection_is_replaced(connect):
+    pool = make_pool()
+    raw, _ = pool.checkout(connect)
+    pool.release(raw)
+    raw.close()
+    fresh, reused = pool.checkout(connect)
+    assert fresh is not raw and reused is False, (
+        "Убедитесь, что перед повторной выдачей соединение проверяется."
+    )
+    assert pool.stats()["unhealthy"] == 1
+
+
+@pytest.mark.parametrize(
+    "options", [{"max_idle": 0}, {"max_lifetime": 0}]
+)
+def test_expired_connections_are_evicted(connect, options):
+    pool = make_pool(**options)
+    raw, _ = pool.checkout(connect)
+    pool.release(raw)
+    fresh, _ = pool.checkout(connect)
+    assert fresh is not raw
+    assert pool.stats()["evicted"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_release_rolls_back_open_transaction(connect):
+    pool = make_pool()
+    raw, _ = pool.checkout(connect)
+    raw.execute("CREATE TABLE t (x)")
+    raw.commit()
+    raw.execute("INSERT INTO t VALUES (1)")
+    pool.release(raw)
+    raw, _ = pool.checkout(connect)
+    assert raw.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+
+
+def test_waits_for_free_connection(connect):
+    pool = make_pool(max_size=1, timeout=0.05)
+    raw, _ = pool.checkout(connect)
+    with pytest.raises(PoolTimeout):
+        pool.checkout(connect)
+
+    pool.timeout = 5
+    timer = threading.Timer(0.05, pool.release, args=(raw,))
+    timer.start()
+    again, reused = pool.checkout(connect)
+    timer.join()
+    assert again is raw and reused is True
+    assert pool.stats()["waits"] == 2
+
+
+@pytest.mark.django_db
+def test_pooled_backend_reuses_connection(tmp_path):
+    settings_dict = {
+        **connection.settings_dict,
+        "ENGINE": "blog.db_backends.sqlite3",
+        "NAME": str(tmp_path / "backend.sqlite3"),
+        "POOL": {"MAX_SIZE": 1},
+    }
+    backend = load_backend(settings_dict["ENGINE"])
+    wrapper = backend.DatabaseWrapper(settings_dict, alias="pooled")
+    wrapper.ensure_connection()
+    raw = wrapper.connection
+    assert wrapper.pool_reused is False
+    wrapper.close()
+
+    wrapper.ensure_connection()
+    assert wrapper.connection is raw and wrapper.pool_reused is True, (
+        "Убедитесь, что бэкенд берёт соединение из пула."
+    )
+    with wrapper.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        assert cursor.fetchone()[0] == "wal"
+    stats = wrapper.get_pool().stats()
+    assert (stats["opened"], stats["reused"]) == (1, 1)
+    wrapper.close()
+    wrapper.get_pool().close()
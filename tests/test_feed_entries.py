@@ -0,0 +1,56 @@
+import pytest
+from django.core.management import call_command
+
+from blog.models import FeedEntry
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_entry_follows_post_and_relations(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    entry = FeedEntry.objects.get(pk=post.pk)
+    assert entry.is_listed
+    assert entry.title == post.title
+    assert entry.author_username == post.author.username
+
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    post.category.title = "Новое название"
+    post.category.save()
+    post.location.name = "Новое место"
+    post.location.save()
+    post.author.username = "renamed"
+    post.author.save()
+
+    entry.refresh_from_db()
+    assert entry.comment_count == 2
+    assert entry.category_title == "Новое название"
+    assert entry.location_name == "Новое место"
+    assert entry.author_username == "renamed"
+
+    post.category.is_published = False
+    post.category.save()
+    entry.refresh_from_db()
+    assert not entry.is_listed, (
+        "Убедитесь, что карточка скрывается вместе с категорией."
+    )
+
+    post.location.delete()
+    entry.refresh_from_db()
+    assert entry.location_name == ""
+
+    post.delete()
+    assert not FeedEntry.objects.filter(pk=post.pk).exists()
+
+
+def test_rebuild_feed_repairs_drift(mixer, post_with_published_location):
+    post = post_with_published_location
+    lost = mixer.blend("blog.Post", author=post.author)
+    FeedEntry.objects.filter(pk=post.pk).update(title="устарело")
+    FeedEntry.objects.filter(pk=lost.pk).delete()
+
+    call_command("rebuild_feed")
+    assert FeedEntry.objects.get(pk=post.pk).title == post.title
+    assert FeedEntry.objects.filter(pk=lost.pk).exists(), (
+        "Убедитесь, что rebuild_feed восстанавливает пропавшие карточки."
+    )
@@ -0,0 +1,86 @@
+import pytest
+from django.core.management import call_command
+
+from blog import fragments
+from blog.models import Comment, FeedEntry
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_cards_are_reused_between_renders(
+        user_client, post_with_published_location):
+    user_client.get("/")
+    user_client.get("/")
+    hits, misses, ratio = fragments.stats()["index-card"]
+    assert (hits, misses) == (1, 1), (
+        "Убедитесь, что карточка поста при повторной отрисовке берётся "
+        "из кэша фрагментов."
+    )
+    assert ratio == 0.5
+
+
+def test_comment_bumps_card_version(user, post_with_published_location):
+    post = post_with_published_location
+    entry = FeedEntry.objects.get(pk=post.pk)
+    key = fragments.make_key("index-card", entry)
+
+    Comment.objects.create(post=post, author=user, text="Комментарий")
+
+    entry.refresh_from_db()
+    post.refresh_from_db()
+    assert fragments.make_key("index-card", entry) != key
+    assert entry.comment_count == post.comment_count == 1
+
+
+def test_comment_block_keeps_links_per_user(
+        user, user_client, another_user_client,
+        post_with_published_location):
+    post = post_with_published_location
+    comment = Comment.objects.create(post=post, author=user, text="Текст")
+    url = f"/posts/{post.pk}/"
+    edit_url = f"/posts/{post.pk}/edit_comment/{comment.pk}/"
+    another_user_client.get(url)
+    comment.text = "Исправленный текст"
+    comment.save()
+
+    own = user_client.get(url).content.decode()
+    other = another_user_client.get(url).content.decode()
+    assert "Исправленный текст" in own and "Исправленный текст" in other
+    assert edit_url in own and edit_url not in other, (
+        "Убедитесь, что ссылки на редактирование комментария не попадают "
+        "в кэшированный фрагмент."
+    )
+    assert fragments.stats()["comment"][:2] == (1, 2)
+
+
+def test_stats_command(user_client, post_with_published_location, capsys):
+    user_client.get("/")
+    call_command("fragment_cache_stats", "--reset")
+    out = capsys.readouterr().out
+    assert "index-card" in out
+    assert fragments.stats()["index-card"][:2] == (0, 0)
+
+
+def test_stats_written_once_per_request(
+        client, post_with_published_location, mixer, monkeypatch):
+    post = post_with_published_location
+    for _ in range(3):
+        mixer.blend("blog.Post", author=post.author, category=post.category,
+                    location=None, is_published=True, pub_date=post.pub_date)
+    cache = fragments.get_cache()
+    calls = []
+    for method in ("get", "add", "incr"):
+        original = getattr(cache, method)
+
+        def counted(*args, _method=method, _original=original, **kwargs):
+            if str(args[0]).startswith(fragments.STATS_PREFIX):
+                calls.append(_method)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(cache, method, counted)
+    client.get("/")
+    assert len(calls) <= 2, (
+        "Убедитесь, что счётчики кэша фрагментов пишутся раз за запрос, "
+        "а не на каждую карточку."
+    )
+    assert sum(fragments.stats()["index-card"][:2]) == 4
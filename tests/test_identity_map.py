@@ -0,0 +1,62 @@
+import pytest
+from django.http import Http404
+
+from blog.identity import IdentityMap
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_lookups_are_memoized(
+        rf, django_assert_num_queries, published_category):
+    identity = IdentityMap(rf.get("/"))
+    Category = type(published_category)
+    with django_assert_num_queries(1):
+        first = identity.get_or_404(Category, slug=published_category.slug)
+        again = identity.get_or_404(Category, slug=published_category.slug)
+        by_pk = identity.get_or_404(Category, id=published_category.pk)
+    assert first is again is by_pk
+    assert identity.stats() == {"hits": 2, "misses": 1}
+
+    with pytest.raises(Http404):
+        identity.get_or_404(Category, slug="missing")
+
+
+def test_filtered_queryset_is_not_bypassed(
+        rf, django_assert_num_queries, published_category):
+    identity = IdentityMap(rf.get("/"))
+    Category = type(published_category)
+    identity.get_or_404(Category, pk=published_category.pk)
+    with pytest.raises(Http404):
+        identity.get_or_404(
+            Category.objects.filter(is_published=False),
+            pk=published_category.pk,
+        )
+    published = Category.objects.filter(is_published=True)
+    with django_assert_num_queries(1):
+        first = identity.get_or_404(published, pk=published_category.pk)
+        again = identity.get_or_404(
+            Category.objects.filter(is_published=True),
+            pk=published_category.pk,
+        )
+    assert first is again, (
+        "Убедитесь, что поиск через тот же фильтр попадает в карту."
+    )
+
+
+def test_request_user_is_reused(rf, user, django_assert_num_queries):
+    request = rf.get("/")
+    request.user = user
+    identity = IdentityMap(request)
+    with django_assert_num_queries(0):
+        assert identity.get_or_404(
+            type(user), username=user.username) is user
+
+
+def test_debug_header_reports_stats(
+        client, settings, post_with_published_location):
+    settings.DEBUG = True
+    slug = post_with_published_location.category.slug
+    response = client.get(f"/category/{slug}/")
+    assert response["X-Identity-Map"].endswith("misses=1"), (
+        "Убедитесь, что категория загружается один раз за запрос."
+    )
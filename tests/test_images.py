@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import FeedEntry
+
+pytestmark = [pytest.mark.django_db]
+
+ORIENTATION, GPS_INFO = 0x0112, 0x8825
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_RELEASE_GRACE = 0
+    return tmp_path
+
+
+def upload(size, name="photo.jpg", orientation=None):
+    image = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+        exif[GPS_INFO] = {1: "N"}
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category):
+    def make(image):
+        post = mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            location=None, is_published=True, image=image,
+            pub_date=timezone.now() - timedelta(days=1),
+        )
+        # Копии строит фоновая задача над свежей копией поста из базы.
+        post.refresh_from_db()
+        return post
+    return make
+
+
+def test_derivatives_built_on_save(make_post, media_root):
+    post = make_post(upload((1200, 900), orientation=6))
+    meta = post.image_meta
+    assert (post.image_width, post.image_height) == (900, 1200), (
+        "Убедитесь, что ориентация из EXIF применяется к картинке."
+    )
+    card = meta["variants"]["card"]
+    assert [(v["width"], v["height"]) for v in card] == [
+        (400, 225), (800, 450)
+    ]
+    detail = meta["variants"]["detail"]
+    assert [(v["width"], v["height"]) for v in detail] == [(800, 1067)], (
+        "Убедитесь, что копии не растягиваются больше оригинала."
+    )
+    with Image.open(media_root / card[1]["webp"]) as webp:
+        assert webp.format == "WEBP" and webp.size == (800, 450)
+    with Image.open(media_root / card[0]["jpeg"]) as jpeg:
+        assert not jpeg.getexif()
+    with Image.open(media_root / meta["source"]) as original:
+        assert GPS_INFO not in original.getexif(), (
+            "Убедитесь, что EXIF удаляется и из оригинала."
+        )
+    entry = FeedEntry.objects.get(post=post)
+    assert entry.image_meta == meta
+    assert post.version == 2, (
+        "Убедитесь, что новая картинка меняет версию поста для кэша."
+    )
+
+
+def test_replaced_image_drops_old_derivatives(
+        make_post, media_root, django_capture_on_commit_callbacks):
+    post = make_post(upload((1000, 600)))
+    old_files = [
+        media_root / v["jpeg"] for v in post.image_meta["variants"]["card"]
+    ]
+    post.image = upload((600, 1000), name="other.jpg")
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    post.refresh_from_db()
+    assert not any(path.exists() for path in old_files)
+    new_files = [
+        media_root / v["webp"] for v in post.image_meta["variants"]["card"]
+    ]
+    assert all(path.exists() for path in new_files)
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert not any(path.exists() for path in new_files)
+
+
+def test_templates_emit_srcset_and_lazy(client, make_post):
+    post = make_post(upload((1000, 600)))
+    for url in ("/", f"/profile/{post.author.username}/"):
+        content = client.get(url).content.decode()
+        assert 'type="image/webp"' in content
+        assert "-card-2x.jpg 2x" in content
+        assert 'loading="lazy"' in content
+        assert 'width="400" height="225"' in content
+    content = client.get(f"/posts/{post.pk}/").content.decode()
+    assert "-detail.webp 1x" in content
+
+
+def test_broken_image_is_kept(make_post):
+    post = make_post(SimpleUploadedFile("broken.jpg", b"not an image"))
+    assert post.image_meta == {"source": post.image.name}
+    assert Path(post.image.path).exists()
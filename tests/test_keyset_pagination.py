@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def many_posts(mixer, user, published_category):
+    now = timezone.now()
+    # Одинаковые pub_date у пар постов: курсор обязан учитывать id.
+    dates = (now - timedelta(hours=i // 2) for i in range(25))
+    return mixer.cycle(25).blend(
+        "blog.Post",
+        author=user,
+        is_published=True,
+        category=published_category,
+        pub_date=dates,
+    )
+
+
+def _walk(client, url, cursor_attr):
+    seen = []
+    page = client.get(url).context["page_obj"]
+    seen.extend(page)
+    while getattr(page, cursor_attr):
+        response = client.get(f"{url}?cursor={getattr(page, cursor_attr)}")
+        assert response.status_code == 200
+        page = response.context["page_obj"]
+        seen.extend(page)
+    return page, seen
+
+
+def test_cursor_walks_feed_without_gaps(user_client, many_posts):
+    last_page, seen = _walk(user_client, "/", "next_cursor")
+    assert [p.pk for p in seen] == [
+        p.pk for p in sorted(
+            many_posts, key=lambda p: (p.pub_date, p.id), reverse=True)
+    ], "Убедитесь, что курсорная пагинация не теряет и не дублирует посты."
+    assert len(last_page) == 25 % N_PER_PAGE
+
+    response = user_client.get(f"/?cursor={last_page.previous_cursor}")
+    previous = response.context["page_obj"]
+    assert [p.pk for p in previous] == [p.pk for p in seen[10:20]]
+    assert previous.has_next() and previous.has_previous()
+
+
+def test_page_number_fallback(user_client, many_posts):
+    response = user_client.get("/?page=3")
+    assert response.status_code == 200
+    page_obj = response.context["page_obj"]
+    assert page_obj.number == 3
+    assert len(page_obj) == 25 % N_PER_PAGE
+
+
+def test_invalid_cursor_is_404(user_client, many_posts):
+    response = user_client.get("/?cursor=not-a-cursor")
+    assert response.status_code == 404
@@ -0,0 +1,56 @@
+import pytest
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def profile_count(response):
+    return response.context["page_obj"].paginator.count
+
+
+def test_profile_count_is_cached_until_posts_change(
+        user, user_client, post_with_published_location):
+    url = f"/profile/{user.username}/"
+    first = user_client.get(url)
+    second = user_client.get(url)
+    assert first["X-Count-Strategy"] == "query"
+    assert second["X-Count-Strategy"] == "cache", (
+        "Убедитесь, что число постов профиля берётся из кэша."
+    )
+    assert profile_count(second) == profile_count(first) == 1
+
+    mixer.blend(
+        "blog.Post",
+        author=user,
+        category=post_with_published_location.category,
+        pub_date=timezone.now(),
+    )
+    response = user_client.get(url)
+    assert response["X-Count-Strategy"] == "query", (
+        "Убедитесь, что новый пост сбрасывает закэшированное число."
+    )
+    assert profile_count(response) == 2
+
+
+def test_owner_and_readers_have_separate_counts(
+        user, user_client, another_user_client,
+        post_with_published_location):
+    hidden = mixer.blend(
+        "blog.Post", author=user, is_published=False,
+        category=post_with_published_location.category,
+    )
+    url = f"/profile/{user.username}/"
+    assert profile_count(user_client.get(url)) == 2
+    reader = another_user_client.get(url)
+    assert reader["X-Count-Strategy"] == "query"
+    assert profile_count(reader) == 1
+    assert hidden.pk not in [post.pk for post in reader.context["posts"]]
+
+
+def test_page_number_fallback_uses_cached_count(
+        user_client, post_with_published_location):
+    user_client.get("/?page=1")
+    response = user_client.get("/?page=1")
+    assert response["X-Count-Strategy"] == "cache"
+    assert response.context["paginator"].count == 1
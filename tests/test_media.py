@@ -0,0 +1,116 @@
+import pytest
+from django.utils.http import http_date
+
+from blog import media
+
+HASH = "ab" * 32
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / "posts").mkdir()
+    (tmp_path / "posts" / "photo.jpg").write_bytes(DATA)
+    (tmp_path / "posts" / f"{HASH}.jpg").write_bytes(DATA)
+    (tmp_path / "posts" / ".upload-x").write_bytes(DATA)
+    return tmp_path
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+def test_full_response_and_conditional_get(client):
+    response = client.get("/media/posts/photo.jpg")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Content-Length"] == str(len(DATA))
+    assert response["Accept-Ranges"] == "bytes"
+    assert "immutable" not in response["Cache-Control"]
+    assert body(response) == DATA
+    etag = response["ETag"]
+    assert etag.startswith('"'), "Убедитесь, что ETag сильный."
+
+    response = client.get("/media/posts/photo.jpg", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    response = client.get(
+        "/media/posts/photo.jpg",
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+    )
+    assert response.status_code == 304, (
+        "Убедитесь, что If-Modified-Since даёт 304."
+    )
+
+
+def test_hashed_names_are_immutable(client):
+    response = client.get(f"/media/posts/{HASH}.jpg")
+    assert response["ETag"] == f'"{HASH}"'
+    assert "immutable" in response["Cache-Control"]
+    assert f"max-age={media.IMMUTABLE_MAX_AGE}" in response["Cache-Control"]
+
+
+@pytest.mark.parametrize(("header", "start", "end"), [
+    ("bytes=10-19", 10, 19),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-4", 1020, 1023),
+    ("bytes=1020-5000", 1020, 1023),
+])
+def test_range_requests(rf, header, start, end):
+    request = rf.get("/media/posts/photo.jpg", HTTP_RANGE=header)
+    response = media.serve(request, "posts/photo.jpg")
+    assert response.status_code == 206
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response["Content-Length"] == str(end - start + 1)
+    # Файл открыт на начале отрезка: его можно отдать через sendfile.
+    assert response.file_to_stream.tell() == start
+    assert response.file_to_stream.fileno() >= 0
+    assert body(response) == DATA[start:end + 1]
+    response.file_to_stream.close()
+
+
+def test_bad_and_stale_ranges(client):
+    response = client.get("/media/posts/photo.jpg", HTTP_RANGE="bytes=5000-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(DATA)}"
+    response = client.get(
+        "/media/posts/photo.jpg", HTTP_RANGE="bytes=0-9",
+        HTTP_IF_RANGE='"stale"',
+    )
+    assert response.status_code == 200, (
+        "Убедитесь, что при устаревшем If-Range файл отдаётся целиком."
+    )
+    response = client.get(
+        "/media/posts/photo.jpg", HTTP_RANGE="bytes=0-1,5-6",
+    )
+    assert response.status_code == 200
+    response = client.get(
+        "/media/posts/photo.jpg", HTTP_RANGE="bytes=0-9",
+        HTTP_IF_RANGE=http_date(0),
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", [
+    "posts/missing.jpg", "posts/", "posts/.upload-x", "../secret",
+    "posts/../../secret",
+])
+def test_not_found(client, path):
+    assert client.get(f"/media/{path}").status_code == 404
+
+
+@pytest.mark.parametrize(("mode", "header", "value"), [
+    ("x-accel-redirect", "X-Accel-Redirect",
+     "/protected-media/posts/photo.jpg"),
+    ("x-sendfile", "X-Sendfile", None),
+])
+def test_offload_modes(client, settings, media_root, mode, header, value):
+    settings.MEDIA_SENDFILE = mode
+    response = client.get("/media/posts/photo.jpg")
+    assert response.status_code == 200
+    assert response.content == b""
+    expected = value or str(media_root / "posts" / "photo.jpg")
+    assert response[header] == expected
+    assert response["Content-Type"] == "image/jpeg"
+    assert "ETag" in response
@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from blog import outbox, task_queue
+from blog.models import OutgoingEmail, Task
+
+pytestmark = [pytest.mark.django_db]
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+    fail_for = ()
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & set(self.fail_for):
+                raise ConnectionError("отказ сервера")
+        return super().send_messages(messages)
+
+
+@pytest.fixture(autouse=True)
+def queued(settings):
+    settings.TASKS_EAGER = False
+    settings.EMAIL_BACKEND = "blog.mail.QueuedEmailBackend"
+    settings.QUEUED_EMAIL_BACKEND = "test_outbox.CountingBackend"
+    CountingBackend.opened = 0
+    CountingBackend.fail_for = ()
+
+
+def send(to, subject="Тема", body="Текст"):
+    EmailMessage(subject, body, "blog@example.com", [to]).send()
+
+
+def test_request_only_enqueues_and_dedupes():
+    send("a@example.com")
+    send("a@example.com")
+    send("b@example.com")
+    assert mail.outbox == [], "Убедитесь, что письма только ставятся."
+    assert OutgoingEmail.objects.count() == 2, (
+        "Убедитесь, что одинаковое письмо не ставится дважды."
+    )
+    assert Task.objects.count() == 1, (
+        "Убедитесь, что задача отправки ставится один раз."
+    )
+    assert outbox.send_batch() == 2
+    assert len(mail.outbox) == 2
+    send("a@example.com")
+    assert OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING
+    ).count() == 0, "Убедитесь, что недавно отправленное не повторяется."
+
+
+def test_active_duplicate_is_rejected_by_database():
+    send("a@example.com")
+    row = OutgoingEmail.objects.get()
+    with pytest.raises(IntegrityError), transaction.atomic():
+        OutgoingEmail.objects.create(
+            message=row.message, digest=row.digest,
+            recipient_domain=row.recipient_domain,
+        )
+    send("a@example.com")
+    assert OutgoingEmail.objects.count() == 1
+
+
+def test_message_is_split_by_domain(settings):
+    settings.EMAIL_DOMAIN_RATE_LIMIT = 1
+    EmailMessage(
+        "Тема", "Текст", "blog@example.com",
+        ["a@example.com", "b@other.org"], cc=["c@Example.com"],
+    ).send()
+    rows = {row.recipient_domain: row.message
+            for row in OutgoingEmail.objects.all()}
+    assert set(rows) == {"example.com", "other.org"}, (
+        "Убедитесь, что письмо делится на копии по доменам получателей."
+    )
+    assert rows["example.com"]["to"] == ["a@example.com"]
+    assert rows["example.com"]["cc"] == ["c@Example.com"]
+    assert rows["other.org"]["to"] == ["b@other.org"]
+    assert outbox.send_batch() == 2
+
+
+def test_batch_uses_one_connection():
+    for number in range(5):
+        send(f"user{number}@example.com")
+    assert outbox.send_batch() == 5
+    assert CountingBackend.opened == 1, (
+        "Убедитесь, что пачка писем отправляется через одно соединение."
+    )
+    assert set(OutgoingEmail.objects.values_list("status", flat=True)) == {
+        OutgoingEmail.SENT
+    }
+
+
+def test_domain_rate_limit_defers(settings):
+    settings.EMAIL_DOMAIN_RATE_LIMIT = 2
+    for number in range(3):
+        send(f"user{number}@Example.com")
+    send("user@other.org")
+    task_queue.Worker().run_once()
+    assert len(mail.outbox) == 3
+    waiting = OutgoingEmail.objects.get(status=OutgoingEmail.PENDING)
+    assert waiting.recipient_domain == "example.com"
+    assert waiting.attempts == 0, "Убедитесь, что ожидание — не попытка."
+    assert waiting.send_after > timezone.now()
+    assert Task.objects.filter(run_at__gt=timezone.now()).exists(), (
+        "Убедитесь, что отправка отложенного письма запланирована."
+    )
+    assert outbox.send_batch() == 0
+    OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).update(
+        sent_at=timezone.now() - timedelta(
+            seconds=settings.EMAIL_DOMAIN_RATE_WINDOW + 1
+        )
+    )
+    OutgoingEmail.objects.update(send_after=timezone.now())
+    assert outbox.send_batch() == 1
+
+
+def test_eager_mode_keeps_deferral(settings):
+    settings.TASKS_EAGER = True
+    run_at = timezone.now() + timedelta(minutes=5)
+    outbox.schedule_send(run_at)
+    assert Task.objects.get().run_at == run_at, (
+        "Убедитесь, что отложенная отправка не теряется при TASKS_EAGER."
+    )
+
+
+def test_failed_message_retries_then_gives_up(settings):
+    settings.EMAIL_MAX_ATTEMPTS = 2
+    CountingBackend.fail_for = ("bad@example.com",)
+    send("bad@example.com")
+    send("good@example.com")
+    assert outbox.send_batch() == 1
+    row = OutgoingEmail.objects.get(status=OutgoingEmail.PENDING)
+    assert row.attempts == 1 and "ConnectionError" in row.last_error
+    assert row.send_after > timezone.now()
+    OutgoingEmail.objects.update(send_after=timezone.now())
+    outbox.send_batch()
+    row.refresh_from_db()
+    assert row.status == OutgoingEmail.FAILED
+
+
+def test_comment_notifies_post_author(
+        settings, mixer, user, another_user, published_category):
+    settings.TASKS_EAGER = True
+    settings.QUEUED_EMAIL_BACKEND = (
+        "django.core.mail.backends.locmem.EmailBackend"
+    )
+    user.email = "author@example.com"
+    user.save()
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        location=None, is_published=True, image="",
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    mixer.blend("blog.Comment", post=post, author=user, text="Сам себе")
+    assert not OutgoingEmail.objects.exists(), (
+        "Убедитесь, что автору о своём комментарии не пишут."
+    )
+    mixer.blend("blog.Comment", post=post, author=another_user, text="Ура")
+    assert mail.outbox == [], (
+        "Убедитесь, что и при TASKS_EAGER письмо только ставится в очередь."
+    )
+    task_queue.Worker().run_once()
+    assert len(mail.outbox) == 1
+    message = mail.outbox[0]
+    assert message.to == ["author@example.com"]
+    assert post.title in message.subject
+    assert "Ура" in message.body and f"/posts/{post.pk}/" in message.body
@@ -0,0 +1,91 @@
+import pytest
+from mixer.backend.django import mixer
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def two_posts(post_with_published_location, user):
+    other = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=post_with_published_location.category,
+        is_published=True,
+        pub_date=post_with_published_location.pub_date,
+    )
+    return post_with_published_location, other
+
+
+def detail_url(post):
+    return f"/posts/{post.pk}/"
+
+
+def test_anonymous_page_is_served_from_cache(client, two_posts):
+    first = client.get("/")
+    second = client.get("/")
+    assert first["X-Page-Cache"] == "miss"
+    assert second["X-Page-Cache"] == "hit", (
+        "Убедитесь, что повторный анонимный запрос ленты берётся из кэша."
+    )
+    assert second.content == first.content
+    for response in (first, second):
+        assert "Cookie" not in response.get("Vary", ""), (
+            "Убедитесь, что анонимный ответ не содержит Vary: Cookie."
+        )
+        assert not response.cookies, (
+            "Убедитесь, что анонимный ответ не ставит cookie (в т.ч. CSRF)."
+        )
+
+
+def test_logged_in_user_bypasses_cache(user_client, two_posts):
+    user_client.get("/")
+    response = user_client.get("/")
+    assert "X-Page-Cache" not in response
+
+
+def test_comment_evicts_only_pages_with_the_post(client, user, two_posts):
+    post, other = two_posts
+    for url in ("/", detail_url(post), detail_url(other)):
+        client.get(url)
+
+    Comment.objects.create(post=post, author=user, text="Свежий комментарий")
+
+    response = client.get(detail_url(post))
+    assert response["X-Page-Cache"] == "miss"
+    assert "Свежий комментарий" in response.content.decode()
+    assert client.get("/")["X-Page-Cache"] == "miss", (
+        "Убедитесь, что лента с постом сбрасывается после комментария."
+    )
+    assert client.get(detail_url(other))["X-Page-Cache"] == "hit", (
+        "Убедитесь, что комментарий не сбрасывает страницы других постов."
+    )
+
+
+def test_post_edit_and_author_rename_evict_cards(client, user, two_posts):
+    post, _ = two_posts
+    client.get("/")
+    post.title = "Новый заголовок"
+    post.save()
+    response = client.get("/")
+    assert response["X-Page-Cache"] == "miss"
+    assert "Новый заголовок" in response.content.decode()
+
+    user.username = "renamed"
+    user.save()
+    response = client.get("/")
+    assert response["X-Page-Cache"] == "miss"
+    assert "renamed" in response.content.decode()
+
+
+def test_local_memory_page_cache_fails_check(settings):
+    from blog.checks import check_shared_caches
+
+    assert check_shared_caches(None) == []
+    settings.PAGE_CACHE_ALIAS = "default"
+    assert [error.id for error in check_shared_caches(None)] == [
+        "blog.E001"
+    ], "Убедитесь, что кэш страниц в памяти процесса не проходит проверку."
+    settings.PAGE_CACHE_TIMEOUT = 0
+    assert check_shared_caches(None) == []
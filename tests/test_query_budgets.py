@@ -0,0 +1,173 @@
+import asyncio
+from contextlib import nullcontext
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from blog import feed
+from blog.middleware import QueryBudgetMiddleware
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+BUDGET_APPS = ("blog", "pages", "users")
+
+# url name -> (метод, клиент, функция kwargs для reverse()).
+CASES = {
+    "blog:index": ("get", "anon", lambda d: {}),
+    "blog:detail": ("get", "anon", lambda d: {"pk": d["post"].pk}),
+    "blog:comments": ("get", "anon", lambda d: {"pk": d["post"].pk}),
+    "blog:search": ("get", "anon", lambda d: {}),
+    "blog:autocomplete": ("get", "author", lambda d: {"kind": "location"}),
+    "blog:create": ("get", "author", lambda d: {}),
+    "blog:edit": ("get", "author", lambda d: {"pk": d["post"].pk}),
+    "blog:delete": ("get", "author", lambda d: {"pk": d["post"].pk}),
+    "blog:category": (
+        "get", "anon", lambda d: {"category_slug": d["category"].slug}
+    ),
+    "blog:profile": (
+        "get", "anon", lambda d: {"username": d["author"].username}
+    ),
+    "blog:edit_profile": (
+        "get", "author", lambda d: {"username": d["author"].username}
+    ),
+    "blog:add_comment": (
+        "post", "author", lambda d: {"post_id": d["post"].pk}
+    ),
+    "blog:edit_comment": (
+        "get", "author",
+        lambda d: {"post_id": d["post"].pk, "comment_id": d["comment"].pk},
+    ),
+    "blog:delete_comment": (
+        "get", "author",
+        lambda d: {"post_id": d["post"].pk, "comment_id": d["comment"].pk},
+    ),
+    "pages:about": ("get", "anon", lambda d: {}),
+    "pages:rules": ("get", "anon", lambda d: {}),
+    "users:registration": ("get", "anon", lambda d: {}),
+    "users:register": ("get", "anon", lambda d: {}),
+}
+
+
+def named_urls():
+    resolver = get_resolver()
+    names = set()
+    for namespace in BUDGET_APPS:
+        _, sub_resolver = resolver.namespace_dict[namespace]
+        names.update(
+            f"{namespace}:{name}"
+            for name in sub_resolver.reverse_dict
+            if isinstance(name, str)
+        )
+    return names
+
+
+def make_rows(mixer, n, author, category, location):
+    # Строки собирает mixer, а пишет одна вставка: сигналы на каждую
+    # из 1000 строк сделали бы тест очень медленным.
+    now = timezone.now()
+    with mixer.ctx(commit=False):
+        posts = mixer.cycle(n).blend(
+            "blog.Post", author=author, category=category, location=location,
+            is_published=True, is_visible=True, image="",
+            pub_date=mixer.sequence(lambda i: now - timedelta(minutes=i)),
+        )
+    Post.objects.bulk_create(posts)
+    post = Post.objects.order_by("-pub_date").first()
+    with mixer.ctx(commit=False):
+        comments = mixer.cycle(n).blend(
+            "blog.Comment", post=post, author=author
+        )
+    Comment.objects.bulk_create(comments)
+    Post.objects.filter(pk=post.pk).update(comment_count=n)
+    feed.rebuild()
+    return {
+        "post": post,
+        "comment": post.comments.first(),
+        "author": author,
+        "category": category,
+    }
+
+
+def test_every_named_url_has_a_budget():
+    names = named_urls()
+    assert names <= set(settings.QUERY_BUDGETS), (
+        "Укажите бюджет запросов в settings.QUERY_BUDGETS для: "
+        f"{sorted(names - set(settings.QUERY_BUDGETS))}"
+    )
+    assert names <= set(CASES), sorted(names - set(CASES))
+
+
+@pytest.mark.parametrize("rows", [10, 100, 1000])
+@pytest.mark.parametrize("url_name", sorted(CASES))
+def test_query_budget(
+        url_name, rows, mixer, user, user_client, client, published_category,
+        published_location):
+    data = make_rows(
+        mixer, rows, user, published_category, published_location
+    )
+    method, client_kind, get_kwargs = CASES[url_name]
+    http = user_client if client_kind == "author" else client
+    url = reverse(url_name, kwargs=get_kwargs(data))
+    budget = settings.QUERY_BUDGETS[url_name]
+
+    with CaptureQueriesContext(connection) as ctx:
+        if method == "post":
+            response = http.post(url, {"text": "Новый комментарий"})
+        else:
+            response = http.get(url)
+
+    assert response.status_code < 400, f"{url} -> {response.status_code}"
+    queries = [q["sql"] for q in ctx.captured_queries]
+    assert len(queries) <= budget, (
+        f"{url_name} ({rows} строк): {len(queries)} запросов при бюджете"
+        f" {budget}:\n" + "\n".join(queries)
+    )
+
+
+def test_middleware_logs_over_budget(
+        client, post_with_published_location, settings, caplog):
+    settings.QUERY_BUDGET_ENABLED = True
+    settings.MIDDLEWARE = [
+        "blog.middleware.QueryBudgetMiddleware", *settings.MIDDLEWARE
+    ]
+    settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, "blog:index": 0}
+    with caplog.at_level("WARNING", logger="blog.query_budget"):
+        client.get("/")
+    assert "blog:index" in caplog.text
+    assert "blog_feedentry" in caplog.text, (
+        "Убедитесь, что в лог попадает SQL, превысивший бюджет."
+    )
+
+
+def test_middleware_counts_every_alias(rf, settings, monkeypatch):
+    settings.QUERY_BUDGET_ENABLED = True
+    wrapped = []
+
+    class Replica:
+        def execute_wrapper(self, wrapper):
+            wrapped.append(wrapper)
+            return nullcontext()
+
+    monkeypatch.setattr(connections, "all", lambda: [connection, Replica()])
+    QueryBudgetMiddleware(lambda request: HttpResponse())(rf.get("/"))
+    assert wrapped, "Убедитесь, что запросы к репликам тоже считаются."
+
+
+def test_middleware_is_off_by_default_and_async_capable(settings):
+    assert "blog.middleware.QueryBudgetMiddleware" not in settings.MIDDLEWARE
+    with pytest.raises(MiddlewareNotUsed):
+        QueryBudgetMiddleware(lambda request: HttpResponse())
+    settings.QUERY_BUDGET_ENABLED = True
+
+    async def get_response(request):
+        return HttpResponse()
+
+    assert asyncio.iscoroutinefunction(QueryBudgetMiddleware(get_response))
@@ -0,0 +1,9 @@
+import pytest
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_feed_queries_use_indexes(post_with_published_location):
+    # CommandError при полном проходе таблицы или TEMP B-TREE.
+    call_command("check_query_plans")
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+
+from blog import routers
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def replica_reads(settings, monkeypatch):
+    """Реплика смотрит в основную базу; считаем, сколько раз её выбрали."""
+    settings.DATABASE_REPLICAS = ["default"]
+    chosen = []
+
+    def choose():
+        chosen.append("default")
+        return "default"
+
+    monkeypatch.setattr(routers, "choose_replica", choose)
+    return chosen
+
+
+def test_router_sends_blog_reads_to_replica(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    router = routers.ReplicaRouter()
+    factory = RequestFactory()
+
+    assert router.db_for_read(Post) is None
+    with routers.read_from_replicas(factory.get("/")):
+        assert router.db_for_read(Post) == "replica"
+        assert router.db_for_read(get_user_model()) is None, (
+            "Убедитесь, что пользователи и сессии читаются с основной базы."
+        )
+    with routers.read_from_replicas(factory.post("/")):
+        assert router.db_for_read(Post) is None
+    pinned = factory.get("/")
+    pinned.COOKIES[routers.PIN_COOKIE] = str(time.time() + 60)
+    with routers.read_from_replicas(pinned):
+        assert router.db_for_read(Post) is None
+    assert router.db_for_write(Post, instance=Post(title="x")) == "default"
+    assert router.allow_migrate("replica", "blog") is False
+
+
+def test_read_views_use_replica(
+        replica_reads, client, post_with_published_location):
+    post = post_with_published_location
+    for url in (
+        "/",
+        f"/posts/{post.pk}/",
+        f"/category/{post.category.slug}/",
+        f"/profile/{post.author.username}/",
+    ):
+        replica_reads.clear()
+        assert client.get(url).status_code == 200
+        assert replica_reads, (
+            f"Убедитесь, что страница {url} читает данные с реплики."
+        )
+
+
+def test_writer_is_pinned_to_primary(
+        replica_reads, settings, user_client, post_with_published_location):
+    post = post_with_published_location
+    response = user_client.post(
+        f"/posts/{post.pk}/comment/", {"text": "Свежий комментарий"}
+    )
+    assert response.status_code == 302
+    pin = response.cookies[routers.PIN_COOKIE]
+    assert pin["max-age"] == settings.REPLICA_PIN_SECONDS
+
+    replica_reads.clear()
+    response = user_client.get(f"/posts/{post.pk}/")
+    assert "Свежий комментарий" in response.content.decode()
+    assert not replica_reads, (
+        "Убедитесь, что после записи пользователь читает с основной базы."
+    )
+
+
+def test_no_pin_without_replicas(user_client, post_with_published_location):
+    response = user_client.post(
+        f"/posts/{post_with_published_location.pk}/comment/",
+        {"text": "Комментарий"},
+    )
+    assert routers.PIN_COOKIE not in response.cookies
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from blog import resize
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.RESIZE_CACHE_DIR = tmp_path / "resize"
+    return settings.MEDIA_ROOT
+
+
+@pytest.fixture
+def source():
+    buffer = BytesIO()
+    Image.new("RGB", (1200, 800), (10, 120, 200)).save(buffer, "JPEG")
+    return default_storage.save(
+        "posts/photo.jpg", ContentFile(buffer.getvalue())
+    )
+
+
+def read_image(response):
+    body = b"".join(response.streaming_content) if response.streaming else (
+        response.content
+    )
+    return Image.open(BytesIO(body))
+
+
+def test_signed_url_is_resized_and_cached(client, source):
+    url = resize.resized_url(source, 300, 0, "webp")
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/webp"
+    assert response[resize.CACHE_HEADER] == "miss"
+    image = read_image(response)
+    assert (image.format, image.size) == ("WEBP", (300, 200))
+    response = client.get(url)
+    assert response[resize.CACHE_HEADER] == "hit", (
+        "Убедитесь, что готовая копия отдаётся из дискового кэша."
+    )
+    assert read_image(response).size == (300, 200)
+    cropped = read_image(client.get(resize.resized_url(source, 100, 100)))
+    assert (cropped.format, cropped.size) == ("JPEG", (100, 100))
+
+
+def test_unsigned_or_oversized_requests_are_rejected(client, source):
+    url = resize.resized_url(source, 300, 0, "jpeg")
+    assert client.get(url.replace("300x0", "3000x0")).status_code == 403, (
+        "Убедитесь, что размеры нельзя подменить без подписи."
+    )
+    assert client.get(url.split("?")[0]).status_code == 403
+    with pytest.raises(ValueError):
+        resize.resized_url(source, 5000, 0)
+    with pytest.raises(ValueError):
+        resize.resized_url("avatars/me.jpg", 100, 0)
+
+
+def test_concurrent_misses_decode_once(source, monkeypatch):
+    calls = []
+    original = resize.render
+
+    def slow_render(*args):
+        calls.append(args)
+        time.sleep(0.1)
+        return original(*args)
+
+    monkeypatch.setattr(resize, "render", slow_render)
+    results = []
+
+    def fetch():
+        body, hit = resize.get_or_render(source, 200, 0, "jpeg")
+        if hit:
+            body.close()
+        results.append(hit)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1, (
+        "Убедитесь, что одновременные запросы одной копии ждут первый."
+    )
+    assert sorted(results) == [False, True, True, True]
+
+
+def test_disk_cache_evicts_least_recently_read(tmp_path):
+    cache = resize.DiskCache(tmp_path / "lru", max_bytes=350)
+    for number, key in enumerate("abc"):
+        cache.put(key, b"x" * 100)
+        os.utime(cache.path(key), (number, number))
+    cache.open("a").close()
+    cache.put("d", b"x" * 100)
+    assert cache.open("b") is None, "Убедитесь, что вытесняется старая запись."
+    for key in "acd":
+        with cache.open(key) as file:
+            assert file.read() == b"x" * 100
+    assert cache.size() <= 350
+    assert not any(path.name.startswith(resize.TEMP_PREFIX)
+                   for path in (tmp_path / "lru").rglob("*"))
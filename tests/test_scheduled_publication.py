@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.models import FeedEntry, Post
+from blog.publishing import publish_due_posts, visibility_changed
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def deferred_post(mixer, user, published_category):
+    return mixer.blend(
+        "blog.Post",
+        author=user,
+        is_published=True,
+        category=published_category,
+        pub_date=timezone.now() + timedelta(hours=1),
+    )
+
+
+def test_deferred_post_becomes_visible(
+        deferred_post, django_capture_on_commit_callbacks):
+    assert not deferred_post.is_visible
+    assert not FeedEntry.objects.get(pk=deferred_post.pk).is_listed
+
+    assert publish_due_posts() == []
+    version = Post.objects.get(pk=deferred_post.pk).version
+
+    received = []
+
+    def on_change(sender, post_ids, **kwargs):
+        received.extend(post_ids)
+
+    visibility_changed.connect(on_change)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            published = publish_due_posts(
+                now=timezone.now() + timedelta(hours=2)
+            )
+    finally:
+        visibility_changed.disconnect(on_change)
+
+    assert published == [deferred_post.pk]
+    assert received == [deferred_post.pk], (
+        "Убедитесь, что после публикации рассылается visibility_changed."
+    )
+    post = Post.objects.get(pk=deferred_post.pk)
+    entry = FeedEntry.objects.get(pk=deferred_post.pk)
+    assert post.is_visible
+    assert entry.is_listed
+    assert post.version == version + 1, (
+        "Убедитесь, что публикация меняет версию поста для кэша фрагментов."
+    )
+    assert entry.version > 1
+
+
+def test_category_toggle_updates_visibility(post_with_published_location):
+    post = post_with_published_location
+    assert post.is_visible
+
+    post.category.is_published = False
+    post.category.save()
+    assert not Post.objects.get(pk=post.pk).is_visible
+
+    post.category.is_published = True
+    post.category.save()
+    assert Post.objects.get(pk=post.pk).is_visible
+    assert FeedEntry.objects.get(pk=post.pk).is_listed
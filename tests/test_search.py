@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from blog import search
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category):
+    def make(title, text="Текст", **kwargs):
+        kwargs.setdefault("is_published", True)
+        return mixer.blend(
+            "blog.Post", title=title, text=text, author=user,
+            category=published_category, location=None,
+            pub_date=timezone.now() - timedelta(days=1), **kwargs
+        )
+    return make
+
+
+def found(client, query, **params):
+    response = client.get("/search/", {"q": query, **params})
+    assert response.status_code == 200
+    return response, [post.pk for post in response.context["posts"]]
+
+
+def test_index_follows_post_changes(client, make_post):
+    post = make_post("Вулканы Камчатки")
+    assert found(client, "вулканы")[1] == [post.pk], (
+        "Убедитесь, что новый пост попадает в поисковый индекс."
+    )
+    post.title = "Гейзеры Камчатки"
+    post.save()
+    assert found(client, "вулканы")[1] == []
+    assert found(client, "гейзеры")[1] == [post.pk]
+
+    Post.objects.filter(pk=post.pk).update(text="Долина гейзеров")
+    assert found(client, "долина")[1] == [post.pk], (
+        "Убедитесь, что индекс обновляется и при QuerySet.update()."
+    )
+    post.delete()
+    assert found(client, "гейзеры")[1] == []
+
+
+def test_hidden_posts_are_not_found(client, make_post):
+    make_post("Черновик про горы", is_published=False)
+    visible = make_post("Заметка про горы")
+    assert found(client, "горы")[1] == [visible.pk], (
+        "Убедитесь, что поиск показывает только опубликованные посты."
+    )
+
+
+def test_title_match_ranks_first(client, make_post):
+    in_text = make_post("Заметка", text="Рассказ про озеро Байкал зимой")
+    in_title = make_post("Байкал", text="Рассказ о поездке")
+    assert found(client, "байкал")[1] == [in_title.pk, in_text.pk]
+
+
+def test_prefix_match_and_highlight(client, make_post):
+    make_post("Поход", text="Лучшие <b>маршруты</b> для походов выходного дня")
+    response, posts = found(client, "маршрут")
+    assert len(posts) == 1
+    content = response.content.decode()
+    assert "<mark>маршруты</mark>" in content
+    assert "&lt;b&gt;" in content and "<b>маршруты" not in content, (
+        "Убедитесь, что текст сниппета экранируется."
+    )
+
+
+def test_syntax_is_not_passed_to_fts(client, make_post):
+    make_post("Кавычки")
+    assert found(client, 'кавычки" * (')[1] != []
+    assert found(client, "!!!")[1] == []
+
+
+def test_keyset_pagination(client, make_post):
+    ids = {make_post(f"Рецепт номер {i}").pk for i in range(13)}
+    response, first = found(client, "рецепт")
+    page = response.context["page_obj"]
+    assert len(first) == 10 and page.has_next()
+    assert "q=%D1%80%D0%B5%D1%86%D0%B5%D0%BF%D1%82&amp;cursor=" in (
+        response.content.decode()
+    ), "Убедитесь, что ссылки пагинации сохраняют запрос."
+    _, second = found(client, "рецепт", cursor=page.next_cursor)
+    assert len(second) == 3
+    assert set(first) | set(second) == ids
+
+
+def test_invalid_cursor(client, make_post):
+    make_post("Рецепт")
+    response = client.get("/search/", {"q": "рецепт", "cursor": "abc"})
+    assert response.status_code == 404
+
+
+def test_reindex_command(client, make_post):
+    post = make_post("Северное сияние")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {search.TABLE}({search.TABLE}) "
+            "VALUES ('delete-all')"
+        )
+    assert found(client, "сияние")[1] == []
+    call_command("reindex_search")
+    assert found(client, "сияние")[1] == [post.pk]
+
+
+def test_search_query_count(
+        client, make_post, django_assert_max_num_queries):
+    for i in range(5):
+        make_post(f"Маршрут {i}")
+    with django_assert_max_num_queries(4):
+        assert len(found(client, "маршрут")[1]) == 5
@@ -0,0 +1,36 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from blog.sqlite import configure_connection, pragma_statements
+
+
+@pytest.mark.django_db
+def test_pragmas_applied_to_django_connection():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1, (
+            "Убедитесь, что соединения открываются с synchronous=NORMAL."
+        )
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == 5000
+
+
+def test_file_database_switches_to_wal(tmp_path):
+    raw = sqlite3.connect(tmp_path / "db.sqlite3")
+    configure_connection(
+        None, SimpleNamespace(
+            vendor="sqlite", alias="default", connection=raw
+        )
+    )
+    assert raw.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert raw.execute("PRAGMA cache_size").fetchone()[0] == -64 * 1024
+    raw.close()
+
+
+def test_rejects_unsafe_values():
+    with pytest.raises(ImproperlyConfigured):
+        list(pragma_statements({"journal_mode": "wal; DROP TABLE x"}))
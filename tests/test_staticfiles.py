@@ -0,0 +1,141 @@
+import asyncio
+import gzip
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import CommandError, call_command
+from django.template import Context, Template
+
+from blog import staticfiles
+
+CSS = "body { background: url('../img/dot.png'); }\n" + (
+    ".rule { margin: 0; }\n" * 100
+)
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    source = tmp_path / "src"
+    (source / "css").mkdir(parents=True)
+    (source / "img").mkdir()
+    (source / "css" / "site.css").write_text(CSS)
+    (source / "css" / "tiny.css").write_text("a{}")
+    (source / "img" / "dot.png").write_bytes(b"\x89PNG" * 10)
+    settings.STATICFILES_DIRS = [source]
+    settings.STATICFILES_FINDERS = [
+        "django.contrib.staticfiles.finders.FileSystemFinder",
+    ]
+    settings.STATIC_ROOT = tmp_path / "root"
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return settings.STATIC_ROOT
+
+
+def test_collectstatic_hashes_and_compresses(collected):
+    url = staticfiles_storage.url("css/site.css")
+    hashed = url[len("/static/"):]
+    assert staticfiles.HASHED_NAME_RE.search(hashed), (
+        "Убедитесь, что в имени файла есть хэш содержимого."
+    )
+    content = (collected / hashed).read_text()
+    assert "dot." in content and "dot.png" not in content, (
+        "Убедитесь, что ссылки в CSS ведут на имена с хэшем."
+    )
+    assert gzip.decompress(
+        (collected / f"{hashed}.gz").read_bytes()
+    ).decode() == content
+    assert (collected / "css" / "site.css.gz").exists()
+    assert not (collected / "css" / "tiny.css.gz").exists(), (
+        "Убедитесь, что маленькие файлы не сжимаются."
+    )
+    assert not (collected / "img" / "dot.png.gz").exists()
+
+
+def test_storage_without_manifest_keeps_names():
+    assert staticfiles_storage.url("css/blogicum.css") == (
+        "/static/css/blogicum.css"
+    )
+
+
+def test_middleware_negotiates_encoding(client, collected):
+    url = staticfiles_storage.url("css/site.css")
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Type"].startswith("text/css")
+    assert "Accept-Encoding" in response["Vary"]
+    assert "immutable" in response["Cache-Control"]
+    body = b"".join(response.streaming_content)
+    assert gzip.decompress(body).decode().startswith("body")
+    assert response["Content-Length"] == str(len(body))
+
+    plain = client.get(url, HTTP_ACCEPT_ENCODING="identity")
+    assert "Content-Encoding" not in plain
+    assert plain["ETag"] != response["ETag"], (
+        "Убедитесь, что у сжатой копии свой ETag."
+    )
+    b"".join(plain.streaming_content)
+    cached = client.get(
+        url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert cached.status_code == 304
+
+
+def test_middleware_unhashed_and_missing(client, settings, collected):
+    response = client.get("/static/css/site.css")
+    assert "immutable" not in response["Cache-Control"]
+    assert f"max-age={settings.STATIC_MAX_AGE}" in response["Cache-Control"]
+    b"".join(response.streaming_content)
+    assert client.get("/static/css/missing.css").status_code == 404
+
+
+def test_middleware_is_async_capable(async_client, collected):
+    async def get_response(request):
+        return None
+
+    assert asyncio.iscoroutinefunction(
+        staticfiles.StaticFilesMiddleware(get_response)
+    ), "Убедитесь, что middleware не переводит ASGI-цепочку в sync."
+    url = staticfiles_storage.url("css/site.css")
+    response = async_to_sync(async_client.get)(
+        url, **{"accept-encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_base_template_has_bootstrap(client):
+    content = client.get("/").content.decode()
+    assert "bootstrap.min.css" in content
+    assert "bootstrap.bundle.min.js" in content
+
+
+def test_vendor_asset_prefers_static(settings, tmp_path):
+    css = "vendor/bootstrap-5.1.3/css/bootstrap.min.css"
+    template = Template("{% load vendor %}{% vendor_asset name %}")
+    settings.STATICFILES_DIRS = [tmp_path]
+    html = template.render(Context({"name": css}))
+    assert f'integrity="{staticfiles.VENDOR[css][1]}"' in html, (
+        "Убедитесь, что без файла в static/ Bootstrap берётся с CDN "
+        "с проверкой integrity."
+    )
+    (tmp_path / css).parent.mkdir(parents=True)
+    (tmp_path / css).write_text("body{}")
+    settings.STATICFILES_DIRS = [tmp_path]
+    html = template.render(Context({"name": css}))
+    assert html == f'<link href="/static/{css}" rel="stylesheet">', (
+        "Убедитесь, что Bootstrap подключается из static/, если он там есть."
+    )
+
+
+def test_vendor_static_check(settings, tmp_path):
+    settings.STATICFILES_DIRS = [tmp_path]
+    call_command("vendor_static", check=True, stdout=StringIO())
+    css = tmp_path / "vendor/bootstrap-5.1.3/css/bootstrap.min.css"
+    css.parent.mkdir(parents=True)
+    css.write_text("body{}")
+    with pytest.raises(CommandError):
+        call_command("vendor_static", check=True, stdout=StringIO())
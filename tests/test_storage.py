@@ -0,0 +1,173 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image, ImageFile
+
+from blog import images
+from blog.forms import PostForm
+from blog.models import FeedEntry, Post
+from blog.storage import post_image_storage
+
+pytestmark = [pytest.mark.django_db]
+
+MODELS = (Post, FeedEntry)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    # Файлы удаляются сразу; отсрочку проверяет отдельный тест.
+    settings.IMAGE_RELEASE_GRACE = 0
+    return tmp_path
+
+
+def image_bytes(size=(64, 48), image_format="PNG", exif=None):
+    buffer = BytesIO()
+    options = {"exif": exif} if exif else {}
+    Image.new("RGB", size, (0, 90, 40)).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def upload(data, name="photo.png"):
+    return SimpleUploadedFile(name, data, "image/png")
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category):
+    def make(image):
+        post = mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            location=None, is_published=True, image=image,
+            pub_date=timezone.now() - timedelta(days=1),
+        )
+        # Копии строит фоновая задача над свежей копией поста из базы.
+        post.refresh_from_db()
+        return post
+    return make
+
+
+def stored_files(media_root):
+    return sorted(
+        path.relative_to(media_root).as_posix()
+        for path in (media_root / "posts").iterdir()
+        if path.is_file() and not path.name.startswith(".")
+    )
+
+
+def test_same_content_is_stored_once(
+        make_post, media_root, django_capture_on_commit_callbacks):
+    data = image_bytes()
+    first = make_post(upload(data, "one.png"))
+    second = make_post(upload(data, "two.PNG"))
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые файлы хранятся под одним именем."
+    )
+    assert first.image.name.endswith(".png")
+    assert stored_files(media_root) == [first.image.name]
+    card = media_root / first.image_meta["variants"]["card"][0]["jpeg"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert (media_root / second.image.name).exists(), (
+        "Убедитесь, что файл не удаляется, пока на него ссылается пост."
+    )
+    assert card.exists()
+
+    second.image = upload(image_bytes((32, 32)), "three.png")
+    with django_capture_on_commit_callbacks(execute=True):
+        second.save()
+    second.refresh_from_db()
+    assert stored_files(media_root) == [second.image.name], (
+        "Убедитесь, что файл без ссылок удаляется при правке поста."
+    )
+    assert not card.exists()
+
+
+def test_exif_upload_is_replaced_and_reused(
+        make_post, media_root, django_capture_on_commit_callbacks):
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    data = image_bytes((80, 40), "JPEG", exif.tobytes())
+    with django_capture_on_commit_callbacks(execute=True):
+        first = make_post(upload(data, "photo.jpg"))
+    with django_capture_on_commit_callbacks(execute=True):
+        second = make_post(upload(data, "again.jpg"))
+    assert first.image.name == second.image.name
+    assert second.image_meta == first.image_meta
+    assert stored_files(media_root) == [first.image.name], (
+        "Убедитесь, что исходный файл с EXIF удаляется."
+    )
+
+
+def test_reupload_during_release_keeps_file(
+        settings, make_post, media_root):
+    settings.IMAGE_RELEASE_GRACE = 600
+    data = image_bytes()
+    post = make_post(upload(data))
+    name, meta = post.image.name, post.image_meta
+    path = media_root / name
+    week_ago = (timezone.now() - timedelta(days=7)).timestamp()
+    os.utime(path, (week_ago, week_ago))
+    Post.objects.filter(pk=post.pk).delete()
+    # Тот же файл загружают снова, а пост с ним ещё не закоммичен.
+    assert post_image_storage.save("posts/again.png", upload(data)) == name
+    retry_at = images.release(MODELS, post_image_storage, name, meta)
+    assert path.exists(), (
+        "Убедитесь, что файл, только что загруженный повторно, не удаляется."
+    )
+    assert retry_at > timezone.now()
+
+    os.utime(path, (week_ago, week_ago))
+    assert images.release(MODELS, post_image_storage, name, meta) is None
+    assert not path.exists()
+
+
+def test_feed_entry_keeps_file(make_post, media_root):
+    post = make_post(upload(image_bytes()))
+    name, meta = post.image.name, post.image_meta
+    # Пост уже без картинки, а карточка ленты ещё не пересобрана.
+    Post.objects.filter(pk=post.pk).update(image="")
+    assert images.release(MODELS, post_image_storage, name, meta) is None
+    assert (media_root / name).exists(), (
+        "Убедитесь, что файл, на который ссылается FeedEntry, не удаляется."
+    )
+
+
+def post_form(image):
+    return PostForm(
+        data={"title": "Заголовок", "text": "Текст",
+              "pub_date": "2024-01-01T10:00"},
+        files={"image": image},
+    )
+
+
+def test_form_probes_header_only(published_category, monkeypatch):
+    def forbidden_load(self):
+        raise AssertionError("Картинка декодируется при проверке формы.")
+
+    monkeypatch.setattr(ImageFile.ImageFile, "load", forbidden_load)
+    form = post_form(upload(image_bytes()))
+    assert "image" not in form.errors
+
+
+@pytest.mark.parametrize("limits", [
+    {"IMAGE_MAX_PIXELS": 1000},
+    {"IMAGE_MAX_BYTES": 100},
+])
+def test_form_rejects_large_images(settings, limits):
+    for name, value in limits.items():
+        setattr(settings, name, value)
+    form = post_form(upload(image_bytes()))
+    assert "image" in form.errors
+
+
+def test_form_rejects_decompression_bomb(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    form = post_form(upload(image_bytes()))
+    assert "image" in form.errors
+    assert "Слишком большое" in form.errors["image"][0]
+    assert "image" in post_form(upload(b"not an image")).errors
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+import pytest
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+from blog import task_queue
+from blog.models import FeedEntry, OutgoingEmail, Task
+
+pytestmark = [pytest.mark.django_db]
+
+calls = []
+
+
+@task_queue.task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task_queue.task(name="tests.flaky", max_attempts=2)
+def flaky():
+    calls.append("flaky")
+    raise RuntimeError("сбой")
+
+
+@pytest.fixture(autouse=True)
+def queued(settings):
+    settings.TASKS_EAGER = False
+    calls.clear()
+
+
+def test_delay_persists_and_worker_runs():
+    row = record.delay({"id": 1})
+    assert Task.objects.get().args == [{"id": 1}]
+    assert calls == [], "Убедитесь, что delay() только ставит задачу."
+    worker = task_queue.Worker()
+    assert worker.run_once() == 1
+    assert calls == [{"id": 1}]
+    assert not Task.objects.filter(pk=row.pk).exists(), (
+        "Убедитесь, что выполненная задача удаляется из очереди."
+    )
+    assert worker.results[task_queue.DONE] == 1
+
+
+def test_retries_with_backoff_then_fails():
+    flaky.delay()
+    worker = task_queue.Worker()
+    worker.run_once()
+    row = Task.objects.get()
+    assert (row.status, row.attempts) == (Task.QUEUED, 1)
+    assert row.run_at > timezone.now(), (
+        "Убедитесь, что повтор откладывается."
+    )
+    assert "RuntimeError" in row.last_error
+    assert worker.run_once() == 0
+    Task.objects.update(run_at=timezone.now())
+    worker.run_once()
+    row.refresh_from_db()
+    assert (row.status, row.attempts) == (Task.FAILED, 2)
+    assert calls == ["flaky", "flaky"]
+
+
+def test_claim_is_exclusive_and_stale_tasks_return(settings):
+    record.delay(1)
+    record.delay(2)
+    assert len(task_queue.claim(10)) == 2
+    assert task_queue.claim(10) == [], (
+        "Убедитесь, что взятую задачу не берёт второй worker."
+    )
+    Task.objects.update(
+        locked_at=timezone.now() - timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT + 1
+        )
+    )
+    assert len(task_queue.claim(10)) == 2
+
+
+def test_eager_mode_rejects_non_json_arguments(settings):
+    settings.TASKS_EAGER = True
+    record.delay("сразу")
+    assert calls == ["сразу"]
+    assert not Task.objects.exists()
+    with pytest.raises(TypeError):
+        record.delay(object())
+
+
+def test_post_image_is_processed_by_worker(
+        settings, tmp_path, mixer, user, published_category):
+    settings.MEDIA_ROOT = tmp_path
+    buffer = BytesIO()
+    Image.new("RGB", (900, 600)).save(buffer, "JPEG")
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        location=None, is_published=True,
+        image=SimpleUploadedFile("photo.jpg", buffer.getvalue()),
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    assert Task.objects.filter(name__endswith="process_post_image").exists()
+    assert FeedEntry.objects.get(post=post).image_meta == {}
+    call_command("run_tasks", once=True, threads=1, stdout=StringIO())
+    post.refresh_from_db()
+    assert post.image_meta["width"] == 900
+    assert FeedEntry.objects.get(post=post).image_meta == post.image_meta, (
+        "Убедитесь, что задача обновляет карточку ленты."
+    )
+
+
+def test_queued_email_backend(settings):
+    settings.EMAIL_BACKEND = "blog.mail.QueuedEmailBackend"
+    settings.QUEUED_EMAIL_BACKEND = (
+        "django.core.mail.backends.locmem.EmailBackend"
+    )
+    message = EmailMultiAlternatives(
+        "Тема", "Текст", "blog@example.com", ["reader@example.com"]
+    )
+    message.attach_alternative("<p>Текст</p>", "text/html")
+    message.send()
+    assert mail.outbox == []
+    assert OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING).exists()
+    task_queue.Worker().run_once()
+    assert len(mail.outbox) == 1
+    sent = mail.outbox[0]
+    assert (sent.subject, sent.to) == ("Тема", ["reader@example.com"])
+    assert sent.alternatives == [("<p>Текст</p>", "text/html")]
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from blog.models import Comment, Post
+from blog.write_queue import WriteQueue, get_write_queue
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def test_comment_goes_through_queue(
+        settings, user_client, post_with_published_location):
+    settings.WRITE_QUEUE_ENABLED = True
+    post = post_with_published_location
+    before = get_write_queue().stats()["operations"]
+    response = user_client.post(
+        f"/posts/{post.pk}/comment/", {"text": "Через очередь"}
+    )
+    assert response.status_code == 302
+    assert Comment.objects.filter(post=post, text="Через очередь").exists()
+    assert get_write_queue().stats()["operations"] == before + 1, (
+        "Убедитесь, что comment_create сохраняет комментарий через очередь."
+    )
+
+
+def test_concurrent_writes_share_a_commit(user, post_with_published_location):
+    write_queue = WriteQueue(batch_size=8, batch_ms=200)
+    post = post_with_published_location
+    start = threading.Barrier(8)
+    created = []
+
+    def add(i):
+        start.wait()
+        created.append(write_queue.submit(
+            Comment.objects.create, post=post, author=user, text=f"К{i}"
+        ).result(timeout=10))
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = write_queue.stats()
+    assert len(created) == 8
+    assert stats["operations"] == 8
+    assert stats["max_batch"] > 1, (
+        "Убедитесь, что одновременные записи фиксируются одним пакетом."
+    )
+    assert Post.objects.get(pk=post.pk).comment_count == 8
+
+
+def test_failed_operation_does_not_roll_back_batch(
+        user, post_with_published_location):
+    write_queue = WriteQueue(batch_size=2, batch_ms=500)
+
+    def broken():
+        Comment.objects.create(
+            post=post_with_published_location, author=user, text="Откат"
+        )
+        raise ValueError("ошибка")
+
+    failing = write_queue.submit(broken)
+    ok = write_queue.submit(
+        Comment.objects.create,
+        post=post_with_published_location, author=user, text="Сохранён",
+    )
+    assert ok.result(timeout=10).text == "Сохранён"
+    with pytest.raises(ValueError):
+        failing.result(timeout=10)
+    assert list(Comment.objects.values_list("text", flat=True)) == [
+        "Сохранён"
+    ]
+    assert write_queue.stats()["failed"] == 1